@@ -0,0 +1,445 @@
+"""Latency percentiles and query counts for every API endpoint.
+
+Usage: python -m benchmarks.endpoints [--tickets 1k|100k|1m] [--requests N]
+       [--output results.json] [--compare baseline.json]
+
+Creates a throwaway test database on the configured backend (the same
+environment variables as manage.py), fills it with
+train_service.synthetic at the given scale and times each endpoint
+through the test client with JWT authentication. Throttling is disabled;
+caches are left on and warmed up first, so the numbers are steady-state.
+Results are written as JSON (with the commit and scale) for comparison
+between commits with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_service_api.settings")
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.test.utils import override_settings  # noqa: E402
+
+# No throttling. Views read their throttle classes and rates when they
+# are imported, so this has to come first.
+override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_CLASSES": [],
+        "DEFAULT_THROTTLE_RATES": {
+            **settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"],
+            "autocomplete": None,
+        },
+    }
+).enable()
+
+from django.contrib.auth import get_user_model  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test.utils import (  # noqa: E402
+    CaptureQueriesContext,
+    setup_test_environment,
+)
+from django.urls import reverse  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from train_service.models import (  # noqa: E402
+    Order,
+    Route,
+    Train,
+    Trip,
+)
+from train_service.seat_map import taken_seats  # noqa: E402
+from train_service.synthetic import PASSWORD, Sizes, generate  # noqa: E402
+
+WARMUP = 3
+
+
+@dataclass
+class Endpoint:
+    name: str
+    method: str
+    url: str
+    auth: str = "user"  # "anon", "user" or "admin"
+    # A dict, or a callable returning one for each request.
+    data: object = None
+    status: int = 200
+
+
+def parse_scale(value):
+    value = value.lower().replace("_", "")
+    for suffix, factor in (("k", 1000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def free_seats(trip):
+    taken = set(taken_seats(bytes(trip.seat_map), trip.train))
+    for cargo in range(1, trip.train.cargo_num + 1):
+        for seat in range(1, trip.train.places_in_cargo + 1):
+            if (cargo, seat) not in taken:
+                yield cargo, seat
+
+
+def endpoints(fixtures):
+    user = fixtures["user"]
+    station, route, trip = (
+        fixtures["station"],
+        fixtures["route"],
+        fixtures["trip"],
+    )
+    empty_trip = fixtures["empty_trip"]
+    seats = free_seats(empty_trip)
+    counter = iter(range(10**9))
+    refresh = fixtures["refresh"]
+    access = fixtures["access"]
+
+    def seat():
+        cargo, seat = next(seats)
+        return {"trip": empty_trip.id, "cargo": cargo, "seat": seat}
+
+    def api(name, *args):
+        return reverse(f"train_service:{name}", args=args)
+
+    def with_query(url, **params):
+        return f"{url}?{'&'.join(f'{k}={v}' for k, v in params.items())}"
+
+    departure_day = timezone.localtime(trip.departure_time).date()
+    return [
+        Endpoint("stations list", "get", api("station-list")),
+        Endpoint(
+            "stations retrieve", "get", api("station-detail", station.id)
+        ),
+        Endpoint(
+            "stations nearby",
+            "get",
+            with_query(
+                api("station-nearby"),
+                lat=station.latitude,
+                lon=station.longitude,
+            ),
+        ),
+        Endpoint(
+            "stations autocomplete",
+            "get",
+            with_query(api("station-autocomplete"), q=station.name[:3]),
+        ),
+        Endpoint(
+            "stations create",
+            "post",
+            api("station-list"),
+            auth="admin",
+            data=lambda: {
+                "name": f"Benchmark {next(counter)}",
+                "latitude": 50,
+                "longitude": 30,
+            },
+            status=201,
+        ),
+        Endpoint("routes list", "get", api("route-list")),
+        Endpoint(
+            "routes list by source",
+            "get",
+            with_query(api("route-list"), source=route.source.name[:5]),
+        ),
+        Endpoint("routes retrieve", "get", api("route-detail", route.id)),
+        Endpoint("train types list", "get", api("train-type-list")),
+        Endpoint("trains list", "get", api("train-list")),
+        Endpoint(
+            "trains retrieve", "get", api("train-detail", fixtures["train"].id)
+        ),
+        Endpoint("crew list", "get", api("crew-list")),
+        Endpoint("trips list", "get", api("trip-list")),
+        Endpoint(
+            "trips list by date",
+            "get",
+            with_query(api("trip-list"), date=departure_day.isoformat()),
+        ),
+        Endpoint(
+            "trips list by stations",
+            "get",
+            with_query(
+                api("trip-list"),
+                source_id=route.source_id,
+                destination_id=route.destination_id,
+            ),
+        ),
+        Endpoint("trips retrieve", "get", api("trip-detail", trip.id)),
+        Endpoint(
+            "journeys list",
+            "get",
+            with_query(
+                api("journey-list"),
+                source=route.source_id,
+                destination=route.destination_id,
+            ),
+        ),
+        Endpoint("orders list", "get", api("order-list")),
+        Endpoint(
+            "orders create",
+            "post",
+            api("order-list"),
+            data=lambda: {"tickets": [seat()]},
+            status=201,
+        ),
+        Endpoint("holds list", "get", api("hold-list")),
+        Endpoint(
+            "holds create",
+            "post",
+            api("hold-list"),
+            data=lambda: [seat()],
+            status=201,
+        ),
+        Endpoint(
+            "trips assign seats",
+            "post",
+            api("trip-assign-seats", empty_trip.id),
+            data={"passengers": 2},
+            status=201,
+        ),
+        Endpoint(
+            "exports trips",
+            "get",
+            with_query(
+                api("export-trips"),
+                date_from=departure_day.isoformat(),
+                date_to=departure_day.isoformat(),
+            ),
+            auth="admin",
+        ),
+        Endpoint(
+            "exports orders",
+            "get",
+            with_query(api("export-orders"), trip=trip.id),
+            auth="admin",
+        ),
+        Endpoint(
+            "user register",
+            "post",
+            reverse("user:register"),
+            auth="anon",
+            data=lambda: {
+                "email": f"benchmark{next(counter)}@example.com",
+                "password": PASSWORD,
+            },
+            status=201,
+        ),
+        Endpoint(
+            "user token",
+            "post",
+            reverse("user:token_obtain_pair"),
+            auth="anon",
+            data={"email": user.email, "password": PASSWORD},
+        ),
+        Endpoint(
+            "user token refresh",
+            "post",
+            reverse("user:token_refresh"),
+            auth="anon",
+            data={"refresh": refresh},
+        ),
+        Endpoint(
+            "user token verify",
+            "post",
+            reverse("user:token_verify"),
+            auth="anon",
+            data={"token": access},
+        ),
+        Endpoint("user me", "get", reverse("user:me")),
+        Endpoint(
+            "user me update",
+            "patch",
+            reverse("user:me"),
+            data={"email": user.email},
+        ),
+    ]
+
+
+def load_fixtures():
+    user_model = get_user_model()
+    busiest = (
+        Order.objects.values("user")
+        .annotate(orders=Count("id"))
+        .order_by("-orders")
+        .first()
+    )
+    user = user_model.objects.get(pk=busiest["user"])
+    admin = user_model.objects.create_superuser(
+        email="benchmark-admin@example.com", password=PASSWORD
+    )
+    upcoming = Trip.objects.select_related("train").filter(
+        departure_time__gt=timezone.now()
+    )
+    route = (
+        Route.objects.select_related("source", "destination")
+        .annotate(trips_count=Count("trips"))
+        .order_by("-trips_count")
+        .first()
+    )
+    return {
+        "user": user,
+        "admin": admin,
+        "station": route.source,
+        "route": route,
+        "train": Train.objects.first(),
+        "trip": upcoming.order_by("-tickets_sold").first(),
+        "empty_trip": upcoming.order_by("tickets_sold").first(),
+    }
+
+
+def client_for(email):
+    client = APIClient()
+    if email is None:
+        return client, None
+    res = client.post(
+        reverse("user:token_obtain_pair"),
+        {"email": email, "password": PASSWORD},
+    )
+    tokens = res.json()
+    client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens['access']}")
+    return client, tokens
+
+
+def percentile(timings, q):
+    return statistics.quantiles(timings, n=100, method="inclusive")[q - 1]
+
+
+def measure(endpoint, client, requests):
+    timings, queries = [], []
+    for i in range(WARMUP + requests):
+        data = endpoint.data() if callable(endpoint.data) else endpoint.data
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            res = getattr(client, endpoint.method)(
+                endpoint.url, data, format="json"
+            )
+            if res.streaming:
+                b"".join(res.streaming_content)
+            elapsed = time.perf_counter() - started
+        if res.status_code != endpoint.status:
+            raise RuntimeError(
+                f"{endpoint.name}: {res.status_code} "
+                f"{getattr(res, 'content', b'')[:200]!r}"
+            )
+        if i >= WARMUP:
+            timings.append(elapsed * 1000)
+            queries.append(len(captured))
+    return {
+        "endpoint": endpoint.name,
+        "method": endpoint.method.upper(),
+        "path": endpoint.url,
+        "requests": requests,
+        "p50_ms": round(percentile(timings, 50), 3),
+        "p90_ms": round(percentile(timings, 90), 3),
+        "p99_ms": round(percentile(timings, 99), 3),
+        "mean_ms": round(statistics.fmean(timings), 3),
+        "max_ms": round(max(timings), 3),
+        "queries": statistics.median(queries),
+        "queries_max": max(queries),
+    }
+
+
+def commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {row["endpoint"]: row for row in json.load(f)["results"]}
+    print(f"\ncompared with {baseline_path}:")
+    for row in results:
+        old = baseline.get(row["endpoint"])
+        if old is None:
+            continue
+        ratio = row["p50_ms"] / old["p50_ms"] if old["p50_ms"] else 0
+        queries = row["queries"] - old["queries"]
+        print(
+            f"  {row['endpoint']:<26} p50 {ratio:5.2f}x  "
+            f"queries {queries:+g}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--tickets", type=parse_scale, default=1000)
+    parser.add_argument("--requests", type=int, default=30)
+    parser.add_argument("--output", default="endpoints.json")
+    parser.add_argument("--compare")
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        cache.clear()
+        started = time.perf_counter()
+        counts = generate(Sizes.for_tickets(args.tickets))
+        print(
+            f"generated {counts} in "
+            f"{time.perf_counter() - started:.1f}s ({connection.vendor})"
+        )
+        fixtures = load_fixtures()
+        clients = {}
+        clients["anon"], _ = client_for(None)
+        clients["user"], tokens = client_for(fixtures["user"].email)
+        clients["admin"], _ = client_for(fixtures["admin"].email)
+        fixtures["refresh"] = tokens["refresh"]
+        fixtures["access"] = tokens["access"]
+
+        results = []
+        for endpoint in endpoints(fixtures):
+            row = measure(endpoint, clients[endpoint.auth], args.requests)
+            results.append(row)
+            print(
+                f"{row['endpoint']:<26} p50 {row['p50_ms']:8.2f} ms  "
+                f"p90 {row['p90_ms']:8.2f} ms  "
+                f"p99 {row['p99_ms']:8.2f} ms  "
+                f"queries {row['queries']:g}"
+            )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "commit": commit(),
+                    "date": datetime.now(dt_timezone.utc).isoformat(),
+                    "database": connection.vendor,
+                    "python": platform.python_version(),
+                    "tickets": args.tickets,
+                    "counts": counts,
+                    "requests": args.requests,
+                },
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"wrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark train_service.journeys.Timetable on a synthetic timetable.
+
+Usage: python -m benchmarks.journeys [trips] [stations]
+
+The timetable module imports Django models, so settings must be
+importable (the same environment variables as manage.py); no database
+is used.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_service_api.settings")
+django.setup()
+
+from train_service.journeys import Timetable  # noqa: E402
+
+DAYS = 30
+SEARCHES = 200
+
+
+def synthetic_connections(trips, stations, rng):
+    # A hub-and-spoke network: most routes touch one of a few hubs, so
+    # many station pairs need one or two transfers.
+    hubs = list(range(max(stations // 50, 2)))
+    routes = []
+    for station in range(stations):
+        for hub in rng.sample(hubs, 2):
+            if station != hub:
+                routes.append((station, hub))
+                routes.append((hub, station))
+    for _ in range(stations):
+        routes.append(tuple(rng.sample(range(stations), 2)))
+
+    for trip_id in range(trips):
+        source, destination = rng.choice(routes)
+        departure = rng.uniform(0, DAYS * 86400)
+        duration = rng.uniform(1800, 6 * 3600)
+        yield trip_id, source, destination, departure, departure + duration
+
+
+def main():
+    trips = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    stations = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(0)
+
+    started = time.perf_counter()
+    timetable = Timetable(synthetic_connections(trips, stations, rng))
+    print(
+        f"built {len(timetable)} connections over {stations} stations "
+        f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+    )
+
+    timings = []
+    found = 0
+    for _ in range(SEARCHES):
+        source, destination = rng.sample(range(stations), 2)
+        departure = rng.uniform(0, (DAYS - 3) * 86400)
+        started = time.perf_counter()
+        itineraries = timetable.search(source, destination, departure)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += bool(itineraries)
+
+    timings.sort()
+    print(f"{SEARCHES} searches, {found} with a journey")
+    print(
+        f"median {statistics.median(timings):.1f} ms, "
+        f"p95 {timings[int(len(timings) * 0.95)]:.1f} ms, "
+        f"max {timings[-1]:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare DRF's JSONRenderer with train_service.renderers.FastJSONRenderer.
+
+Usage: python -m benchmarks.renderers [rows]
+
+Renders synthetic trip list and order list pages shaped like the API
+output; settings must be importable (the same environment variables as
+manage.py), no database is used.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_service_api.settings")
+django.setup()
+
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from train_service.renderers import FastJSONRenderer  # noqa: E402
+
+ROUNDS = 20
+
+
+def trip(trip_id, rng):
+    return {
+        "id": trip_id,
+        "route": f"Station {rng.randint(1, 500)} - "
+        f"Station {rng.randint(1, 500)}",
+        "departure_time": "2030-05-01T08:15:00Z",
+        "arrival_time": "2030-05-01T12:40:00Z",
+        "train_name": f"Intercity {rng.randint(1, 99)}",
+        "train_capacity": 432,
+        "tickets_available": rng.randint(0, 432),
+    }
+
+
+def trip_page(rows, rng):
+    return {
+        "count": rows * 10,
+        "next": "http://localhost/api/train_service/trips/?limit=&offset=",
+        "previous": None,
+        "results": [trip(trip_id, rng) for trip_id in range(rows)],
+    }
+
+
+def order_page(rows, rng):
+    return {
+        "count": rows,
+        "next": None,
+        "previous": None,
+        "results": [
+            {
+                "id": order_id,
+                "created_at": "2030-04-20T17:03:11.482Z",
+                "tickets": [
+                    {
+                        "id": order_id * 4 + seat,
+                        "cargo": rng.randint(1, 10),
+                        "seat": seat,
+                        "trip": trip(order_id, rng),
+                    }
+                    for seat in range(1, rng.randint(2, 5))
+                ],
+            }
+            for order_id in range(rows)
+        ],
+    }
+
+
+def median_ms(render, data):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        render(data)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rng = random.Random(0)
+    drf = JSONRenderer()
+    fast = FastJSONRenderer()
+
+    for name, data in (
+        ("trips", trip_page(rows, rng)),
+        ("orders", order_page(rows, rng)),
+    ):
+        size = len(drf.render(data))
+        baseline = median_ms(drf.render, data)
+        rendered = median_ms(fast.render, data)
+        results = data["results"]
+        chunks = [
+            results[offset:offset + 500]
+            for offset in range(0, len(results), 500)
+        ]
+        streamed = median_ms(
+            lambda chunks: b"".join(fast.render_list(chunks)), chunks
+        )
+        print(f"{name}: {rows} rows, {size / 1024:.0f} KiB")
+        print(f"  JSONRenderer:      {baseline:8.2f} ms")
+        print(
+            f"  FastJSONRenderer:  {rendered:8.2f} ms "
+            f"({baseline / rendered:.1f}x)"
+        )
+        print(f"  streamed (500s):   {streamed:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
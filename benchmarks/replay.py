@@ -0,0 +1,264 @@
+"""Replay recorded API traffic against a running instance.
+
+Usage: python -m benchmarks.replay traffic.jsonl
+       [--base-url http://localhost:8000] [--concurrency 8] [--speed 1]
+       [--limit N] [--user-email E] [--user-password P]
+       [--staff-email E] [--staff-password P] [--output replay.json]
+
+Reads the lines written by train_service.recording (TRAFFIC_RECORD_FILE)
+and sends them from --concurrency threads, keeping their recorded spacing
+divided by --speed; --speed 0 sends them as fast as the threads allow.
+"user" and "staff" requests carry a JWT for the given accounts (by
+default the first generate_data user; staff requests are skipped without
+staff credentials). Reports throughput, latency percentiles, errors
+(connection failures and 5xx) and responses whose status differs from
+the recorded one, overall and per endpoint.
+
+Only the standard library is used; the target can be any deployment,
+but replaying writes (orders, holds) changes its data.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+TOKEN_PATH = "/api/user/token/"
+DEFAULT_USER = ("user0@example.com", "password")
+TIMEOUT = 30
+
+
+def read_records(path, limit=None):
+    records = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                records.append(json.loads(line))
+                if limit and len(records) >= limit:
+                    break
+    records.sort(key=lambda record: record["t"])
+    return records
+
+
+def endpoint(record):
+    """METHOD path with numeric path segments replaced by {id}."""
+    path = re.sub(r"/\d+(?=/|$)", "/{id}", record["path"])
+    return f"{record['method']} {path}"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = round(q / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+class Client:
+    def __init__(self, base_url, credentials):
+        self.base_url = base_url.rstrip("/")
+        self.credentials = credentials
+        self.tokens = {}
+        self.lock = threading.Lock()
+
+    def token(self, user):
+        with self.lock:
+            if user not in self.tokens:
+                email, password = self.credentials[user]
+                status, body = self.request(
+                    "POST",
+                    TOKEN_PATH,
+                    body={"email": email, "password": password},
+                )
+                if status != 200:
+                    raise SystemExit(
+                        f"could not log in as {email}: {status} {body[:200]}"
+                    )
+                self.tokens[user] = json.loads(body)["access"]
+            return self.tokens[user]
+
+    def request(self, method, path, query=None, body=None, token=None):
+        url = self.base_url + path
+        if query:
+            url += "?" + urlencode(query, doseq=True)
+        headers = {"Accept": "application/json"}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        request = Request(url, data=data, headers=headers, method=method)
+        try:
+            with urlopen(request, timeout=TIMEOUT) as response:
+                return response.status, response.read()
+        except HTTPError as exc:
+            return exc.code, exc.read()
+
+    def send(self, record):
+        """(status or None, milliseconds, error) for one record."""
+        token = None
+        if record["user"] != "anonymous":
+            token = self.token(record["user"])
+        started = time.perf_counter()
+        try:
+            status, _ = self.request(
+                record["method"],
+                record["path"],
+                record.get("query"),
+                record.get("body"),
+                token,
+            )
+            error = None
+        except (URLError, OSError) as exc:
+            status, error = None, str(exc)
+        return status, (time.perf_counter() - started) * 1000, error
+
+
+def replay(records, send, concurrency=8, speed=1.0):
+    """Send records on their (sped up) schedule; return the results in
+    record order and the elapsed seconds."""
+    if not records:
+        return [], 0.0
+    first = records[0]["t"]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        futures = []
+        for record in records:
+            if speed:
+                delay = (record["t"] - first) / speed - (
+                    time.perf_counter() - started
+                )
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(pool.submit(send, record))
+        results = [future.result() for future in futures]
+    return results, time.perf_counter() - started
+
+
+def stats(pairs):
+    """Summary of [(record, (status, ms, error))]."""
+    latencies = [ms for _, (status, ms, _) in pairs if status is not None]
+    errors = sum(
+        1 for _, (status, _, _) in pairs if status is None or status >= 500
+    )
+    mismatches = sum(
+        1 for record, (status, _, _) in pairs if status != record["status"]
+    )
+    summary = {
+        "requests": len(pairs),
+        "errors": errors,
+        "error_rate": round(errors / len(pairs), 4) if pairs else 0,
+        "status_mismatches": mismatches,
+        "statuses": dict(
+            sorted(
+                Counter(
+                    str(status) for _, (status, _, _) in pairs
+                ).items()
+            )
+        ),
+    }
+    if latencies:
+        summary.update(
+            p50_ms=round(percentile(latencies, 50), 1),
+            p90_ms=round(percentile(latencies, 90), 1),
+            p99_ms=round(percentile(latencies, 99), 1),
+            max_ms=round(max(latencies), 1),
+        )
+    return summary
+
+
+def report(records, results, elapsed):
+    pairs = list(zip(records, results))
+    by_endpoint = defaultdict(list)
+    for record, result in pairs:
+        by_endpoint[endpoint(record)].append((record, result))
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(pairs) / elapsed, 1) if elapsed else 0,
+        **stats(pairs),
+        "endpoints": {
+            name: stats(endpoint_pairs)
+            for name, endpoint_pairs in sorted(
+                by_endpoint.items(), key=lambda item: -len(item[1])
+            )
+        },
+        "failures": Counter(
+            error for _, (_, _, error) in pairs if error
+        ).most_common(10),
+    }
+
+
+def print_report(summary):
+    print(
+        f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s: "
+        f"{summary['throughput_rps']} req/s, "
+        f"errors {summary['error_rate']:.2%}, "
+        f"status mismatches {summary['status_mismatches']}"
+    )
+    if "p50_ms" in summary:
+        print(
+            f"latency p50 {summary['p50_ms']} ms  p90 {summary['p90_ms']} ms"
+            f"  p99 {summary['p99_ms']} ms  max {summary['max_ms']} ms"
+        )
+    for name, row in summary["endpoints"].items():
+        print(
+            f"  {name:<48} {row['requests']:>6}  "
+            f"p50 {row.get('p50_ms', '-'):>8}  "
+            f"p99 {row.get('p99_ms', '-'):>8}  "
+            f"errors {row['errors']}"
+        )
+    for error, count in summary["failures"]:
+        print(f"  {count} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("file")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Speed-up factor for the recorded spacing; 0 for none.",
+    )
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--user-email", default=DEFAULT_USER[0])
+    parser.add_argument("--user-password", default=DEFAULT_USER[1])
+    parser.add_argument("--staff-email")
+    parser.add_argument("--staff-password")
+    parser.add_argument("--output")
+    args = parser.parse_args()
+
+    credentials = {"user": (args.user_email, args.user_password)}
+    if args.staff_email:
+        credentials["staff"] = (args.staff_email, args.staff_password)
+    users = {"anonymous", *credentials}
+    records = read_records(args.file, args.limit)
+    skipped = sum(1 for record in records if record["user"] not in users)
+    if skipped:
+        print(f"skipping {skipped} staff requests (no --staff-email)")
+    records = [record for record in records if record["user"] in users]
+
+    client = Client(args.base_url, credentials)
+    # Log in up front so the first requests are not slowed down.
+    for user in {record["user"] for record in records} - {"anonymous"}:
+        client.token(user)
+    results, elapsed = replay(
+        records, client.send, concurrency=args.concurrency, speed=args.speed
+    )
+    summary = report(records, results, elapsed)
+    print_report(summary)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
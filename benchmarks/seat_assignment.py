@@ -0,0 +1,50 @@
+"""Benchmark train_service.seat_assignment.assign_seats.
+
+Usage: python -m benchmarks.seat_assignment
+"""
+
+import random
+import timeit
+from types import SimpleNamespace
+
+from train_service.seat_assignment import assign_seats
+from train_service.seat_map import build_seat_map
+
+TRAINS = [
+    ("20 x 60", SimpleNamespace(cargo_num=20, places_in_cargo=60)),
+    ("40 x 100", SimpleNamespace(cargo_num=40, places_in_cargo=100)),
+]
+OCCUPANCY = (0.1, 0.5, 0.9)
+PARTY_SIZES = (1, 4, 12)
+RUNS = 2000
+
+
+def random_seat_map(train, occupancy, rng):
+    seats = [
+        (cargo, seat)
+        for cargo in range(1, train.cargo_num + 1)
+        for seat in range(1, train.places_in_cargo + 1)
+    ]
+    return build_seat_map(
+        train, rng.sample(seats, int(len(seats) * occupancy))
+    )
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'train':>10} {'occupancy':>9} {'party':>5} {'usec/call':>10}")
+    for name, train in TRAINS:
+        for occupancy in OCCUPANCY:
+            seat_map = random_seat_map(train, occupancy, rng)
+            for party in PARTY_SIZES:
+                seconds = timeit.timeit(
+                    lambda: assign_seats(seat_map, train, party), number=RUNS
+                )
+                print(
+                    f"{name:>10} {occupancy:>9.0%} {party:>5} "
+                    f"{seconds / RUNS * 1e6:>10.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
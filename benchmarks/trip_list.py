@@ -0,0 +1,122 @@
+"""Compare the trip list serializer with its values() fast path.
+
+Usage: python -m benchmarks.trip_list [trips] [page_size]
+
+Creates a throwaway test database on the configured backend (the same
+environment variables as manage.py), fills it with upcoming trips and
+measures rows/second for fetching and serializing one page both ways.
+"""
+
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "train_service_api.settings")
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from train_service.eager_loading import eager_load  # noqa: E402
+from train_service.models import (  # noqa: E402
+    Route,
+    Station,
+    Train,
+    TrainType,
+    Trip,
+)
+from train_service.serializers import TripListSerializer  # noqa: E402
+
+ROUNDS = 20
+
+
+def seed(trips, rng):
+    stations = Station.objects.bulk_create(
+        Station(name=f"Station {i}", latitude=50, longitude=30)
+        for i in range(100)
+    )
+    routes = Route.objects.bulk_create(
+        Route(source=source, destination=destination, distance=100)
+        for source, destination in (
+            rng.sample(stations, 2) for _ in range(500)
+        )
+    )
+    train_type = TrainType.objects.create(name="Intercity")
+    trains = Train.objects.bulk_create(
+        Train(
+            name=f"Train {i}",
+            cargo_num=rng.randint(4, 12),
+            places_in_cargo=rng.choice((36, 54, 64)),
+            train_type=train_type,
+        )
+        for i in range(50)
+    )
+    now = timezone.now()
+    batch = []
+    for _ in range(trips):
+        departure = now + timedelta(minutes=rng.randint(60, 60 * 24 * 30))
+        batch.append(
+            Trip(
+                route=rng.choice(routes),
+                train=rng.choice(trains),
+                departure_time=departure,
+                arrival_time=departure + timedelta(hours=4),
+                tickets_sold=rng.randint(0, 100),
+            )
+        )
+    Trip.objects.bulk_create(batch, batch_size=5000)
+
+
+def upcoming():
+    return Trip.objects.filter(departure_time__gt=timezone.now()).order_by(
+        "departure_time", "id"
+    )
+
+
+def serializer_path(page_size):
+    queryset = eager_load(upcoming(), TripListSerializer())
+    return TripListSerializer(queryset[:page_size], many=True).data
+
+
+def values_path(page_size):
+    queryset = TripListSerializer.project(upcoming())
+    return TripListSerializer.to_representation_rows(queryset[:page_size])
+
+
+def rows_per_second(path, page_size):
+    timings = []
+    for _ in range(ROUNDS):
+        started = time.perf_counter()
+        rows = len(path(page_size))
+        timings.append(time.perf_counter() - started)
+    return rows / statistics.median(timings)
+
+
+def main():
+    trips = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        seed(trips, random.Random(0))
+        assert serializer_path(page_size) == values_path(page_size)
+
+        serializer_rate = rows_per_second(serializer_path, page_size)
+        values_rate = rows_per_second(values_path, page_size)
+        print(f"{trips} trips, pages of {page_size}, {connection.vendor}")
+        print(f"serializer: {serializer_rate:>10,.0f} rows/s")
+        print(
+            f"values():   {values_rate:>10,.0f} rows/s "
+            f"({values_rate / serializer_rate:.1f}x)"
+        )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == "__main__":
+    main()
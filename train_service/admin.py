@@ -8,6 +8,7 @@ from train_service.models import (
     Trip,
     Ticket,
     Order,
+    SeatHold,
 )
 
 
@@ -27,3 +28,4 @@ admin.site.register(TrainType)
 admin.site.register(Train)
 admin.site.register(Crew)
 admin.site.register(Trip)
+admin.site.register(SeatHold)
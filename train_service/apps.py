@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TrainServiceConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "train_service"
+
+    def ready(self):
+        import train_service.checks  # noqa: F401
+        import train_service.signals  # noqa: F401
+        from train_service.timing import instrument_serializers
+
+        instrument_serializers()
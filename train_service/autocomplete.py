@@ -0,0 +1,104 @@
+"""Station name autocomplete over an in-process sorted prefix index."""
+
+import heapq
+import unicodedata
+from bisect import bisect_left
+
+from train_service.geo import STATIONS_VERSION
+from train_service.models import Station
+from train_service.versions import VersionedValue
+
+MAX_RESULTS = 50
+# Prefixes this short match a large share of the index, so their top
+# results are computed once at build time instead of scanned per query.
+PRECOMPUTED_PREFIX_LENGTH = 2
+
+_LAST_CHARACTER = chr(0x10FFFF)
+
+
+def normalize(text):
+    """Casefold, strip accents and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.split())
+
+
+class StationNameIndex:
+    """Normalized station names and each of their word suffixes, sorted.
+
+    Every key starting with the query sits in one contiguous slice found
+    with bisect, so "cross" matches "King's Cross" as well as "Crossway".
+    Matches at the start of the name rank before matches on a later word,
+    then shorter names first. Answers for one- and two-character queries
+    are precomputed.
+    """
+
+    def __init__(self, stations):
+        """stations: iterable of (id, name)."""
+        entries = []
+        for station_id, name in stations:
+            normalized = normalize(name)
+            words = normalized.split(" ")
+            start = 0
+            for position, word in enumerate(words):
+                entries.append(
+                    (
+                        normalized[start:],
+                        (position > 0, len(normalized), name, station_id),
+                        station_id,
+                        name,
+                    )
+                )
+                start += len(word) + 1
+        entries.sort(key=lambda entry: entry[0])
+        self.keys = [entry[0] for entry in entries]
+        self.entries = [entry[1:] for entry in entries]
+        self.size = len({entry[2] for entry in entries})
+
+        short = {}
+        for key, *entry in entries:
+            for length in range(1, PRECOMPUTED_PREFIX_LENGTH + 1):
+                if len(key) >= length:
+                    short.setdefault(key[:length], []).append(entry)
+        self.precomputed = {
+            prefix: self._top(matches, MAX_RESULTS)
+            for prefix, matches in short.items()
+        }
+
+    def __len__(self):
+        return self.size
+
+    def search(self, query, limit=10):
+        """Return up to limit (id, name) pairs whose name or one of its
+        words starts with query."""
+        query = normalize(query)
+        if not query:
+            return []
+        if len(query) <= PRECOMPUTED_PREFIX_LENGTH and limit <= MAX_RESULTS:
+            return self.precomputed.get(query, [])[:limit]
+
+        start = bisect_left(self.keys, query)
+        end = bisect_left(self.keys, query + _LAST_CHARACTER, lo=start)
+        return self._top(self.entries[start:end], limit)
+
+    @staticmethod
+    def _top(matches, limit):
+        """matches: (rank, id, name) entries, possibly several per id."""
+        best = {}
+        for rank, station_id, name in matches:
+            if station_id not in best or rank < best[station_id][0]:
+                best[station_id] = (rank, station_id, name)
+        return [
+            (station_id, name)
+            for _, station_id, name in heapq.nsmallest(limit, best.values())
+        ]
+
+
+def load_station_name_index():
+    return StationNameIndex(
+        Station.objects.order_by().values_list("id", "name")
+    )
+
+
+# Rebuilt when stations change (see train_service.signals).
+station_name_index = VersionedValue(STATIONS_VERSION, load_station_name_index)
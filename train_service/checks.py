@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Backends whose entries other worker processes cannot see.
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+@register(Tags.caches, deploy=True)
+def check_idempotency_cache(app_configs, **kwargs):
+    """Idempotency-Key responses and in-progress markers are kept in the
+    default cache; with a per-process cache a retry handled by another
+    worker would book the order again."""
+    if settings.CACHES["default"]["BACKEND"] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Error(
+            "Idempotency keys on order creation need a cache shared by "
+            "all worker processes.",
+            hint="Set CACHE_BACKEND to a shared backend such as "
+            "django.core.cache.backends.redis.RedisCache, or silence "
+            "train_service.E001 when serving from a single process.",
+            id="train_service.E001",
+        )
+    ]
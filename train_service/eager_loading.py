@@ -0,0 +1,149 @@
+"""select_related / prefetch_related derived from a serializer's fields.
+
+Every readable field whose source crosses a relation is followed: forward
+foreign keys are joined, reverse and many-to-many relations prefetched,
+and nested serializers walked recursively. Fields that read related rows
+in ways the field tree does not show (StringRelatedField calling
+__str__, say) list them in Meta.related_lookups. A serializer that needs
+annotations defines annotate_queryset(queryset); relations rendered with
+it are prefetched so the annotations apply.
+"""
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _needs_related_object(field):
+    """Whether field reads the object at the end of its source, not
+    just one of its columns."""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return False
+    return isinstance(
+        field,
+        (
+            serializers.BaseSerializer,
+            serializers.RelatedField,
+            serializers.ManyRelatedField,
+        ),
+    )
+
+
+def _relation_chain(model, attrs):
+    """Follow attrs through relation fields of model.
+
+    Returns (lookup, related model, single-valued, whether every attr
+    was a relation), or None if attrs does not start with a relation.
+    """
+    walked = []
+    single = True
+    for attr in attrs:
+        try:
+            model_field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        if not model_field.is_relation:
+            break
+        walked.append(attr)
+        single = single and not (
+            model_field.many_to_many or model_field.one_to_many
+        )
+        model = model_field.related_model
+    if not walked:
+        return None
+    return "__".join(walked), model, single, len(walked) == len(attrs)
+
+
+def _prefixed(lookup, prefix):
+    if isinstance(lookup, Prefetch):
+        return Prefetch(
+            f"{prefix}__{lookup.prefetch_through}",
+            queryset=lookup.queryset,
+            to_attr=lookup.to_attr,
+        )
+    return f"{prefix}__{lookup}"
+
+
+def _nested(field):
+    if isinstance(field, serializers.ListSerializer):
+        return field.child
+    if isinstance(field, serializers.BaseSerializer):
+        return field
+    return None
+
+
+def related_lookups(serializer):
+    """Return (select_related, prefetch_related) lookups covering the
+    relations serializer reads from its Meta.model."""
+    meta = getattr(serializer, "Meta", None)
+    model = getattr(meta, "model", None)
+    if model is None:
+        return [], []
+
+    select, prefetch = [], []
+
+    def add(lookup, single):
+        target = select if single else prefetch
+        if lookup not in target:
+            target.append(lookup)
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+        attrs = field.source_attrs
+        if not _needs_related_object(field):
+            # Only the last attribute is read from the related row.
+            attrs = attrs[:-1]
+        chain = _relation_chain(model, attrs)
+        if chain is None:
+            continue
+        lookup, related_model, single, complete = chain
+
+        child = _nested(field) if complete else None
+        if child is None:
+            add(lookup, single)
+            continue
+
+        child_select, child_prefetch = related_lookups(child)
+        annotate = getattr(child, "annotate_queryset", None)
+        if single and annotate is None:
+            add(lookup, True)
+            for child_lookup in child_select:
+                add(f"{lookup}__{child_lookup}", True)
+            for child_lookup in child_prefetch:
+                prefetch.append(_prefixed(child_lookup, lookup))
+            continue
+
+        queryset = eager_load(related_model._default_manager.all(), child)
+        prefetch.append(Prefetch(lookup, queryset=queryset))
+
+    for extra in getattr(meta, "related_lookups", ()):
+        chain = _relation_chain(model, extra.split("__"))
+        if chain is not None:
+            add(chain[0], chain[2])
+
+    return select, prefetch
+
+
+def eager_load(queryset, serializer):
+    select, prefetch = related_lookups(serializer)
+    # select_related() without arguments would follow every foreign key.
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    annotate = getattr(serializer, "annotate_queryset", None)
+    if annotate is not None:
+        queryset = annotate(queryset)
+    return queryset
+
+
+class EagerLoadingMixin:
+    """Load what get_serializer_class() renders along with the queryset."""
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        serializer_class = self.get_serializer_class()
+        if not issubclass(serializer_class, serializers.ModelSerializer):
+            return queryset
+        return eager_load(queryset, serializer_class())
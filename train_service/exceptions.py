@@ -0,0 +1,24 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException, ErrorDetail
+
+
+class SeatsUnavailable(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Some of the requested seats are no longer available."
+    default_code = "seats_unavailable"
+
+    def __init__(self, tickets):
+        super().__init__()
+        self.detail = {
+            "detail": ErrorDetail(self.default_detail, self.default_code),
+            "unavailable_tickets": [
+                {"trip": trip_id, "cargo": cargo, "seat": seat}
+                for trip_id, cargo, seat in tickets
+            ],
+        }
+
+
+class NotEnoughSeats(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Not enough free seats left on this trip."
+    default_code = "not_enough_seats"
@@ -0,0 +1,201 @@
+"""Streaming exports of trips and orders with their tickets.
+
+Rows are read through server-side cursors (QuerySet.iterator) with the
+tickets prefetched per chunk, and encoded one record at a time, so memory
+stays flat however many rows an export covers. Each record is a trip or
+an order with a "tickets" list: one JSON object per line in NDJSON, one
+row per ticket (or a single row with empty ticket columns) in CSV.
+"""
+
+import csv
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import serializers
+
+from train_service.models import Order, Ticket, Trip, day_start
+from train_service.renderers import FastJSONRenderer
+
+CHUNK_SIZE = 2000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _datetime_formatter():
+    return serializers.DateTimeField(
+        default_timezone=(
+            timezone.get_current_timezone() if settings.USE_TZ else None
+        )
+    ).to_representation
+
+
+def _day_range(queryset, field, date_from, date_to):
+    if date_from:
+        start = day_start(date_from)
+        queryset = queryset.filter(**{f"{field}__gte": start})
+    if date_to:
+        end = day_start(date_to + timedelta(days=1))
+        queryset = queryset.filter(**{f"{field}__lt": end})
+    return queryset
+
+
+def trip_records(trip=None, date_from=None, date_to=None):
+    """Trips departing between date_from and date_to (inclusive) or the
+    single trip, in departure order, with their tickets."""
+    trips = Trip.objects.all()
+    if trip is not None:
+        trips = trips.filter(pk=trip)
+    trips = (
+        _day_range(trips, "departure_time", date_from, date_to)
+        .select_related("route__source", "route__destination", "train")
+        .defer("seat_map")
+        .prefetch_related(
+            Prefetch(
+                "tickets",
+                queryset=Ticket.objects.select_related("order").only(
+                    "id", "cargo", "seat", "trip_id", "order__user"
+                ),
+            )
+        )
+        .order_by("departure_time", "id")
+    )
+    to_datetime = _datetime_formatter()
+    for trip in trips.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": trip.id,
+            "source": trip.route.source.name,
+            "destination": trip.route.destination.name,
+            "departure_time": to_datetime(trip.departure_time),
+            "arrival_time": to_datetime(trip.arrival_time),
+            "train": trip.train.name,
+            "tickets_sold": trip.tickets_sold,
+            "tickets": [
+                {
+                    "id": ticket.id,
+                    "cargo": ticket.cargo,
+                    "seat": ticket.seat,
+                    "order": ticket.order_id,
+                    "user": ticket.order.user_id,
+                }
+                for ticket in trip.tickets.all()
+            ],
+        }
+
+
+def order_records(trip=None, date_from=None, date_to=None):
+    """Orders created between date_from and date_to (inclusive), or with
+    tickets for trip, oldest first, with their tickets."""
+    orders = Order.objects.all()
+    if trip is not None:
+        orders = orders.filter(
+            pk__in=Ticket.objects.filter(trip=trip).values("order")
+        )
+    orders = (
+        _day_range(orders, "created_at", date_from, date_to)
+        .prefetch_related(
+            Prefetch(
+                "tickets",
+                queryset=Ticket.objects.select_related("trip").only(
+                    "id",
+                    "cargo",
+                    "seat",
+                    "order_id",
+                    "trip__departure_time",
+                ),
+            )
+        )
+        .order_by("created_at", "id")
+    )
+    to_datetime = _datetime_formatter()
+    for order in orders.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "id": order.id,
+            "created_at": to_datetime(order.created_at),
+            "user": order.user_id,
+            "tickets": [
+                {
+                    "id": ticket.id,
+                    "trip": ticket.trip_id,
+                    "departure_time": to_datetime(
+                        ticket.trip.departure_time
+                    ),
+                    "cargo": ticket.cargo,
+                    "seat": ticket.seat,
+                }
+                for ticket in order.tickets.all()
+            ],
+        }
+
+
+TRIP_COLUMNS = (
+    "id",
+    "source",
+    "destination",
+    "departure_time",
+    "arrival_time",
+    "train",
+    "tickets_sold",
+)
+TRIP_TICKET_COLUMNS = ("id", "cargo", "seat", "order", "user")
+ORDER_COLUMNS = ("id", "created_at", "user")
+ORDER_TICKET_COLUMNS = ("id", "trip", "departure_time", "cargo", "seat")
+
+# name: (records, CSV columns, CSV ticket columns)
+DATASETS = {
+    "trips": (trip_records, TRIP_COLUMNS, TRIP_TICKET_COLUMNS),
+    "orders": (order_records, ORDER_COLUMNS, ORDER_TICKET_COLUMNS),
+}
+
+
+def to_ndjson(records, columns, ticket_columns):
+    renderer = FastJSONRenderer()
+    for record in records:
+        yield renderer.render(record) + b"\n"
+
+
+class _Echo:
+    """File-like object handing csv.writer rows straight back."""
+
+    def write(self, value):
+        return value
+
+
+def to_csv(records, columns, ticket_columns):
+    """One row per ticket, or one with empty ticket columns for records
+    without tickets. Ticket columns are prefixed with "ticket_"."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(
+        [*columns, *(f"ticket_{column}" for column in ticket_columns)]
+    ).encode()
+    no_tickets = [""] * len(ticket_columns)
+    for record in records:
+        values = [record[column] for column in columns]
+        if not record["tickets"]:
+            yield writer.writerow(values + no_tickets).encode()
+        for ticket in record["tickets"]:
+            yield writer.writerow(
+                values + [ticket[column] for column in ticket_columns]
+            ).encode()
+
+
+ENCODERS = {
+    "ndjson": to_ndjson,
+    "csv": to_csv,
+}
+
+
+def export(dataset, output_format, **filters):
+    """Yield the export of dataset in output_format as bytes chunks.
+
+    filters are trip, date_from and date_to, see trip_records() and
+    order_records().
+    """
+    records, columns, ticket_columns = DATASETS[dataset]
+    return ENCODERS[output_format](
+        records(**filters), columns, ticket_columns
+    )
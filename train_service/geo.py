@@ -0,0 +1,126 @@
+"""Nearest-station search over an in-process latitude/longitude grid."""
+
+import math
+from collections import defaultdict
+
+from train_service.models import Station
+from train_service.versions import VersionedValue, model_version_name
+
+STATIONS_VERSION = model_version_name(Station)
+
+EARTH_RADIUS_KM = 6371.0088
+HALF_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Great-circle distance in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationGrid:
+    """Stations bucketed into cell_size x cell_size degree cells.
+
+    A radius query only visits the cells overlapping the bounding box of
+    the search circle; a k-nearest query doubles the radius until it has
+    k stations, which is exact because every station inside the radius
+    is seen.
+    """
+
+    def __init__(self, stations, cell_size=0.5):
+        """stations: iterable of (id, latitude, longitude)."""
+        self.cell_size = cell_size
+        self.lon_cells = math.ceil(360 / cell_size)
+        self.cells = defaultdict(list)
+        for station in stations:
+            self.cells[self._cell(station[1], station[2])].append(station)
+        self.size = sum(len(cell) for cell in self.cells.values())
+
+    def __len__(self):
+        return self.size
+
+    def _cell(self, lat, lon):
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor((lon + 180) / self.cell_size) % self.lon_cells,
+        )
+
+    def within(self, lat, lon, radius):
+        """Return (distance, station) pairs within radius km, nearest
+        first."""
+        if radius >= HALF_CIRCUMFERENCE_KM:
+            candidates = (
+                station for cell in self.cells.values() for station in cell
+            )
+        else:
+            candidates = self._candidates(lat, lon, radius)
+
+        found = []
+        for station in candidates:
+            distance = haversine(lat, lon, station[1], station[2])
+            if distance <= radius:
+                found.append((distance, station))
+        found.sort()
+        return found
+
+    def _candidates(self, lat, lon, radius):
+        angle = radius / EARTH_RADIUS_KM
+        dlat = math.degrees(angle)
+        min_lat, max_lat = lat - dlat, lat + dlat
+        if min_lat <= -90 or max_lat >= 90:
+            # The circle covers a pole: every longitude is in range.
+            min_lon, max_lon = -180, 180
+        else:
+            dlon = math.degrees(
+                math.asin(min(1.0, math.sin(angle) / math.cos(
+                    math.radians(lat)
+                )))
+            )
+            min_lon, max_lon = lon - dlon, lon + dlon
+
+        lat_cells = range(
+            math.floor(max(min_lat, -90) / self.cell_size),
+            math.floor(min(max_lat, 90) / self.cell_size) + 1,
+        )
+        first_lon = math.floor((min_lon + 180) / self.cell_size)
+        last_lon = math.floor((max_lon + 180) / self.cell_size)
+        lon_cells = {
+            cell % self.lon_cells
+            for cell in range(
+                first_lon, min(last_lon, first_lon + self.lon_cells - 1) + 1
+            )
+        }
+        for lat_cell in lat_cells:
+            for lon_cell in lon_cells:
+                yield from self.cells.get((lat_cell, lon_cell), ())
+
+    def nearest(self, lat, lon, limit, radius=None, start_radius=25.0):
+        """Return up to limit (distance, station) pairs, nearest first,
+        optionally only within radius km."""
+        if radius is not None:
+            return self.within(lat, lon, radius)[:limit]
+
+        search_radius = start_radius
+        while True:
+            found = self.within(lat, lon, search_radius)
+            if (
+                len(found) >= limit
+                or len(found) == self.size
+                or search_radius >= HALF_CIRCUMFERENCE_KM
+            ):
+                return found[:limit]
+            search_radius *= 2
+
+
+def load_station_grid():
+    return StationGrid(
+        Station.objects.order_by().values_list("id", "latitude", "longitude")
+    )
+
+
+# Rebuilt when stations change (see train_service.signals).
+station_grid = VersionedValue(STATIONS_VERSION, load_station_grid)
@@ -0,0 +1,488 @@
+"""Import of GTFS timetables (https://gtfs.org/schedule/reference/).
+
+GTFS stops become stations (platforms are folded into their parent
+station), GTFS routes become trains and every run of a GTFS trip on a
+service day becomes a trip on the route between its first and last stop.
+
+Files are streamed row by row and written with batched bulk_create
+upserts keyed on the gtfs_id columns, so importing a feed again updates
+what it imported before instead of duplicating it; trips that already
+have tickets are not moved to another route or train. Only the trips and
+the first/last stop of each trip are held in memory, never stop_times.
+"""
+
+import csv
+import io
+import zipfile
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from train_service.geo import haversine
+from train_service.journeys import TIMETABLE_VERSION
+from train_service.models import (
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    Trip,
+)
+from train_service.seat_map import build_seat_map
+from train_service.versions import bump_version, model_version_name
+
+BATCH_SIZE = 5000
+
+# Basic GTFS route_type codes; extended types are grouped by hundreds.
+ROUTE_TYPES = {
+    0: "Tram",
+    1: "Subway",
+    2: "Rail",
+    3: "Bus",
+    4: "Ferry",
+    5: "Cable tram",
+    6: "Aerial lift",
+    7: "Funicular",
+    11: "Trolleybus",
+    12: "Monorail",
+}
+EXTENDED_ROUTE_TYPES = {
+    1: "Rail",
+    2: "Coach",
+    4: "Urban railway",
+    7: "Bus",
+    8: "Trolleybus",
+    9: "Tram",
+    10: "Water transport",
+    11: "Air",
+    12: "Ferry",
+    13: "Aerial lift",
+    14: "Funicular",
+    15: "Taxi",
+}
+
+WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+
+class GTFSError(Exception):
+    pass
+
+
+def route_type_name(value):
+    try:
+        code = int(value)
+    except (TypeError, ValueError):
+        return "Rail"
+    name = ROUTE_TYPES.get(code) or EXTENDED_ROUTE_TYPES.get(code // 100)
+    return name or f"Route type {code}"
+
+
+def parse_time(value):
+    """Seconds after the start of the service day; GTFS times may run
+    past 24:00:00 for trips ending after midnight."""
+    try:
+        hours, minutes, seconds = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise GTFSError(f"Invalid GTFS time {value!r}.")
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def parse_date(value):
+    return datetime.strptime(value, "%Y%m%d").date()
+
+
+def service_day_start(day, tz):
+    """GTFS times count from noon minus 12 hours, which is midnight
+    except on days when daylight saving time starts or ends."""
+    noon = datetime.combine(day, time(12), tzinfo=tz)
+    return noon.astimezone(ZoneInfo("UTC")) - timedelta(hours=12)
+
+
+class Feed:
+    """The .txt files of a GTFS feed in a directory or a zip file."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        if self.path.is_file():
+            self._zip = zipfile.ZipFile(self.path)
+            self._names = {
+                Path(name).name: name for name in self._zip.namelist()
+            }
+        elif self.path.is_dir():
+            self._zip = None
+        else:
+            raise GTFSError(f"No GTFS feed at {path}.")
+
+    def has(self, name):
+        if self._zip is not None:
+            return name in self._names
+        return (self.path / name).is_file()
+
+    def rows(self, name):
+        """Yield the rows of name as dicts with stripped values."""
+        if not self.has(name):
+            raise GTFSError(f"{name} is missing from the feed.")
+        if self._zip is not None:
+            raw = self._zip.open(self._names[name])
+        else:
+            raw = open(self.path / name, "rb")
+        # utf-8-sig drops the byte order mark some producers write.
+        with io.TextIOWrapper(raw, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                yield {
+                    key.strip(): (value or "").strip()
+                    for key, value in row.items()
+                    if key is not None
+                }
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+
+
+def _batches(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Importer:
+    """Load a Feed into the database.
+
+    service days from first_day to last_day (inclusive) are materialized
+    as trips, following calendar.txt and calendar_dates.txt when the
+    feed has them and running every trip every day otherwise. report is
+    called with progress messages.
+    """
+
+    def __init__(
+        self,
+        feed,
+        first_day,
+        last_day,
+        tz=None,
+        cargo_num=10,
+        places_in_cargo=50,
+        batch_size=BATCH_SIZE,
+        report=None,
+    ):
+        self.feed = feed
+        self.first_day = first_day
+        self.last_day = last_day
+        self.tz = tz or self.feed_timezone()
+        self.cargo_num = cargo_num
+        self.places_in_cargo = places_in_cargo
+        self.batch_size = batch_size
+        self.report = report or (lambda message: None)
+        self.stats = defaultdict(int)
+
+    def feed_timezone(self):
+        if self.feed.has("agency.txt"):
+            for agency in self.feed.rows("agency.txt"):
+                if agency.get("agency_timezone"):
+                    return ZoneInfo(agency["agency_timezone"])
+        return ZoneInfo(settings.TIME_ZONE)
+
+    def upsert(self, model, objects, update_fields, label):
+        saved = 0
+        for batch in _batches(objects, self.batch_size):
+            model.objects.bulk_create(
+                batch,
+                update_conflicts=True,
+                unique_fields=["gtfs_id"],
+                update_fields=update_fields,
+            )
+            saved += len(batch)
+            self.report(f"{label}: {saved:,} saved")
+        self.stats[label] += saved
+        return saved
+
+    def run(self):
+        stations = self.import_stops()
+        trains = self.import_routes()
+        trips = self.read_trips(trains)
+        endpoints = self.read_stop_times(trips, stations)
+        routes = self.import_station_pairs(endpoints, stations)
+        self.import_trips(trips, endpoints, routes)
+        return dict(self.stats)
+
+    def import_stops(self):
+        """Upsert stations; return {stop_id: (station gtfs_id, pk, lat,
+        lon)} with platforms mapped to their parent station."""
+        parents = {}
+        coordinates = {}
+
+        def stations():
+            for stop in self.feed.rows("stops.txt"):
+                if stop.get("location_type", "") not in ("", "0", "1"):
+                    continue  # entrances, nodes and boarding areas
+                stop_id = stop["stop_id"]
+                if stop.get("parent_station"):
+                    parents[stop_id] = stop["parent_station"]
+                    continue
+                try:
+                    lat = float(stop["stop_lat"])
+                    lon = float(stop["stop_lon"])
+                except (KeyError, ValueError):
+                    self.stats["stops skipped"] += 1
+                    continue
+                coordinates[stop_id] = (lat, lon)
+                yield Station(
+                    gtfs_id=stop_id,
+                    name=stop.get("stop_name", "")[:100] or stop_id,
+                    latitude=lat,
+                    longitude=lon,
+                )
+
+        self.upsert(
+            Station, stations(), ["name", "latitude", "longitude"], "stations"
+        )
+        pks = dict(
+            Station.objects.filter(gtfs_id__isnull=False).values_list(
+                "gtfs_id", "id"
+            )
+        )
+        stops = {
+            stop_id: (stop_id, pks[stop_id], *coordinates[stop_id])
+            for stop_id in coordinates
+        }
+        for stop_id, parent in parents.items():
+            if parent in stops:
+                stops[stop_id] = stops[parent]
+        return stops
+
+    def import_routes(self):
+        """Upsert one train per GTFS route; return {route_id: pk}."""
+        train_types = {}
+
+        def train_type(route):
+            name = route_type_name(route.get("route_type"))
+            if name not in train_types:
+                train_types[name] = TrainType.objects.get_or_create(
+                    name=name
+                )[0]
+            return train_types[name]
+
+        def trains():
+            for route in self.feed.rows("routes.txt"):
+                name = (
+                    route.get("route_short_name")
+                    or route.get("route_long_name")
+                    or route["route_id"]
+                )
+                yield Train(
+                    gtfs_id=route["route_id"],
+                    name=name[:100],
+                    cargo_num=self.cargo_num,
+                    places_in_cargo=self.places_in_cargo,
+                    train_type=train_type(route),
+                )
+
+        # Car layout is local data: set for new trains, then left alone.
+        self.upsert(Train, trains(), ["name", "train_type"], "trains")
+        return dict(
+            Train.objects.filter(gtfs_id__isnull=False).values_list(
+                "gtfs_id", "id"
+            )
+        )
+
+    def read_trips(self, trains):
+        """{trip_id: (train pk, service_id)} for trips of known routes."""
+        trips = {}
+        for trip in self.feed.rows("trips.txt"):
+            train = trains.get(trip["route_id"])
+            if train is None:
+                self.stats["trips skipped"] += 1
+                continue
+            trips[trip["trip_id"]] = (train, trip["service_id"])
+        self.report(f"trips.txt: {len(trips):,} trips")
+        return trips
+
+    def read_stop_times(self, trips, stops):
+        """{trip_id: [first stop, departure, last stop, arrival]} from
+        the lowest and highest stop_sequence of each trip."""
+        endpoints = {}
+        sequences = {}
+        for count, row in enumerate(self.feed.rows("stop_times.txt"), 1):
+            if count % 1_000_000 == 0:
+                self.report(f"stop_times.txt: {count:,} rows read")
+            trip_id = row["trip_id"]
+            stop = stops.get(row["stop_id"])
+            if trip_id not in trips or stop is None:
+                continue
+            sequence = int(row["stop_sequence"])
+            departure = row.get("departure_time") or row.get("arrival_time")
+            arrival = row.get("arrival_time") or row.get("departure_time")
+            if not departure:
+                continue  # an untimed intermediate stop
+            if trip_id not in endpoints:
+                endpoints[trip_id] = [
+                    stop,
+                    parse_time(departure),
+                    stop,
+                    parse_time(arrival),
+                ]
+                sequences[trip_id] = [sequence, sequence]
+                continue
+            first, last = sequences[trip_id]
+            if sequence < first:
+                endpoints[trip_id][:2] = stop, parse_time(departure)
+                sequences[trip_id][0] = sequence
+            if sequence > last:
+                endpoints[trip_id][2:] = stop, parse_time(arrival)
+                sequences[trip_id][1] = sequence
+        return endpoints
+
+    def import_station_pairs(self, endpoints, stops):
+        """Upsert a route per (first stop, last stop) pair; return
+        {route gtfs_id: pk}."""
+        pairs = {}
+        for source, _, destination, _ in endpoints.values():
+            if source[0] == destination[0]:
+                continue
+            gtfs_id = f"{source[0]}>{destination[0]}"
+            if gtfs_id not in pairs:
+                pairs[gtfs_id] = Route(
+                    gtfs_id=gtfs_id,
+                    source_id=source[1],
+                    destination_id=destination[1],
+                    distance=round(haversine(*source[2:], *destination[2:])),
+                )
+        self.upsert(
+            Route,
+            pairs.values(),
+            ["source", "destination", "distance"],
+            "routes",
+        )
+        return dict(
+            Route.objects.filter(gtfs_id__in=list(pairs)).values_list(
+                "gtfs_id", "id"
+            )
+        )
+
+    def service_days(self):
+        """{date: set of running service_ids}, or None if the feed has
+        no calendar."""
+        calendars = ("calendar.txt", "calendar_dates.txt")
+        if not any(self.feed.has(name) for name in calendars):
+            return None
+        days = {}
+        day = self.first_day
+        while day <= self.last_day:
+            days[day] = set()
+            day += timedelta(days=1)
+
+        if self.feed.has("calendar.txt"):
+            for service in self.feed.rows("calendar.txt"):
+                start = parse_date(service["start_date"])
+                end = parse_date(service["end_date"])
+                for day, running in days.items():
+                    if start <= day <= end and service.get(
+                        WEEKDAYS[day.weekday()]
+                    ) == "1":
+                        running.add(service["service_id"])
+        if self.feed.has("calendar_dates.txt"):
+            for exception in self.feed.rows("calendar_dates.txt"):
+                day = parse_date(exception["date"])
+                if day not in days:
+                    continue
+                if exception["exception_type"] == "1":
+                    days[day].add(exception["service_id"])
+                elif exception["exception_type"] == "2":
+                    days[day].discard(exception["service_id"])
+        return days
+
+    def booked_trips(self):
+        """{gtfs_id: (route pk, train pk)} of imported trips with tickets."""
+        return {
+            gtfs_id: (route, train)
+            for gtfs_id, route, train in Trip.objects.filter(
+                Exists(Ticket.objects.filter(trip=OuterRef("pk"))),
+                gtfs_id__isnull=False,
+            ).values_list("gtfs_id", "route", "train")
+        }
+
+    def import_trips(self, trips, endpoints, routes):
+        service_days = self.service_days()
+        trains = Train.objects.in_bulk({train for train, _ in trips.values()})
+        empty_seat_maps = {
+            pk: build_seat_map(train, []) for pk, train in trains.items()
+        }
+        booked = self.booked_trips()
+
+        def runs():
+            day = self.first_day
+            while day <= self.last_day:
+                start = service_day_start(day, self.tz)
+                running = service_days[day] if service_days else None
+                for trip_id, (train, service_id) in trips.items():
+                    if running is not None and service_id not in running:
+                        continue
+                    if trip_id not in endpoints:
+                        continue
+                    source, departure, destination, arrival = endpoints[
+                        trip_id
+                    ]
+                    route = routes.get(f"{source[0]}>{destination[0]}")
+                    if route is None:
+                        continue
+                    gtfs_id = f"{trip_id}@{day:%Y%m%d}"
+                    # The upsert keeps seat maps and tickets, which only
+                    # fit the route and train they were sold for.
+                    if booked.get(gtfs_id, (route, train)) != (route, train):
+                        self.stats["booked trips not moved"] += 1
+                        self.report(
+                            f"{gtfs_id}: has tickets, not moved to another "
+                            "route or train"
+                        )
+                        continue
+                    yield Trip(
+                        gtfs_id=gtfs_id,
+                        route_id=route,
+                        train_id=train,
+                        departure_time=start + timedelta(seconds=departure),
+                        arrival_time=start + timedelta(seconds=arrival),
+                        seat_map=empty_seat_maps[train],
+                    )
+                day += timedelta(days=1)
+
+        # Seat maps and counters are booking state: kept on update.
+        self.upsert(
+            Trip,
+            runs(),
+            ["route", "train", "departure_time", "arrival_time"],
+            "trips",
+        )
+
+
+def import_feed(path, first_day, last_day, **options):
+    """Import the GTFS feed at path (a directory or zip file) atomically;
+    return counts of saved and skipped rows."""
+    feed = Feed(path)
+    try:
+        with transaction.atomic():
+            return Importer(feed, first_day, last_day, **options).run()
+    finally:
+        feed.close()
+        # bulk_create sends no signals, so invalidate caches here.
+        for model in (Station, Route, TrainType, Train):
+            bump_version(model_version_name(model))
+        bump_version(TIMETABLE_VERSION)
@@ -0,0 +1,179 @@
+"""Earliest-arrival journey search over upcoming trips.
+
+Every Trip runs directly from its route source to its route destination,
+so each trip is one connection of the timetable. The search is a
+connection scan: connections are kept sorted by departure time and
+scanned once from the requested departure, tracking for every leg count
+the earliest arrival at each station.
+"""
+
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.utils import timezone
+
+from train_service.models import Trip
+from train_service.versions import VersionedValue
+
+TIMETABLE_VERSION = "timetable"
+
+_INFINITY = float("inf")
+
+
+class Timetable:
+    def __init__(self, connections):
+        """connections: iterable of
+        (trip_id, source_id, destination_id, departure_ts, arrival_ts)."""
+        connections = sorted(connections, key=lambda row: row[3])
+        self.trip_ids = [row[0] for row in connections]
+        self.departures = [row[3] for row in connections]
+        self.arrivals = [row[4] for row in connections]
+
+        self.station_index = {}
+        for row in connections:
+            for station_id in (row[1], row[2]):
+                self.station_index.setdefault(
+                    station_id, len(self.station_index)
+                )
+        self.sources = [self.station_index[row[1]] for row in connections]
+        self.destinations = [
+            self.station_index[row[2]] for row in connections
+        ]
+
+    def __len__(self):
+        return len(self.trip_ids)
+
+    def search(
+        self,
+        source_id,
+        destination_id,
+        departure_ts,
+        min_transfer=600,
+        max_transfers=2,
+        window=86400,
+        max_duration=86400,
+    ):
+        """Return itineraries as lists of trip ids.
+
+        One itinerary per leg count that arrives strictly earlier than
+        every itinerary with fewer legs, ordered by arrival time. The
+        first leg must depart within `window` seconds of departure_ts and
+        later legs within `max_duration` seconds after that.
+        """
+        source = self.station_index.get(source_id)
+        destination = self.station_index.get(destination_id)
+        if source is None or destination is None or source == destination:
+            return []
+
+        max_legs = max_transfers + 1
+        station_count = len(self.station_index)
+        # best[legs][station]: earliest arrival using at most `legs` legs.
+        best = [[_INFINITY] * station_count for _ in range(max_legs + 1)]
+        parent = [[None] * station_count for _ in range(max_legs + 1)]
+
+        departures = self.departures
+        arrivals = self.arrivals
+        sources = self.sources
+        destinations = self.destinations
+        last_boarding = departure_ts + window
+        last_departure = last_boarding + max_duration
+
+        for index in range(
+            bisect_left(departures, departure_ts), len(departures)
+        ):
+            departure = departures[index]
+            if departure >= best[1][destination] or (
+                departure > last_departure
+            ):
+                break
+            station = sources[index]
+
+            if station == source:
+                if departure > last_boarding:
+                    continue
+                first_leg = 1
+            else:
+                ready = departure - min_transfer
+                for first_leg in range(2, max_legs + 1):
+                    if best[first_leg - 1][station] <= ready:
+                        break
+                else:
+                    continue
+
+            arrival = arrivals[index]
+            target = destinations[index]
+            for legs in range(first_leg, max_legs + 1):
+                if arrival < best[legs][target]:
+                    best[legs][target] = arrival
+                    parent[legs][target] = index
+
+        itineraries = []
+        previous_arrival = _INFINITY
+        for legs in range(1, max_legs + 1):
+            arrival = best[legs][destination]
+            if arrival < previous_arrival:
+                itineraries.append(
+                    (arrival, self._path(parent, legs, source, destination))
+                )
+                previous_arrival = arrival
+        itineraries.sort(key=lambda itinerary: itinerary[0])
+        return [path for _, path in itineraries]
+
+    def _path(self, parent, legs, source, destination):
+        path = []
+        station = destination
+        while station != source:
+            index = parent[legs][station]
+            path.append(self.trip_ids[index])
+            station = self.sources[index]
+            legs -= 1
+        path.reverse()
+        return path
+
+
+def load_timetable():
+    rows = (
+        Trip.objects.filter(departure_time__gte=timezone.now())
+        .order_by()
+        .values_list(
+            "id",
+            "route__source_id",
+            "route__destination_id",
+            "departure_time",
+            "arrival_time",
+        )
+    )
+    return Timetable(
+        (
+            trip_id,
+            source_id,
+            destination_id,
+            departure_time.timestamp(),
+            arrival_time.timestamp(),
+        )
+        for trip_id, source_id, destination_id, departure_time, arrival_time
+        in rows.iterator(chunk_size=5000)
+    )
+
+
+# Rebuilt when trips or routes change (see train_service.signals) and
+# every hour, so departed trips are dropped.
+timetable = VersionedValue(
+    TIMETABLE_VERSION, load_timetable, lambda: timezone.now().hour
+)
+
+
+def search_journeys(
+    source_id,
+    destination_id,
+    departure,
+    min_transfer=timedelta(minutes=10),
+    max_transfers=2,
+):
+    return timetable.get().search(
+        source_id,
+        destination_id,
+        departure.timestamp(),
+        min_transfer=min_transfer.total_seconds(),
+        max_transfers=max_transfers,
+    )
@@ -0,0 +1,64 @@
+from argparse import ArgumentTypeError
+from datetime import date
+
+from django.core.management import BaseCommand, CommandError
+
+from train_service.exports import DATASETS, FORMATS, export
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid date {value!r}, use YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream trips or orders with their tickets as NDJSON or CSV, "
+        "to a file or stdout"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument(
+            "--format",
+            dest="output_format",
+            choices=sorted(FORMATS),
+            default="ndjson",
+        )
+        parser.add_argument("--trip", type=int, help="Only this trip.")
+        parser.add_argument(
+            "--from",
+            dest="date_from",
+            type=_date,
+            help="First day (inclusive), YYYY-MM-DD.",
+        )
+        parser.add_argument(
+            "--to",
+            dest="date_to",
+            type=_date,
+            help="Last day (inclusive), YYYY-MM-DD.",
+        )
+        parser.add_argument(
+            "-o", "--output", help="Output file (default: stdout)."
+        )
+
+    def handle(self, *args, **options):
+        date_from, date_to = options["date_from"], options["date_to"]
+        if date_from and date_to and date_from > date_to:
+            raise CommandError("--from cannot be after --to.")
+
+        chunks = export(
+            options["dataset"],
+            options["output_format"],
+            trip=options["trip"],
+            date_from=date_from,
+            date_to=date_to,
+        )
+        if options["output"]:
+            with open(options["output"], "wb") as output:
+                output.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk.decode(), ending="")
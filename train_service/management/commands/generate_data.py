@@ -0,0 +1,67 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from train_service.synthetic import EMAIL, PASSWORD, Sizes, generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-create a synthetic network, users, orders and tickets for "
+        "load testing. Sizes default to proportions of --tickets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tickets",
+            type=int,
+            default=1000,
+            help="Approximate number of tickets to sell.",
+        )
+        for name in ("stations", "routes", "trains", "trips", "users"):
+            parser.add_argument(f"--{name}", type=int)
+        parser.add_argument(
+            "--days",
+            type=int,
+            help="Spread departures over this many days from tomorrow.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        sizes = Sizes.for_tickets(
+            options["tickets"],
+            **{
+                name: options[name]
+                for name in (
+                    "stations",
+                    "routes",
+                    "trains",
+                    "trips",
+                    "users",
+                    "days",
+                )
+            },
+        )
+        if sizes.stations < 2 or sizes.trains < 1 or sizes.users < 1:
+            raise CommandError(
+                "Need at least 2 stations, 1 train and 1 user."
+            )
+        if get_user_model().objects.filter(email=EMAIL.format(0)).exists():
+            raise CommandError(
+                "Synthetic users already exist; flush the database first."
+            )
+        started = time.monotonic()
+
+        def report(message):
+            if options["verbosity"] >= 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"[{elapsed:7.1f}s] {message}")
+
+        generate(sizes, seed=options["seed"], report=report)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated in {time.monotonic() - started:.1f}s. Users "
+                f"are {EMAIL.format('<N>')} with password {PASSWORD!r}."
+            )
+        )
@@ -0,0 +1,101 @@
+import time
+from argparse import ArgumentTypeError
+from datetime import date, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.core.management import BaseCommand, CommandError
+from django.utils import timezone
+
+from train_service.gtfs import BATCH_SIZE, GTFSError, import_feed
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid date {value!r}, use YYYY-MM-DD")
+
+
+def _zone(value):
+    try:
+        return ZoneInfo(value)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ArgumentTypeError(f"unknown time zone {value!r}")
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a GTFS feed (directory or zip): stops as stations, routes "
+        "as trains and the runs of its trips on each service day as trips"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("feed", help="GTFS directory or zip file.")
+        parser.add_argument(
+            "--start",
+            type=_date,
+            help="First service day, YYYY-MM-DD (default: today).",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=1,
+            help="Number of service days to create trips for.",
+        )
+        parser.add_argument(
+            "--timezone",
+            type=_zone,
+            help="Time zone of the timetable (default: agency.txt, then "
+            "TIME_ZONE).",
+        )
+        parser.add_argument(
+            "--cargo-num",
+            type=int,
+            default=10,
+            help="Cars per train, for trains created by the import.",
+        )
+        parser.add_argument(
+            "--places-in-cargo",
+            type=int,
+            default=50,
+            help="Seats per car, for trains created by the import.",
+        )
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1.")
+        first_day = options["start"] or timezone.localdate()
+        last_day = first_day + timedelta(days=options["days"] - 1)
+        started = time.monotonic()
+
+        def report(message):
+            if options["verbosity"] >= 1:
+                elapsed = time.monotonic() - started
+                self.stdout.write(f"[{elapsed:7.1f}s] {message}")
+
+        try:
+            stats = import_feed(
+                options["feed"],
+                first_day,
+                last_day,
+                tz=options["timezone"],
+                cargo_num=options["cargo_num"],
+                places_in_cargo=options["places_in_cargo"],
+                batch_size=options["batch_size"],
+                report=report,
+            )
+        except GTFSError as error:
+            raise CommandError(error)
+        except KeyError as error:
+            raise CommandError(f"Missing GTFS column {error}.")
+
+        for label, count in stats.items():
+            self.stdout.write(f"{label}: {count:,}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {options['feed']} "
+                f"({first_day} to {last_day}) in "
+                f"{time.monotonic() - started:.1f}s."
+            )
+        )
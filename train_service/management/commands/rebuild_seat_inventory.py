@@ -0,0 +1,59 @@
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+
+from train_service.models import Trip
+from train_service.seat_map import build_seat_map
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild or verify the denormalized Trip.tickets_sold counters "
+        "and seat maps"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report mismatching trips, do not fix them.",
+        )
+
+    def handle(self, *args, **options):
+        mismatched = []
+        trips = Trip.objects.select_related("train").order_by("id")
+        for trip in trips.iterator(chunk_size=500):
+            seats = list(trip.tickets.values_list("cargo", "seat"))
+            try:
+                seat_map = build_seat_map(trip.train, seats)
+            except ValueError as exc:
+                mismatched.append(trip.id)
+                self.stderr.write(f"Trip {trip.id}: {exc} Not rebuilt.")
+                continue
+            if (
+                trip.tickets_sold == len(seats)
+                and bytes(trip.seat_map) == seat_map
+            ):
+                continue
+            mismatched.append(trip.id)
+            self.stdout.write(
+                f"Trip {trip.id}: counter {trip.tickets_sold}, "
+                f"actual {len(seats)}"
+            )
+            if not options["check"]:
+                with transaction.atomic():
+                    trip = Trip.lock(trip.id)
+                    if trip is None:
+                        continue
+                    trip.rebuild_seat_inventory()
+                    trip.save(update_fields=["seat_map", "tickets_sold"])
+
+        if options["check"] and mismatched:
+            raise CommandError(
+                f"{len(mismatched)} trip inventory(ies) out of sync."
+            )
+        if options["check"]:
+            self.stdout.write(self.style.SUCCESS("All trips in sync."))
+        else:
+            self.stdout.write(
+                self.style.SUCCESS(f"Rebuilt {len(mismatched)} trip(s).")
+            )
@@ -0,0 +1,151 @@
+"""Prometheus metrics and the /metrics endpoint.
+
+MetricsMiddleware counts requests and observes their latency and number
+of database queries per viewset and action; 429 responses are counted as
+throttled. Orders report their outcome and the seats they sold, and the
+response cache its hits and misses.
+
+With several worker processes (gunicorn, uwsgi), set
+PROMETHEUS_MULTIPROC_DIR to an empty directory writable by all workers
+before they start; each process then writes its samples to files there
+and /metrics aggregates them. Gunicorn should also call
+prometheus_client.multiprocess.mark_process_dead(worker.pid) from its
+child_exit hook. Without the variable, metrics are per process.
+"""
+
+import hmac
+import os
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+REQUESTS = Counter(
+    "train_service_requests",
+    "HTTP requests by viewset, action, method and status code.",
+    ["viewset", "action", "method", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "train_service_request_duration_seconds",
+    "Time from the request reaching the middleware to the response.",
+    ["viewset", "action"],
+    buckets=(
+        0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+    ),
+)
+REQUEST_QUERIES = Histogram(
+    "train_service_request_queries",
+    "Database queries per request.",
+    ["viewset", "action"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89),
+)
+THROTTLED = Counter(
+    "train_service_throttled_requests",
+    "Requests rejected by a throttle (429 responses).",
+    ["viewset", "action"],
+)
+ORDERS = Counter(
+    "train_service_orders",
+    "Order attempts by outcome: created, partial (some seats were "
+    "skipped) or conflict (seats no longer available).",
+    ["outcome"],
+)
+SEATS_SOLD = Counter(
+    "train_service_seats_sold",
+    "Tickets sold through orders.",
+)
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "train_service_response_cache_lookups",
+    "Response cache lookups by viewset basename and result (hit or miss).",
+    ["basename", "result"],
+)
+
+
+def record_order(outcome, seats=0):
+    ORDERS.labels(outcome).inc()
+    if seats:
+        SEATS_SOLD.inc(seats)
+
+
+def record_cache_lookup(basename, hit):
+    RESPONSE_CACHE_LOOKUPS.labels(basename, "hit" if hit else "miss").inc()
+
+
+def view_labels(request, view_func):
+    """(viewset, action) for a resolved view: the DRF view class and
+    viewset action (or HTTP method), else the URL name."""
+    cls = getattr(view_func, "cls", None)
+    if cls is None:
+        return request.resolver_match.view_name or "unnamed", ""
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None) or {}
+    return cls.__name__, actions.get(method, method)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        viewset, action = getattr(request, "_metrics_view", ("unmatched", ""))
+        REQUESTS.labels(
+            viewset, action, request.method, response.status_code
+        ).inc()
+        REQUEST_DURATION.labels(viewset, action).observe(duration)
+        REQUEST_QUERIES.labels(viewset, action).observe(queries[0])
+        if response.status_code == 429:
+            THROTTLED.labels(viewset, action).inc()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metrics_view = view_labels(request, view_func)
+
+
+def registry():
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        collected = CollectorRegistry()
+        multiprocess.MultiProcessCollector(collected)
+        return collected
+    return REGISTRY
+
+
+def metrics_view(request):
+    """Prometheus text exposition of all metrics for scrapers sending
+    METRICS_TOKEN as a bearer token; not found while it is unset."""
+    token = settings.METRICS_TOKEN
+    if not token:
+        raise Http404
+    # compare_digest only accepts ASCII str; WSGI decodes headers as
+    # latin-1.
+    if not hmac.compare_digest(
+        request.headers.get("Authorization", "").encode("latin-1"),
+        f"Bearer {token}".encode(),
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        generate_latest(registry()), content_type=CONTENT_TYPE_LATEST
+    )
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:33
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_tickets_sold(apps, schema_editor):
+    Trip = apps.get_model("train_service", "Trip")
+    trips = Trip.objects.annotate(sold=Count("tickets")).filter(sold__gt=0)
+    for trip in trips.iterator():
+        Trip.objects.filter(pk=trip.pk).update(tickets_sold=trip.sold)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "train_service",
+            "0004_alter_trip_arrival_time_alter_trip_departure_time",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="tickets_sold",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(
+            populate_tickets_sold, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+from train_service.seat_map import build_seat_map
+
+
+def populate_seat_map(apps, schema_editor):
+    Trip = apps.get_model("train_service", "Trip")
+    for trip in Trip.objects.select_related("train").iterator():
+        seats = trip.tickets.values_list("cargo", "seat")
+        Trip.objects.filter(pk=trip.pk).update(
+            seat_map=build_seat_map(trip.train, seats)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("train_service", "0005_trip_tickets_sold"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="trip",
+            name="seat_map",
+            field=models.BinaryField(default=b""),
+        ),
+        migrations.RunPython(populate_seat_map, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.4 on 2026-10-18 09:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("train_service", "0008_station_name_trigram_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["departure_time", "id"], name="trip_departure_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="trip",
+            index=models.Index(
+                fields=["route", "departure_time"], name="trip_route_departure_idx"
+            ),
+        ),
+    ]
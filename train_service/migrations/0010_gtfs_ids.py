@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2026-10-18 10:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("train_service", "0009_trip_departure_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="gtfs_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="station",
+            name="gtfs_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="train",
+            name="gtfs_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True, unique=True
+            ),
+        ),
+        migrations.AddField(
+            model_name="trip",
+            name="gtfs_id",
+            field=models.CharField(
+                blank=True, editable=False, max_length=255, null=True, unique=True
+            ),
+        ),
+    ]
@@ -1,12 +1,48 @@
+from datetime import datetime, time
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.functional import cached_property
 from rest_framework.exceptions import ValidationError
 
+from train_service.seat_map import (
+    build_seat_map,
+    in_layout,
+    is_valid,
+    mark_seats,
+    outside_layout,
+)
+
+
+def day_start(date):
+    """Midnight at the start of date in the current time zone."""
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+class StationQuerySet(models.QuerySet):
+    def ids_matching(self, name):
+        """Ids of stations whose name contains name, ignoring case.
+
+        On PostgreSQL the lookup is served by the pg_trgm GIN index on
+        UPPER(name) (see migration 0008); other backends scan the table.
+        """
+        return list(
+            self.filter(name__icontains=name).values_list("id", flat=True)
+        )
+
 
 class Station(models.Model):
     name = models.CharField(max_length=100)
     latitude = models.FloatField()
     longitude = models.FloatField()
+    gtfs_id = models.CharField(
+        max_length=255, unique=True, null=True, blank=True, editable=False
+    )
+
+    objects = StationQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.name} ({self.latitude}, {self.longitude})"
@@ -24,6 +60,9 @@ class Route(models.Model):
         related_name="destination_routes",
     )
     distance = models.PositiveIntegerField()
+    gtfs_id = models.CharField(
+        max_length=255, unique=True, null=True, blank=True, editable=False
+    )
 
     def __str__(self):
         return f"{self.source.name} - {self.destination.name}"
@@ -45,6 +84,9 @@ class Train(models.Model):
         on_delete=models.CASCADE,
         related_name="trains",
     )
+    gtfs_id = models.CharField(
+        max_length=255, unique=True, null=True, blank=True, editable=False
+    )
 
     @property
     def capacity(self):
@@ -66,6 +108,35 @@ class Crew(models.Model):
         return self.full_name
 
 
+class TripQuerySet(models.QuerySet):
+    def with_seats_held(self):
+        """Annotate seats_held (active holds) so tickets_available does
+        not need a query per trip."""
+        held = (
+            SeatHold.objects.active()
+            .filter(trip=models.OuterRef("pk"))
+            .order_by()
+            .values("trip")
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        )
+        return self.annotate(
+            seats_held=Coalesce(models.Subquery(held), 0)
+        )
+
+    def with_last_hold(self):
+        """Annotate last_hold_id, the newest active hold. Hold ids only
+        grow, so (seats_held, last_hold_id) changes whenever the set of
+        active holds does."""
+        last = (
+            SeatHold.objects.active()
+            .filter(trip=models.OuterRef("pk"))
+            .order_by("-pk")
+            .values("pk")[:1]
+        )
+        return self.annotate(last_hold_id=models.Subquery(last))
+
+
 class Trip(models.Model):
     route = models.ForeignKey(
         "Route",
@@ -79,6 +150,113 @@ class Trip(models.Model):
     )
     departure_time = models.DateTimeField()
     arrival_time = models.DateTimeField()
+    tickets_sold = models.PositiveIntegerField(default=0, editable=False)
+    seat_map = models.BinaryField(default=b"", editable=False)
+    gtfs_id = models.CharField(
+        max_length=255, unique=True, null=True, blank=True, editable=False
+    )
+
+    objects = TripQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Upcoming-trip lists and date ranges, in cursor order.
+            models.Index(
+                fields=["departure_time", "id"],
+                name="trip_departure_idx",
+            ),
+            # Station filters: matching routes, then their trips by time.
+            models.Index(
+                fields=["route", "departure_time"],
+                name="trip_route_departure_idx",
+            ),
+        ]
+
+    @cached_property
+    def seats_held(self):
+        return self.holds.active().count()
+
+    @property
+    def tickets_available(self):
+        return self.train.capacity - self.tickets_sold - self.seats_held
+
+    def get_seat_map(self):
+        seat_map = bytes(self.seat_map)
+        if not is_valid(seat_map, self.train):
+            # Tickets outside the layout (see check_layout) have no bit.
+            seat_map = build_seat_map(
+                self.train,
+                (
+                    seat
+                    for seat in self.tickets.values_list("cargo", "seat")
+                    if in_layout(self.train, *seat)
+                ),
+            )
+        return seat_map
+
+    def check_layout(self, train, error_to_raise):
+        """Raise error_to_raise unless every sold ticket fits train."""
+        if self.pk is None:
+            return
+        seats = outside_layout(
+            train, self.tickets.values_list("cargo", "seat")
+        )
+        if seats:
+            cargo, seat = seats[0]
+            raise error_to_raise(
+                {
+                    "train": f"{len(seats)} sold ticket(s) do not fit "
+                    f"{train.cargo_num} cargos with {train.places_in_cargo} "
+                    f"seats, e.g. seat {seat} in cargo {cargo}."
+                }
+            )
+
+    def clean(self):
+        if self.train_id is not None:
+            self.check_layout(self.train, DjangoValidationError)
+
+    def rebuild_seat_inventory(self):
+        seats = list(self.tickets.values_list("cargo", "seat"))
+        self.seat_map = build_seat_map(self.train, seats)
+        self.tickets_sold = len(seats)
+
+    @classmethod
+    def lock(cls, trip_id):
+        """Fetch the trip with its train, holding a row lock on the trip.
+        Must be called inside a transaction."""
+        return (
+            cls.objects.select_for_update(of=("self",))
+            .select_related("train")
+            .filter(pk=trip_id)
+            .first()
+        )
+
+    def take_seats(self, seats, taken=True):
+        """Mark seats as taken or released and adjust tickets_sold.
+        The trip row must be locked by the caller (see Trip.lock)."""
+        seat_map = bytes(self.seat_map)
+        if is_valid(seat_map, self.train):
+            self.seat_map = mark_seats(seat_map, self.train, seats, taken)
+            delta = len(seats) if taken else -len(seats)
+            self.tickets_sold = max(self.tickets_sold + delta, 0)
+        else:
+            self.rebuild_seat_inventory()
+        self.save(update_fields=["seat_map", "tickets_sold"])
+
+    @classmethod
+    def update_seat_inventory(cls, trip_id, seats, taken=True):
+        with transaction.atomic():
+            trip = cls.lock(trip_id)
+            if trip is not None:
+                trip.take_seats(seats, taken)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self.seat_map = build_seat_map(self.train, [])
+        elif kwargs.get("update_fields") is None:
+            # The train (and so the seat layout) may have changed.
+            self.rebuild_seat_inventory()
+        return super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Trip {self.route}. Train: {self.train.name}"
@@ -157,3 +335,39 @@ class Ticket(models.Model):
 
     def __str__(self):
         return f"{self.trip} - (cargo: {self.cargo}, seat: {self.seat})"
+
+
+class SeatHoldQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(expires_at__gt=timezone.now())
+
+    def expired(self):
+        return self.filter(expires_at__lte=timezone.now())
+
+
+class SeatHold(models.Model):
+    cargo = models.PositiveIntegerField()
+    seat = models.PositiveIntegerField()
+    trip = models.ForeignKey(
+        Trip,
+        on_delete=models.CASCADE,
+        related_name="holds",
+    )
+    user = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name="seat_holds",
+    )
+    expires_at = models.DateTimeField()
+
+    objects = SeatHoldQuerySet.as_manager()
+
+    class Meta:
+        unique_together = ("trip", "cargo", "seat")
+        ordering = ["cargo", "seat"]
+
+    def __str__(self):
+        return (
+            f"{self.trip} - (cargo: {self.cargo}, seat: {self.seat}) "
+            f"held until {self.expires_at}"
+        )
@@ -0,0 +1,9 @@
+from rest_framework import pagination
+
+
+class LimitOffsetPagination(pagination.LimitOffsetPagination):
+    """The default pagination, with ?limit capped like the cursor and
+    order paginations' page sizes, so one request cannot load a whole
+    table."""
+
+    max_limit = 100
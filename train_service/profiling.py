@@ -0,0 +1,316 @@
+"""Opt-in profiles of sampled, flagged and slow requests.
+
+With settings.PROFILING on, ProfilingMiddleware writes a profile of:
+
+* a random PROFILING_SAMPLE_RATE fraction of requests, and requests by
+  staff users sending "X-Profile: 1", run under cProfile. The header is
+  ignored unless the session or JWT user is staff, checked before the
+  profiler starts;
+* requests still running after PROFILING_SLOW_MS. One background thread
+  per process samples their stack every SAMPLE_INTERVAL seconds, so fast
+  requests only pay for registering themselves.
+
+Every profile lists the SQL the request executed with its timings and
+the EXPLAIN plans of the slowest SELECTs. SQL parameters and query
+string values can hold personal data: they are only used in memory for
+EXPLAIN and left out of the files (string literals in plans are masked)
+unless PROFILING_RECORD_VALUES is on. Profiles are written to
+PROFILING_DIR, readable by the owner only, as <name>.json (plus
+<name>.prof, loadable with pstats or snakeviz, for cProfile runs);
+beyond PROFILING_MAX_FILES the oldest are deleted.
+"""
+
+import cProfile
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.utils import timezone
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+logger = logging.getLogger(__name__)
+
+HEADER = "X-Profile"
+SAMPLE_INTERVAL = 0.01
+# Per-profile bounds on what is kept.
+MAX_QUERIES = 500
+MAX_STACKS = 200
+EXPLAIN_QUERIES = 5
+STATS_LINES = 60
+REDACTED = "<redacted>"
+SQL_STRING = re.compile(r"'(?:[^']|'')*'")
+
+
+class QueryLog:
+    """connection.execute_wrapper recording the executed SQL."""
+
+    def __init__(self):
+        self.count = 0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            if len(self.queries) < MAX_QUERIES:
+                self.queries.append(
+                    {
+                        "alias": context["connection"].alias,
+                        "sql": sql,
+                        "params": None if many else params,
+                        "ms": (time.perf_counter() - started) * 1000,
+                    }
+                )
+
+    def explain(self):
+        """Add the plan of the slowest distinct SELECTs to their entry."""
+        seen = set()
+        for query in sorted(self.queries, key=lambda q: -q["ms"]):
+            if len(seen) >= EXPLAIN_QUERIES:
+                break
+            if query["params"] is None or query["sql"] in seen:
+                continue
+            if not query["sql"].lstrip().upper().startswith("SELECT"):
+                continue
+            seen.add(query["sql"])
+            query["explain"] = explain(query)
+
+
+def explain(query):
+    connection = connections[query["alias"]]
+    prefix = connection.ops.explain_query_prefix()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{prefix} {query['sql']}", query["params"])
+            rows = cursor.fetchall()
+    except DatabaseError as exc:
+        return f"EXPLAIN failed: {exc}"
+    return "\n".join(" ".join(str(column) for column in row) for row in rows)
+
+
+def folded(frame):
+    """The stack of frame as "module:function;..." from the outside in,
+    the format flame graph tools read."""
+    names = []
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{frame.f_code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Sampler:
+    """Samples the stacks of tracked threads once they pass a deadline."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.lock = threading.Lock()
+        # thread id: (deadline, Counter of folded stacks)
+        self.active = {}
+        self.pid = None
+
+    def track(self, thread_id, deadline):
+        self.start()
+        stacks = Counter()
+        with self.lock:
+            self.active[thread_id] = (deadline, stacks)
+        return stacks
+
+    def untrack(self, thread_id):
+        with self.lock:
+            self.active.pop(thread_id, None)
+
+    def start(self):
+        # Threads do not survive a fork: start one per worker process.
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            threading.Thread(
+                target=self.run, name="profiling-sampler", daemon=True
+            ).start()
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            self.sample()
+
+    def sample(self):
+        now = time.perf_counter()
+        with self.lock:
+            due = [
+                (thread_id, stacks)
+                for thread_id, (deadline, stacks) in self.active.items()
+                if now >= deadline
+            ]
+            if not due:
+                return
+            frames = sys._current_frames()
+            for thread_id, stacks in due:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = folded(frame)
+                if stack not in stacks and len(stacks) >= MAX_STACKS:
+                    stack = "(other)"
+                stacks[stack] += 1
+
+
+_sampler = Sampler()
+
+
+def stats_text(profiler):
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats("cumulative").print_stats(STATS_LINES)
+    return out.getvalue()
+
+
+def redact(profile):
+    """Drop the values of SQL parameters, string literals in plans and
+    query string parameters from profile."""
+    for query in profile["queries"]:
+        query.pop("params")
+        if "explain" in query:
+            query["explain"] = SQL_STRING.sub("'?'", query["explain"])
+    profile["query"] = {name: [REDACTED] for name in profile["query"]}
+
+
+def private_file(path, mode):
+    """open(path, mode) creating the file readable by its owner only."""
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    return os.fdopen(os.open(path, flags, 0o600), mode)
+
+
+def rotate(directory, max_files):
+    """Delete the oldest profiles beyond max_files."""
+    profiles = sorted(directory.glob("*.json"))
+    for path in profiles[: max(len(profiles) - max_files, 0)]:
+        path.unlink(missing_ok=True)
+        path.with_suffix(".prof").unlink(missing_ok=True)
+
+
+def is_staff(request):
+    """Whether the session or JWT user of request is staff. DRF only
+    authenticates in the view, so the JWT is checked here."""
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return user.is_staff
+    try:
+        authenticated = JWTAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return authenticated is not None and authenticated[0].is_staff
+
+
+class ProfilingMiddleware:
+    """Profile requests when settings.PROFILING is on.
+
+    Place it below AuthenticationMiddleware (for the session user) and
+    the timing and metrics middleware, so their numbers do not include
+    the profiler's overhead.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PROFILING:
+            return self.get_response(request)
+
+        reason = None
+        if request.headers.get(HEADER) == "1" and is_staff(request):
+            reason = "header"
+        elif random.random() < settings.PROFILING_SAMPLE_RATE:
+            reason = "sampled"
+
+        queries = QueryLog()
+        profiler = cProfile.Profile() if reason else None
+        stacks = None
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            if profiler is not None:
+                profiler.enable()
+                stack.callback(profiler.disable)
+            elif settings.PROFILING_SLOW_MS:
+                thread_id = threading.get_ident()
+                stacks = _sampler.track(
+                    thread_id, started + settings.PROFILING_SLOW_MS / 1000
+                )
+                stack.callback(_sampler.untrack, thread_id)
+            response = self.get_response(request)
+        duration = (time.perf_counter() - started) * 1000
+
+        if (
+            reason is None
+            and settings.PROFILING_SLOW_MS
+            and duration >= settings.PROFILING_SLOW_MS
+        ):
+            reason = "slow"
+        if reason is None:
+            return response
+
+        name = self.save(
+            request, response, reason, duration, queries, profiler, stacks
+        )
+        if reason == "header":
+            response["X-Profile-Id"] = name
+        return response
+
+    @staticmethod
+    def save(request, response, reason, duration, queries, profiler, stacks):
+        queries.explain()
+        profile = {
+            "reason": reason,
+            "at": timezone.now().isoformat(),
+            "method": request.method,
+            "path": request.path,
+            "query": dict(request.GET.lists()),
+            "status": response.status_code,
+            "duration_ms": round(duration, 1),
+            "query_count": queries.count,
+            "queries": queries.queries,
+        }
+        if stacks:
+            profile["stacks"] = dict(stacks.most_common())
+        if profiler is not None:
+            profile["stats"] = stats_text(profiler)
+        if not settings.PROFILING_RECORD_VALUES:
+            redact(profile)
+
+        directory = Path(settings.PROFILING_DIR)
+        # Names sort by time, which rotate() relies on.
+        name = (
+            f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 10**9:09}"
+            f"-{uuid.uuid4().hex[:6]}"
+        )
+        try:
+            directory.mkdir(mode=0o700, parents=True, exist_ok=True)
+            with private_file(directory / f"{name}.json", "w") as f:
+                json.dump(profile, f, indent=1, default=str)
+            if profiler is not None:
+                # What profiler.dump_stats() writes.
+                profiler.create_stats()
+                with private_file(directory / f"{name}.prof", "wb") as f:
+                    marshal.dump(profiler.stats, f)
+            rotate(directory, settings.PROFILING_MAX_FILES)
+        except OSError:
+            logger.exception("Could not write profile %s", name)
+        return name
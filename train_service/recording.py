@@ -0,0 +1,119 @@
+"""Record API traffic as sanitized JSON lines for benchmarks.replay.
+
+With settings.TRAFFIC_RECORD_FILE set, TrafficRecorderMiddleware appends
+one line per request under /api/, e.g.
+
+    {"t": 1736500000.25, "method": "POST",
+     "path": "/api/train_service/orders/", "query": {"partial": ["true"]},
+     "body": {"tickets": [{"trip": 12, "cargo": 1, "seat": 5}]},
+     "user": "user", "status": 201, "ms": 35.2}
+
+JSON bodies keep their shape, numbers, booleans and nulls (the ids and
+seats a replay needs); every string is replaced with "<str>", so names,
+emails and passwords are never written. Other bodies are only recorded
+by content type. Query parameters whose name looks like a credential are
+redacted. user is "anonymous", "user" or "staff".
+"""
+
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "/api/"
+MAX_BODY = 64 * 1024
+STRING = "<str>"
+REDACTED = "<redacted>"
+SENSITIVE = ("password", "token", "secret", "key", "email")
+
+
+def shape(value):
+    """value with every string replaced by STRING."""
+    if isinstance(value, dict):
+        return {key: shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [shape(item) for item in value]
+    if isinstance(value, str):
+        return STRING
+    return value
+
+
+def sanitized_query(query_dict):
+    return {
+        name: (
+            [REDACTED]
+            if any(word in name.lower() for word in SENSITIVE)
+            else values
+        )
+        for name, values in query_dict.lists()
+    }
+
+
+def user_class(user):
+    if user is None or not user.is_authenticated:
+        return "anonymous"
+    return "staff" if user.is_staff else "user"
+
+
+def append_line(path, record):
+    line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+    # One write() on an O_APPEND descriptor keeps lines from concurrent
+    # workers whole.
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode())
+        finally:
+            os.close(fd)
+    except OSError:
+        logger.exception("Could not record request to %s", path)
+
+
+class TrafficRecorderMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        path = settings.TRAFFIC_RECORD_FILE
+        if not path or not request.path.startswith(PREFIX):
+            return self.get_response(request)
+
+        # Read before the view: the body cannot be read once DRF has
+        # consumed the stream.
+        body = self.body(request)
+        at = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        record = {
+            "t": round(at, 3),
+            "method": request.method,
+            "path": request.path,
+            "query": sanitized_query(request.GET),
+            **body,
+            "user": user_class(getattr(request, "user", None)),
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+        }
+        append_line(path, record)
+        return response
+
+    @staticmethod
+    def body(request):
+        if request.content_type == "application/json":
+            length = request.META.get("CONTENT_LENGTH") or 0
+            try:
+                length = int(length)
+            except ValueError:
+                length = 0
+            if 0 < length <= MAX_BODY:
+                try:
+                    return {"body": shape(json.loads(request.body))}
+                except ValueError:
+                    pass
+        if request.content_type and request.META.get("CONTENT_LENGTH"):
+            return {"content_type": request.content_type}
+        return {}
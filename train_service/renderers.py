@@ -0,0 +1,124 @@
+"""JSON rendering through orjson, when it is installed.
+
+orjson encodes dicts, lists, strings, numbers, datetimes and UUIDs in C;
+everything else (Decimal, lazy translations, querysets, ...) goes through
+DRF's encoder. Without orjson the renderer is DRF's JSONRenderer.
+
+StreamingListMixin streams whole lists from the database for staff
+clients that opt out of pagination.
+"""
+
+import decimal
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from rest_framework.exceptions import PermissionDenied
+from rest_framework.utils.encoders import JSONEncoder
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+# Escaped like DRF does, so the output stays a strict JavaScript subset.
+_LINE_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    return JSONEncoder().default(obj)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """DRF's JSONRenderer output, encoded by orjson.
+
+    Pretty-printed output (?indent / the browsable API) and running
+    without orjson fall back to DRF's encoder. Datetimes in the data are
+    written with full microseconds and a Z suffix for UTC.
+    """
+
+    def dumps(self, data):
+        content = orjson.dumps(
+            data,
+            default=_default,
+            option=orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS,
+        )
+        for separator, escaped in _LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or orjson is None
+            or self.get_indent(accepted_media_type, renderer_context or {})
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.dumps(data)
+
+    def render_list(self, chunks):
+        """Yield one JSON array holding the items of the lists in chunks,
+        rendered a list at a time."""
+        separator = b"["
+        for chunk in chunks:
+            if chunk:
+                yield separator + self.render(chunk)[1:-1]
+                separator = b","
+        yield b"[]" if separator == b"[" else b"]"
+
+
+class StreamingListMixin:
+    """Answer list requests with ?pagination=none with the whole filtered
+    list, streamed.
+
+    Rows are read with QuerySet.iterator(), so on PostgreSQL through a
+    server-side cursor, and serialized and encoded stream_chunk_size at a
+    time; memory use does not depend on the length of the list. Only
+    staff may list without pagination.
+    """
+
+    stream_chunk_size = 500
+
+    def streams_list(self):
+        return (
+            self.action == "list"
+            and self.request.query_params.get("pagination") == "none"
+        )
+
+    def is_conditional(self, request):
+        # Neither cached nor given an ETag: the body is never in memory.
+        return not self.streams_list() and super().is_conditional(request)
+
+    def serialize_rows(self, rows):
+        return self.get_serializer(rows, many=True).data
+
+    def stream_list(self, queryset, serialize=None):
+        """StreamingHttpResponse of queryset, serialized by serialize(rows)
+        (serialize_rows() by default)."""
+        if not self.request.user.is_staff:
+            raise PermissionDenied("Only staff can list without pagination.")
+        renderer = FastJSONRenderer()
+        return StreamingHttpResponse(
+            renderer.render_list(
+                self.serialized_chunks(
+                    queryset, serialize or self.serialize_rows
+                )
+            ),
+            content_type=renderer.media_type,
+        )
+
+    def serialized_chunks(self, queryset, serialize):
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        while chunk := list(islice(rows, self.stream_chunk_size)):
+            yield serialize(chunk)
+
+    def list(self, request, *args, **kwargs):
+        if self.streams_list():
+            return self.stream_list(self.filter_queryset(self.get_queryset()))
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,124 @@
+"""Versioned cache and conditional GETs of read-only responses.
+
+Keys and ETags combine the request URL with the version token of every
+model the response is built from (see train_service.versions), so a write
+to any of those tables makes the old entries unreachable instead of
+having to find and delete them.
+"""
+
+import hashlib
+from functools import partial
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from train_service.metrics import record_cache_lookup
+from train_service.versions import get_version, model_version_name
+
+
+def request_fingerprint(request, *parts):
+    """Hash of the request URL, with the query sorted, and parts."""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    url = f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+    return hashlib.sha256(
+        "|".join([url, *map(str, parts)]).encode()
+    ).hexdigest()
+
+
+def model_versions(models):
+    return ":".join(get_version(model_version_name(model)) for model in models)
+
+
+class ConditionalGetMixin:
+    """Answer GETs of the conditional_actions with 304 Not Modified when
+    If-None-Match holds the ETag from get_etag().
+
+    get_etag() must be cheap next to the action itself: it runs before
+    the queryset is evaluated and the response is serialized.
+    """
+
+    conditional_actions = ("list", "retrieve")
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        # Authentication, permissions and throttling have run; DRF looks
+        # up the handler only after this returns.
+        if self.is_conditional(request):
+            self.get = self.wrap_handler(self.get)
+
+    def is_conditional(self, request):
+        return (
+            self.action in self.conditional_actions
+            and request.method == "GET"
+        )
+
+    def wrap_handler(self, handler):
+        return partial(self.conditional_response, handler)
+
+    def get_etag(self, request):
+        """Return a validator for the response, or None to skip."""
+        return None
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag = self.get_etag(request)
+        if etag is None:
+            return handler(request, *args, **kwargs)
+
+        # Representations differ per renderer, and so must their ETags.
+        etag = quote_etag(f"{etag}-{request.accepted_renderer.format}")
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            response["ETag"] = etag
+        return response
+
+
+class CachedResponseMixin(ConditionalGetMixin):
+    """Serve the conditional_actions of a viewset from the cache, with
+    the cache key doubling as the ETag.
+
+    cache_models must name every model whose rows end up in the response,
+    including related ones rendered through nested or slug fields.
+    """
+
+    cache_models = ()
+    _fingerprint = None
+
+    def wrap_handler(self, handler):
+        return super().wrap_handler(partial(self.cached_response, handler))
+
+    def get_etag(self, request):
+        # Viewsets are created per request, so this reads versions once.
+        if self._fingerprint is None:
+            self._fingerprint = request_fingerprint(
+                request, model_versions(self.cache_models)
+            )
+        return self._fingerprint
+
+    def get_response_cache_key(self, request):
+        etag = self.get_etag(request)
+        return f"response:{self.basename}:{self.action}:{etag}"
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_response_cache_key(request)
+        data = cache.get(key)
+        if data is not None:
+            record_cache_lookup(self.basename, hit=True)
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+            return response
+
+        record_cache_lookup(self.basename, hit=False)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RESPONSE_CACHE_TIMEOUT)
+        response["X-Cache"] = "MISS"
+        return response
@@ -0,0 +1,107 @@
+"""Pick seats for a party from a trip seat map (see train_service.seat_map).
+
+Each cargo is handled as a Python int with one bit per free seat, so runs
+of free seats are found with a few big-int operations per run instead of
+a loop over every seat.
+"""
+
+from train_service.seat_map import cargo_size
+
+
+def _free_seats(seat_map, train, cargo):
+    size = cargo_size(train)
+    offset = (cargo - 1) * size
+    taken = int.from_bytes(seat_map[offset:offset + size], "little")
+    return ~taken & ((1 << train.places_in_cargo) - 1)
+
+
+def free_runs(free):
+    """Yield (first_seat, length) for every run of set bits in free."""
+    seat = 1
+    while free:
+        gap = (free & -free).bit_length() - 1
+        free >>= gap
+        seat += gap
+        length = (free ^ (free + 1)).bit_length() - 1
+        yield seat, length
+        free >>= length
+        seat += length
+
+
+def _take(runs, count):
+    seats = []
+    for first_seat, length in sorted(runs, key=lambda run: -run[1]):
+        take = min(length, count - len(seats))
+        seats.extend(range(first_seat, first_seat + take))
+        if len(seats) == count:
+            break
+    return seats
+
+
+def assign_seats(seat_map, train, count):
+    """Return count (cargo, seat) pairs, or None if the trip is too full.
+
+    Preference order: a single contiguous block (the smallest run that
+    fits, so large runs stay available for large parties), then a single
+    cargo using as few runs as possible, then the emptiest cargos.
+    """
+    runs_by_cargo = {
+        cargo: list(free_runs(_free_seats(seat_map, train, cargo)))
+        for cargo in range(1, train.cargo_num + 1)
+    }
+
+    best_fit = min(
+        (
+            (length, cargo, first_seat)
+            for cargo, runs in runs_by_cargo.items()
+            for first_seat, length in runs
+            if length >= count
+        ),
+        default=None,
+    )
+    if best_fit:
+        _, cargo, first_seat = best_fit
+        return [
+            (cargo, seat) for seat in range(first_seat, first_seat + count)
+        ]
+
+    free_by_cargo = {
+        cargo: sum(length for _, length in runs)
+        for cargo, runs in runs_by_cargo.items()
+    }
+    if sum(free_by_cargo.values()) < count:
+        return None
+
+    candidates = [
+        cargo for cargo, free in free_by_cargo.items() if free >= count
+    ]
+    if candidates:
+        cargo = min(
+            candidates,
+            key=lambda cargo: (
+                _runs_needed(runs_by_cargo[cargo], count),
+                cargo,
+            ),
+        )
+        return [
+            (cargo, seat)
+            for seat in sorted(_take(runs_by_cargo[cargo], count))
+        ]
+
+    seats = []
+    for cargo in sorted(free_by_cargo, key=lambda c: -free_by_cargo[c]):
+        picked = _take(runs_by_cargo[cargo], count - len(seats))
+        seats.extend((cargo, seat) for seat in sorted(picked))
+        if len(seats) == count:
+            break
+    return sorted(seats)
+
+
+def _runs_needed(runs, count):
+    needed = 0
+    for _, length in sorted(runs, key=lambda run: -run[1]):
+        needed += 1
+        count -= length
+        if count <= 0:
+            break
+    return needed
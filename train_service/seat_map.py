@@ -0,0 +1,90 @@
+"""Bitset helpers for Trip.seat_map.
+
+Every cargo takes ceil(places_in_cargo / 8) bytes, cargos are stored one
+after another, and seat N of a cargo is bit (N - 1) counted from the
+least significant bit of the cargo's first byte.
+"""
+
+import base64
+
+
+def cargo_size(train):
+    return (train.places_in_cargo + 7) // 8
+
+
+def seat_map_size(train):
+    return train.cargo_num * cargo_size(train)
+
+
+def in_layout(train, cargo, seat):
+    return 1 <= cargo <= train.cargo_num and 1 <= seat <= train.places_in_cargo
+
+
+def outside_layout(train, seats):
+    return [
+        (cargo, seat)
+        for cargo, seat in seats
+        if not in_layout(train, cargo, seat)
+    ]
+
+
+def _bit_position(train, cargo, seat):
+    # An unchecked seat would land in another cargo's bits or past the
+    # end of the map.
+    if not in_layout(train, cargo, seat):
+        raise ValueError(
+            f"Seat {seat} in cargo {cargo} is outside the layout of "
+            f"{train.cargo_num} cargos with {train.places_in_cargo} seats."
+        )
+    index = (cargo - 1) * cargo_size(train) + (seat - 1) // 8
+    return index, 1 << ((seat - 1) % 8)
+
+
+def build_seat_map(train, seats):
+    seat_map = bytearray(seat_map_size(train))
+    for cargo, seat in seats:
+        index, mask = _bit_position(train, cargo, seat)
+        seat_map[index] |= mask
+    return bytes(seat_map)
+
+
+def mark_seats(seat_map, train, seats, taken=True):
+    seat_map = bytearray(seat_map)
+    for cargo, seat in seats:
+        index, mask = _bit_position(train, cargo, seat)
+        if taken:
+            seat_map[index] |= mask
+        else:
+            seat_map[index] &= ~mask
+    return bytes(seat_map)
+
+
+def is_taken(seat_map, train, cargo, seat):
+    index, mask = _bit_position(train, cargo, seat)
+    return bool(seat_map[index] & mask)
+
+
+def is_valid(seat_map, train):
+    return seat_map is not None and len(seat_map) == seat_map_size(train)
+
+
+def encode_seat_map(seat_map, train):
+    """Return one base64 string per cargo."""
+    size = cargo_size(train)
+    return [
+        base64.b64encode(seat_map[offset:offset + size]).decode("ascii")
+        for offset in range(0, seat_map_size(train), size)
+    ]
+
+
+def taken_seats(seat_map, train):
+    size = cargo_size(train)
+    seats = []
+    for cargo in range(1, train.cargo_num + 1):
+        offset = (cargo - 1) * size
+        for index, byte in enumerate(seat_map[offset:offset + size]):
+            while byte:
+                low_bit = byte & -byte
+                seats.append((cargo, index * 8 + low_bit.bit_length()))
+                byte ^= low_bit
+    return seats
@@ -1,6 +1,14 @@
-from django.db import transaction
+from collections import defaultdict
+from datetime import datetime
+from functools import partial
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
-from rest_framework.exceptions import ValidationError
+from rest_framework.exceptions import NotFound, ValidationError
 
 from train_service.models import (
     Station,
@@ -10,7 +18,21 @@ from train_service.models import (
     Crew,
     Trip,
     Order,
-    Ticket
+    Ticket,
+    SeatHold,
+)
+from train_service.autocomplete import (
+    MAX_RESULTS as MAX_AUTOCOMPLETE_RESULTS,
+)
+from train_service.exports import FORMATS as EXPORT_FORMATS
+from train_service.exceptions import NotEnoughSeats, SeatsUnavailable
+from train_service.metrics import record_order
+from train_service.seat_assignment import assign_seats
+from train_service.seat_map import (
+    encode_seat_map,
+    is_taken,
+    mark_seats,
+    taken_seats,
 )
 
 
@@ -25,6 +47,37 @@ class StationSerializer(serializers.ModelSerializer):
         )
 
 
+class StationDistanceSerializer(StationSerializer):
+    distance = serializers.FloatField(
+        read_only=True, help_text="Distance in kilometres."
+    )
+
+    class Meta(StationSerializer.Meta):
+        fields = StationSerializer.Meta.fields + ("distance",)
+
+
+class NearbyStationsSearchSerializer(serializers.Serializer):
+    lat = serializers.FloatField(min_value=-90, max_value=90)
+    lon = serializers.FloatField(min_value=-180, max_value=180)
+    radius = serializers.FloatField(
+        min_value=0, required=False, help_text="Radius in kilometres."
+    )
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+
+class StationNameSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Station
+        fields = ("id", "name")
+
+
+class StationAutocompleteSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100, help_text="Name prefix.")
+    limit = serializers.IntegerField(
+        min_value=1, max_value=MAX_AUTOCOMPLETE_RESULTS, default=10
+    )
+
+
 class RouteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Route
@@ -95,10 +148,19 @@ class TripSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, attrs):
-        if attrs.get("departure_time") >= attrs.get("arrival_time"):
+        # Partial updates fall back to the trip's current times.
+        departure_time, arrival_time = (
+            attrs.get(name, getattr(self.instance, name, None))
+            for name in ("departure_time", "arrival_time")
+        )
+        if departure_time >= arrival_time:
             raise serializers.ValidationError(
                 "Departure time must be before arrival time."
             )
+        if self.instance is not None and "train" in attrs:
+            self.instance.check_layout(
+                attrs["train"], serializers.ValidationError
+            )
         return attrs
 
 
@@ -122,9 +184,77 @@ class TripListSerializer(TripSerializer):
             "train_capacity",
             "tickets_available"
         )
+        # Route.__str__ reads both stations.
+        related_lookups = ("route__source", "route__destination")
+
+    @staticmethod
+    def annotate_queryset(queryset):
+        return queryset.with_seats_held()
+
+    @staticmethod
+    def project(queryset):
+        """Only the columns to_representation_rows() needs, as dicts."""
+        return queryset.with_seats_held().values(
+            "id",
+            "departure_time",
+            "arrival_time",
+            "tickets_sold",
+            "seats_held",
+            source_name=F("route__source__name"),
+            destination_name=F("route__destination__name"),
+            train_name=F("train__name"),
+            cargo_num=F("train__cargo_num"),
+            places_in_cargo=F("train__places_in_cargo"),
+        )
+
+    @staticmethod
+    def to_representation_rows(rows):
+        """The output of TripListSerializer(many=True) for rows from
+        project(), without building model instances or bound fields."""
+        # Resolve the time zone once rather than per value.
+        to_datetime = serializers.DateTimeField(
+            default_timezone=(
+                timezone.get_current_timezone() if settings.USE_TZ else None
+            )
+        ).to_representation
+        data = []
+        for row in rows:
+            capacity = row["cargo_num"] * row["places_in_cargo"]
+            data.append(
+                {
+                    "id": row["id"],
+                    "route": (
+                        f"{row['source_name']} - {row['destination_name']}"
+                    ),
+                    "departure_time": to_datetime(row["departure_time"]),
+                    "arrival_time": to_datetime(row["arrival_time"]),
+                    "train_name": row["train_name"],
+                    "train_capacity": capacity,
+                    "tickets_available": (
+                        capacity - row["tickets_sold"] - row["seats_held"]
+                    ),
+                }
+            )
+        return data
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Look each primary key up once per serializer instance, so nested
+    many=True serializers do not repeat the query for every item."""
+
+    def to_internal_value(self, data):
+        cache = self.__dict__.setdefault("_instances", {})
+        key = str(data)
+        if key not in cache:
+            cache[key] = super().to_internal_value(data)
+        return cache[key]
 
 
 class TicketSerializer(serializers.ModelSerializer):
+    trip = CachedPrimaryKeyRelatedField(
+        queryset=Trip.objects.select_related("train")
+    )
+
     class Meta:
         model = Ticket
         fields = (
@@ -133,6 +263,9 @@ class TicketSerializer(serializers.ModelSerializer):
             "seat",
             "trip"
         )
+        # Seat conflicts are checked for all tickets at once while the
+        # trips are locked in OrderSerializer.create.
+        validators = []
 
     def validate(self, attrs):
         data = super(TicketSerializer, self).validate(attrs=attrs)
@@ -156,17 +289,129 @@ class TicketSeatsSerializer(TicketSerializer):
 
 
 class TripDetailSerializer(TripSerializer):
+    """Taken seats are encoded as one base64 bitset per cargo (see
+    train_service.seat_map) unless the request asks for ?seats=list."""
+
     route = RouteDetailSerializer(read_only=True)
     train = TrainDetailSerializer(read_only=True)
-    taken_seats = TicketSeatsSerializer(
-        source="tickets",
-        read_only=True,
-        many=True
-    )
+    taken_seats = serializers.SerializerMethodField()
 
     class Meta(TripSerializer.Meta):
         fields = TripSerializer.Meta.fields + ("taken_seats",)
 
+    @extend_schema_field(
+        {
+            "oneOf": [
+                {"type": "array", "items": {"type": "string"}},
+                {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "cargo": {"type": "integer"},
+                            "seat": {"type": "integer"},
+                        },
+                    },
+                },
+            ]
+        }
+    )
+    def get_taken_seats(self, trip):
+        seat_map = mark_seats(
+            trip.get_seat_map(),
+            trip.train,
+            trip.holds.active().values_list("cargo", "seat"),
+        )
+        request = self.context.get("request")
+        if request and request.query_params.get("seats") == "list":
+            return [
+                {"cargo": cargo, "seat": seat}
+                for cargo, seat in taken_seats(seat_map, trip.train)
+            ]
+        return encode_seat_map(seat_map, trip.train)
+
+
+def validate_unique_seats(tickets):
+    errors = []
+    requested = set()
+    for ticket in tickets:
+        key = (ticket["trip"].id, ticket["cargo"], ticket["seat"])
+        if key in requested:
+            errors.append(
+                {
+                    "seat": [
+                        f"Seat {ticket['seat']} in cargo "
+                        f"{ticket['cargo']} is requested twice."
+                    ]
+                }
+            )
+        else:
+            errors.append({})
+        requested.add(key)
+
+    if any(errors):
+        raise ValidationError(errors)
+    return tickets
+
+
+def _filter_seats(queryset, seats):
+    """Narrow queryset to rows that may match (trip_id, cargo, seat)
+    tuples; callers intersect the result with seats."""
+    return queryset.filter(
+        trip__in={trip_id for trip_id, _, _ in seats},
+        cargo__in={cargo for _, cargo, _ in seats},
+        seat__in={seat for _, _, seat in seats},
+    )
+
+
+def claim_seats(tickets_data, user):
+    """Lock the trips of tickets_data and check the requested seats.
+
+    Trips are locked in id order so concurrent bookings cannot deadlock.
+    Returns the locked trips by id, the claimable ticket data, the
+    (trip_id, cargo, seat) tuples that are sold, held by another user or
+    on a trip deleted since validation, and the ids of the user's own
+    holds on the claimable seats. Must run inside a transaction.
+    """
+    trips = {
+        trip_id: Trip.lock(trip_id)
+        for trip_id in sorted(
+            {ticket_data["trip"].id for ticket_data in tickets_data}
+        )
+    }
+    trips = {trip_id: trip for trip_id, trip in trips.items() if trip}
+    seat_maps = {
+        trip_id: trip.get_seat_map() for trip_id, trip in trips.items()
+    }
+    requested = [
+        (ticket_data["trip"].id, ticket_data["cargo"], ticket_data["seat"])
+        for ticket_data in tickets_data
+    ]
+    holds = {
+        (trip_id, cargo, seat): (hold_id, user_id)
+        for hold_id, trip_id, cargo, seat, user_id in _filter_seats(
+            SeatHold.objects.active(), requested
+        ).values_list("id", "trip", "cargo", "seat", "user")
+    }
+
+    claimed = []
+    unavailable = []
+    own_hold_ids = []
+    for ticket_data, seat in zip(tickets_data, requested):
+        trip = trips.get(seat[0])
+        hold_id, holder_id = holds.get(seat, (None, None))
+        if (
+            trip is None
+            or is_taken(seat_maps[trip.id], trip.train, *seat[1:])
+            or holder_id not in (None, user.id)
+        ):
+            unavailable.append(seat)
+            continue
+        claimed.append(ticket_data)
+        if hold_id is not None:
+            own_hold_ids.append(hold_id)
+    return trips, claimed, unavailable, own_hold_ids
+
 
 class OrderSerializer(serializers.ModelSerializer):
     tickets = TicketSerializer(read_only=False, many=True, allow_empty=False)
@@ -175,14 +420,231 @@ class OrderSerializer(serializers.ModelSerializer):
         model = Order
         fields = ("id", "created_at", "tickets")
 
+    def validate_tickets(self, tickets):
+        return validate_unique_seats(tickets)
+
     def create(self, validated_data):
+        """Claim the seats while holding row locks on every trip involved.
+
+        Seats sold (or held by another user) in the meantime are reported
+        with a 409 response, or skipped when the request asks for
+        ?partial=true. Seats held by the ordering user are converted into
+        tickets and their holds released.
+        """
+        request = self.context.get("request")
+        allow_partial = bool(
+            request and request.query_params.get("partial") == "true"
+        )
+
         with transaction.atomic():
             tickets_data = validated_data.pop("tickets")
+            trips, claimed, unavailable, own_hold_ids = claim_seats(
+                tickets_data, validated_data["user"]
+            )
+            if unavailable and not (allow_partial and claimed):
+                record_order("conflict")
+                raise SeatsUnavailable(unavailable)
+
             order = Order.objects.create(**validated_data)
-            for ticket_data in tickets_data:
-                Ticket.objects.create(order=order, **ticket_data)
+            try:
+                with transaction.atomic():
+                    Ticket.objects.bulk_create(
+                        Ticket(order=order, **ticket_data)
+                        for ticket_data in claimed
+                    )
+            except IntegrityError:
+                # A ticket was written outside of the trip lock.
+                record_order("conflict")
+                raise SeatsUnavailable(self._sold_seats(claimed))
+
+            seats_by_trip = defaultdict(list)
+            for ticket_data in claimed:
+                seats_by_trip[ticket_data["trip"].id].append(
+                    (ticket_data["cargo"], ticket_data["seat"])
+                )
+            for trip_id, seats in seats_by_trip.items():
+                trips[trip_id].take_seats(seats)
+            SeatHold.objects.filter(pk__in=own_hold_ids).delete()
+
+            if allow_partial:
+                order.unavailable_tickets = unavailable
+            transaction.on_commit(
+                partial(
+                    record_order,
+                    "partial" if unavailable else "created",
+                    len(claimed),
+                )
+            )
             return order
 
+    @staticmethod
+    def _sold_seats(tickets_data):
+        requested = {
+            (ticket_data["trip"].id, ticket_data["cargo"], ticket_data["seat"])
+            for ticket_data in tickets_data
+        }
+        sold = _filter_seats(Ticket.objects, requested).values_list(
+            "trip", "cargo", "seat"
+        )
+        return sorted(requested.intersection(sold))
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if hasattr(instance, "unavailable_tickets"):
+            data["unavailable_tickets"] = [
+                {"trip": trip_id, "cargo": cargo, "seat": seat}
+                for trip_id, cargo, seat in instance.unavailable_tickets
+            ]
+        return data
+
 
 class OrderListSerializer(OrderSerializer):
     tickets = TicketListSerializer(many=True, read_only=True)
+
+
+class SeatHoldListSerializer(serializers.ListSerializer):
+    def validate(self, attrs):
+        return validate_unique_seats(attrs)
+
+    def create(self, validated_data):
+        user = self.context["request"].user
+        with transaction.atomic():
+            trips, claimed, unavailable, own_hold_ids = claim_seats(
+                validated_data, user
+            )
+            if unavailable:
+                raise SeatsUnavailable(unavailable)
+
+            SeatHold.objects.filter(trip__in=trips).expired().delete()
+            SeatHold.objects.filter(pk__in=own_hold_ids).delete()
+            expires_at = timezone.now() + settings.SEAT_HOLD_TTL
+            return SeatHold.objects.bulk_create(
+                SeatHold(expires_at=expires_at, **hold_data)
+                for hold_data in claimed
+            )
+
+
+class SeatHoldSerializer(TicketSerializer):
+    class Meta:
+        model = SeatHold
+        fields = ("id", "cargo", "seat", "trip", "expires_at")
+        read_only_fields = ("expires_at",)
+        list_serializer_class = SeatHoldListSerializer
+        # Conflicts are checked while the trips are locked.
+        validators = []
+
+
+class SeatAssignmentSerializer(serializers.Serializer):
+    passengers = serializers.IntegerField(min_value=1, max_value=100)
+
+    def create(self, validated_data):
+        """Pick seats for the party on the locked trip and book them."""
+        user = validated_data["user"]
+        with transaction.atomic():
+            trip = Trip.lock(validated_data["trip"].id)
+            if trip is None:
+                raise NotFound("The trip no longer exists.")
+            seat_map = mark_seats(
+                trip.get_seat_map(),
+                trip.train,
+                trip.holds.active()
+                .exclude(user=user)
+                .values_list("cargo", "seat"),
+            )
+            seats = assign_seats(
+                seat_map, trip.train, validated_data["passengers"]
+            )
+            if seats is None:
+                record_order("conflict")
+                raise NotEnoughSeats()
+
+            order_serializer = OrderSerializer(
+                data={
+                    "tickets": [
+                        {"trip": trip.id, "cargo": cargo, "seat": seat}
+                        for cargo, seat in seats
+                    ]
+                },
+                context=self.context,
+            )
+            order_serializer.is_valid(raise_exception=True)
+            return order_serializer.save(user=user)
+
+    def to_representation(self, instance):
+        return OrderSerializer(instance, context=self.context).data
+
+
+class JourneySearchSerializer(serializers.Serializer):
+    source = serializers.PrimaryKeyRelatedField(
+        queryset=Station.objects.all()
+    )
+    destination = serializers.PrimaryKeyRelatedField(
+        queryset=Station.objects.all()
+    )
+    departure = serializers.DateTimeField(required=False)
+    min_transfer = serializers.IntegerField(
+        min_value=0, max_value=24 * 60, default=10
+    )
+    max_transfers = serializers.IntegerField(
+        min_value=0, max_value=3, default=2
+    )
+
+    def validate(self, attrs):
+        if attrs["source"] == attrs["destination"]:
+            raise serializers.ValidationError(
+                "Source and destination stations cannot be the same"
+            )
+        return attrs
+
+
+class JourneySerializer(serializers.Serializer):
+    """Serialize a list of consecutive trips as one journey."""
+
+    departure_time = serializers.SerializerMethodField()
+    arrival_time = serializers.SerializerMethodField()
+    transfers = serializers.SerializerMethodField()
+    tickets_available = serializers.SerializerMethodField()
+    legs = serializers.SerializerMethodField()
+
+    def get_departure_time(self, trips) -> datetime:
+        return serializers.DateTimeField().to_representation(
+            trips[0].departure_time
+        )
+
+    def get_arrival_time(self, trips) -> datetime:
+        return serializers.DateTimeField().to_representation(
+            trips[-1].arrival_time
+        )
+
+    def get_transfers(self, trips) -> int:
+        return len(trips) - 1
+
+    def get_tickets_available(self, trips) -> int:
+        return min(trip.tickets_available for trip in trips)
+
+    @extend_schema_field(TripListSerializer(many=True))
+    def get_legs(self, trips):
+        return TripListSerializer(trips, many=True, context=self.context).data
+
+
+class ExportSearchSerializer(serializers.Serializer):
+    trip = serializers.IntegerField(
+        min_value=1, required=False, help_text="Only this trip."
+    )
+    date_from = serializers.DateField(
+        required=False, help_text="First day (inclusive)."
+    )
+    date_to = serializers.DateField(
+        required=False, help_text="Last day (inclusive)."
+    )
+    output = serializers.ChoiceField(
+        choices=sorted(EXPORT_FORMATS), default="ndjson"
+    )
+
+    def validate(self, attrs):
+        date_from, date_to = attrs.get("date_from"), attrs.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError(
+                "date_from cannot be after date_to"
+            )
+        return attrs
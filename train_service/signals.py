@@ -0,0 +1,63 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from train_service.journeys import TIMETABLE_VERSION
+from train_service.models import (
+    Crew,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    Trip,
+)
+from train_service.versions import bump_version, model_version_name
+
+INVENTORY_FIELDS = {"seat_map", "tickets_sold"}
+
+# Reference data served from in-process indexes and the response cache.
+VERSIONED_MODELS = (Station, Route, TrainType, Train, Crew)
+
+
+@receiver(post_save, sender=Ticket)
+def take_seat(sender, instance, created, **kwargs):
+    if created:
+        Trip.update_seat_inventory(
+            instance.trip_id, [(instance.cargo, instance.seat)]
+        )
+
+
+@receiver(post_delete, sender=Ticket)
+def release_seat(sender, instance, **kwargs):
+    Trip.update_seat_inventory(
+        instance.trip_id, [(instance.cargo, instance.seat)], taken=False
+    )
+
+
+@receiver(post_save, sender=Trip)
+@receiver(post_delete, sender=Trip)
+@receiver(post_save, sender=Route)
+@receiver(post_delete, sender=Route)
+def invalidate_timetable(sender, update_fields=None, **kwargs):
+    if update_fields and set(update_fields) <= INVENTORY_FIELDS:
+        return
+    bump_version_on_commit(TIMETABLE_VERSION)
+
+
+def bump_version_on_commit(name):
+    bump_version(name)
+    # Bump again once the write is visible to other connections, so a
+    # reader that saw the first token cannot cache pre-commit data.
+    transaction.on_commit(partial(bump_version, name))
+
+
+def bump_model_version(sender, **kwargs):
+    bump_version_on_commit(model_version_name(sender))
+
+
+for model in VERSIONED_MODELS:
+    post_save.connect(bump_model_version, sender=model)
+    post_delete.connect(bump_model_version, sender=model)
@@ -0,0 +1,360 @@
+"""Synthetic datasets at a chosen scale, bulk-created.
+
+Stations cluster around a few dozen cities, routes mostly join nearby
+stations, trips depart in morning and evening peaks over the coming
+days, and demand is skewed: a minority of routes sells most tickets.
+Tickets are grouped into orders of one to four seats on one trip, and
+every trip's seat map and tickets_sold match its tickets.
+
+Rows are written with bulk_create in batches; trips, orders and tickets
+are produced chunk by chunk, so memory does not grow with the number of
+tickets. Signals are not sent, so version tokens are bumped at the end.
+"""
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from train_service.geo import haversine
+from train_service.journeys import TIMETABLE_VERSION
+from train_service.models import (
+    Crew,
+    Order,
+    Route,
+    Station,
+    Ticket,
+    Train,
+    TrainType,
+    Trip,
+    day_start,
+)
+from train_service.seat_map import build_seat_map
+from train_service.versions import bump_version, model_version_name
+
+BATCH_SIZE = 5000
+TRIP_CHUNK = 1000
+
+PASSWORD = "password"
+EMAIL = "user{}@example.com"
+
+CITIES = (
+    ("Kyiv", 50.45, 30.52),
+    ("Lviv", 49.84, 24.03),
+    ("Odesa", 46.48, 30.72),
+    ("Kharkiv", 49.99, 36.23),
+    ("Dnipro", 48.46, 35.05),
+    ("Zaporizhzhia", 47.84, 35.14),
+    ("Vinnytsia", 49.23, 28.47),
+    ("Poltava", 49.59, 34.55),
+    ("Chernihiv", 51.49, 31.29),
+    ("Cherkasy", 49.44, 32.06),
+    ("Zhytomyr", 50.25, 28.66),
+    ("Sumy", 50.91, 34.80),
+    ("Rivne", 50.62, 26.25),
+    ("Lutsk", 50.75, 25.33),
+    ("Ternopil", 49.55, 25.59),
+    ("Ivano-Frankivsk", 48.92, 24.71),
+    ("Uzhhorod", 48.62, 22.29),
+    ("Chernivtsi", 48.29, 25.94),
+    ("Khmelnytskyi", 49.42, 26.99),
+    ("Mykolaiv", 46.98, 31.99),
+    ("Kherson", 46.64, 32.62),
+    ("Kropyvnytskyi", 48.51, 32.26),
+    ("Kovel", 51.22, 24.71),
+    ("Mukachevo", 48.44, 22.72),
+)
+
+# name: (cargo_num range, places_in_cargo choices)
+TRAIN_TYPES = {
+    "Intercity+": ((5, 9), (54, 64)),
+    "Intercity": ((4, 8), (64,)),
+    "Night express": ((10, 18), (36, 54)),
+    "Regional": ((3, 6), (64, 80)),
+}
+
+# Relative number of departures per hour of the day.
+DEPARTURE_HOURS = (
+    0, 0, 0, 0, 1, 2, 5, 8, 8, 5, 3, 3,
+    3, 3, 3, 4, 6, 8, 8, 6, 4, 4, 3, 2,
+)
+
+CITY_NAMES = ("Pasazhyrskyi", "Holovnyi", "Pivdennyi", "Tsentralnyi")
+
+
+@dataclass
+class Sizes:
+    stations: int
+    routes: int
+    trains: int
+    trips: int
+    users: int
+    tickets: int
+    crew: int = 50
+    days: int = 30
+
+    @classmethod
+    def for_tickets(cls, tickets, **overrides):
+        """Proportions of a national network selling tickets tickets."""
+        sizes = cls(
+            stations=min(max(tickets // 200, 20), 5000),
+            routes=min(max(tickets // 50, 40), 20000),
+            trains=min(max(tickets // 500, 10), 2000),
+            trips=max(tickets // 40, 10),
+            users=max(tickets // 8, 10),
+            tickets=tickets,
+        )
+        for name, value in overrides.items():
+            if value is not None:
+                setattr(sizes, name, value)
+        return sizes
+
+
+def _batched_create(model, objects, batch_size=BATCH_SIZE):
+    return model.objects.bulk_create(objects, batch_size=batch_size)
+
+
+class Generator:
+    """Create a dataset of the given Sizes; report is called with
+    progress messages."""
+
+    def __init__(self, sizes, seed=0, report=None):
+        self.sizes = sizes
+        self.rng = random.Random(seed)
+        self.report = report or (lambda message: None)
+        self.counts = {}
+
+    def run(self):
+        stations = self.create_stations()
+        routes = self.create_routes(stations)
+        trains = self.create_trains()
+        self.create_crew()
+        users = self.create_users()
+        self.create_trips(routes, trains, users)
+        return self.counts
+
+    def done(self, label, count):
+        self.counts[label] = count
+        self.report(f"{label}: {count:,}")
+
+    def create_stations(self):
+        rng = self.rng
+        stations = []
+        for i in range(self.sizes.stations):
+            city, lat, lon = CITIES[i % len(CITIES)]
+            # Main stations first, then suburban stops around the city.
+            rank = i // len(CITIES)
+            if rank < len(CITY_NAMES):
+                name = f"{city}-{CITY_NAMES[rank]}"
+                spread = 0.03
+            else:
+                name = f"{city} stop {rank - len(CITY_NAMES) + 1}"
+                spread = 0.4
+            stations.append(
+                Station(
+                    name=name,
+                    latitude=round(lat + rng.gauss(0, spread), 5),
+                    longitude=round(lon + rng.gauss(0, spread * 1.5), 5),
+                )
+            )
+        stations = _batched_create(Station, stations)
+        self.done("stations", len(stations))
+        return stations
+
+    def create_routes(self, stations):
+        rng = self.rng
+        pairs = set()
+        routes = []
+        attempts = 0
+        while len(routes) < self.sizes.routes and attempts < (
+            self.sizes.routes * 20
+        ):
+            attempts += 1
+            source = rng.choice(stations)
+            # The nearest of a few candidates: mostly regional lines, some
+            # long-distance ones.
+            candidates = rng.sample(stations, min(len(stations), 4))
+            destination = min(
+                (s for s in candidates if s is not source),
+                key=lambda s: haversine(
+                    source.latitude,
+                    source.longitude,
+                    s.latitude,
+                    s.longitude,
+                ),
+                default=None,
+            )
+            if destination is None or (source.pk, destination.pk) in pairs:
+                continue
+            pairs.add((source.pk, destination.pk))
+            distance = haversine(
+                source.latitude,
+                source.longitude,
+                destination.latitude,
+                destination.longitude,
+            )
+            routes.append(
+                Route(
+                    source=source,
+                    destination=destination,
+                    # Track is longer than the great circle.
+                    distance=max(round(distance * 1.25), 1),
+                )
+            )
+        routes = _batched_create(Route, routes)
+        self.done("routes", len(routes))
+        return routes
+
+    def create_trains(self):
+        rng = self.rng
+        train_types = _batched_create(
+            TrainType, [TrainType(name=name) for name in TRAIN_TYPES]
+        )
+        trains = []
+        for i in range(self.sizes.trains):
+            train_type = rng.choice(train_types)
+            cargo_range, places = TRAIN_TYPES[train_type.name]
+            trains.append(
+                Train(
+                    name=f"{i + 1:03}{'ABCDEFGHKL'[i % 10]}",
+                    cargo_num=rng.randint(*cargo_range),
+                    places_in_cargo=rng.choice(places),
+                    train_type=train_type,
+                )
+            )
+        trains = _batched_create(Train, trains)
+        self.done("trains", len(trains))
+        return trains
+
+    def create_crew(self):
+        first_names = ("Olena", "Taras", "Iryna", "Andrii", "Oksana", "Yurii")
+        last_names = ("Shevchenko", "Bondarenko", "Kovalenko", "Tkachenko")
+        crew = _batched_create(
+            Crew,
+            [
+                Crew(
+                    first_name=self.rng.choice(first_names),
+                    last_name=self.rng.choice(last_names),
+                )
+                for _ in range(self.sizes.crew)
+            ],
+        )
+        self.done("crew", len(crew))
+
+    def create_users(self):
+        # Hashing once: make_password is deliberately slow.
+        password = make_password(PASSWORD)
+        user_model = get_user_model()
+        users = _batched_create(
+            user_model,
+            (
+                user_model(email=EMAIL.format(i), password=password)
+                for i in range(self.sizes.users)
+            ),
+        )
+        self.done("users", len(users))
+        return users
+
+    def create_trips(self, routes, trains, users):
+        rng = self.rng
+        sizes = self.sizes
+        # Zipf-like demand: the k-th most popular route sells ~1/k.
+        popularity = [1 / (k + 1) ** 0.8 for k in range(len(routes))]
+        rng.shuffle(popularity)
+        trip_routes = rng.choices(
+            range(len(routes)), weights=popularity, k=sizes.trips
+        )
+        # Expected demand per trip, scaled so the total hits the target.
+        demand_per_weight = sizes.tickets / sum(
+            popularity[route] for route in trip_routes
+        )
+        start = day_start(timezone.localdate() + timedelta(days=1))
+
+        trips_created = tickets_created = orders_created = 0
+        for offset in range(0, sizes.trips, TRIP_CHUNK):
+            chunk = trip_routes[offset:offset + TRIP_CHUNK]
+            trips, seats = [], []
+            for route_index in chunk:
+                route = routes[route_index]
+                train = rng.choice(trains)
+                capacity = train.capacity
+                expected = popularity[route_index] * demand_per_weight
+                sold = (
+                    min(capacity, round(rng.gammavariate(2, expected / 2)))
+                    if expected > 0
+                    else 0
+                )
+                taken = [
+                    divmod(index, train.places_in_cargo)
+                    for index in rng.sample(range(capacity), sold)
+                ]
+                taken = [(cargo + 1, seat + 1) for cargo, seat in taken]
+                departure = self.departure(start)
+                trips.append(
+                    Trip(
+                        route=route,
+                        train=train,
+                        departure_time=departure,
+                        arrival_time=departure
+                        + timedelta(hours=route.distance / 70),
+                        tickets_sold=len(taken),
+                        seat_map=build_seat_map(train, taken),
+                    )
+                )
+                seats.append(taken)
+            trips = _batched_create(Trip, trips)
+
+            orders, order_seats = [], []
+            for trip, taken in zip(trips, seats):
+                while taken:
+                    party = min(len(taken), self.party_size())
+                    orders.append(Order(user=rng.choice(users)))
+                    order_seats.append((trip, taken[:party]))
+                    taken = taken[party:]
+            orders = _batched_create(Order, orders)
+            tickets = _batched_create(
+                Ticket,
+                (
+                    Ticket(trip=trip, order=order, cargo=cargo, seat=seat)
+                    for order, (trip, party) in zip(orders, order_seats)
+                    for cargo, seat in party
+                ),
+            )
+            trips_created += len(trips)
+            orders_created += len(orders)
+            tickets_created += len(tickets)
+            self.report(
+                f"trips: {trips_created:,}/{sizes.trips:,}, "
+                f"tickets: {tickets_created:,}"
+            )
+        self.done("trips", trips_created)
+        self.done("orders", orders_created)
+        self.done("tickets", tickets_created)
+
+    def departure(self, start):
+        day = self.rng.randrange(self.sizes.days)
+        hour = self.rng.choices(range(24), weights=DEPARTURE_HOURS)[0]
+        minute = self.rng.randrange(0, 60, 5)
+        return start + timedelta(days=day, hours=hour, minutes=minute)
+
+    def party_size(self):
+        # Mostly single travellers, sometimes couples and families.
+        return min(1 + int(-math.log(1 - self.rng.random()) / 1.2), 4)
+
+
+def generate(sizes, seed=0, report=None):
+    """Create a synthetic dataset of sizes in one transaction; return
+    the number of rows created per model."""
+    try:
+        with transaction.atomic():
+            return Generator(sizes, seed=seed, report=report).run()
+    finally:
+        # bulk_create sends no signals, so invalidate caches here.
+        for model in (Station, Route, TrainType, Train, Crew):
+            bump_version(model_version_name(model))
+        bump_version(TIMETABLE_VERSION)
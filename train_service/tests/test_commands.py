@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from train_service.models import Trip
+from utils.samples import sample_trip, sample_ticket
+
+
+class RebuildSeatInventoryCommandTests(TestCase):
+    def setUp(self):
+        self.trip = sample_trip()
+        sample_ticket(trip=self.trip)
+        Trip.objects.filter(pk=self.trip.pk).update(
+            tickets_sold=7, seat_map=b""
+        )
+
+    def test_check_reports_mismatch(self):
+        with self.assertRaises(CommandError):
+            call_command("rebuild_seat_inventory", "--check", stdout=StringIO())
+
+    def test_rebuild_fixes_counter(self):
+        call_command("rebuild_seat_inventory", stdout=StringIO())
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.tickets_sold, 1)
+        self.assertEqual(self.trip.get_seat_map()[0], 0b1)
+        call_command("rebuild_seat_inventory", "--check", stdout=StringIO())
+
+
+class ExportDataCommandTests(TestCase):
+    def setUp(self):
+        self.ticket = sample_ticket(trip=sample_trip())
+
+    def test_exports_ndjson_to_stdout(self):
+        out = StringIO()
+
+        call_command(
+            "export_data", "trips", "--trip", self.ticket.trip_id, stdout=out
+        )
+
+        record = json.loads(out.getvalue())
+        self.assertEqual(record["id"], self.ticket.trip_id)
+        self.assertEqual(record["tickets"][0]["id"], self.ticket.id)
+
+    def test_exports_csv_to_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "orders.csv")
+
+            call_command(
+                "export_data", "orders", "--format", "csv", "-o", path
+            )
+
+            with open(path, newline="") as exported:
+                rows = list(csv.DictReader(exported))
+        self.assertEqual(
+            [(row["id"], row["ticket_id"]) for row in rows],
+            [(str(self.ticket.order_id), str(self.ticket.id))],
+        )
+
+    def test_rejects_reversed_range(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "export_data",
+                "trips",
+                "--from",
+                "2030-05-02",
+                "--to",
+                "2030-05-01",
+                stdout=StringIO(),
+            )
+
+
+class GenerateDataCommandTests(TestCase):
+    def test_generates_dataset(self):
+        out = StringIO()
+
+        call_command(
+            "generate_data", "--tickets", "200", "--trips", "10", stdout=out
+        )
+
+        self.assertEqual(Trip.objects.count(), 10)
+        self.assertIn("tickets:", out.getvalue())
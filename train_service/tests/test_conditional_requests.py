@@ -0,0 +1,124 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from train_service.models import SeatHold
+from utils.samples import (
+    sample_order,
+    sample_route,
+    sample_station,
+    sample_ticket,
+    sample_train,
+    sample_trip,
+    sample_user,
+)
+
+ROUTE_URL = reverse("train_service:route-list")
+TRIP_DETAIL_URL = lambda pk: reverse(
+    "train_service:trip-detail", kwargs={"pk": pk}
+)
+
+
+class ReferenceConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        self.route = sample_route()
+
+    def test_unchanged_list_returns_not_modified(self):
+        etag = self.client.get(ROUTE_URL)["ETag"]
+
+        with self.assertNumQueries(0):
+            res = self.client.get(ROUTE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(res.content, b"")
+
+    def test_etag_depends_on_query(self):
+        etag = self.client.get(ROUTE_URL)["ETag"]
+
+        res = self.client.get(
+            ROUTE_URL, {"source": "Source"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_related_write_changes_etag(self):
+        etag = self.client.get(ROUTE_URL)["ETag"]
+        self.route.source.name = "Renamed"
+        self.route.source.save()
+
+        res = self.client.get(ROUTE_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res["ETag"], etag)
+
+
+class TripConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip(
+            train=sample_train(cargo_num=1, places_in_cargo=10)
+        )
+        self.url = TRIP_DETAIL_URL(self.trip.id)
+
+    def assertModified(self, etag):
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_unchanged_trip_skips_serialization(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        with self.assertNumQueries(1):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_sold_ticket_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        sample_ticket(
+            trip=self.trip, order=sample_order(user=self.user), seat=3
+        )
+
+        self.assertModified(etag)
+
+    def test_hold_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        SeatHold.objects.create(
+            trip=self.trip,
+            user=self.user,
+            cargo=1,
+            seat=4,
+            expires_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        self.assertModified(etag)
+
+    def test_seat_list_has_its_own_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        res = self.client.get(
+            self.url, {"seats": "list"}, HTTP_IF_NONE_MATCH=etag
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_station_write_changes_etag(self):
+        etag = self.client.get(self.url)["ETag"]
+        sample_station(name="Unrelated")
+
+        self.assertModified(etag)
+
+    def test_missing_trip(self):
+        res = self.client.get(TRIP_DETAIL_URL(999), HTTP_IF_NONE_MATCH="*")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,150 @@
+import datetime
+from itertools import count
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from train_service.eager_loading import related_lookups
+from train_service.models import SeatHold
+from train_service.serializers import (
+    OrderListSerializer,
+    RouteListSerializer,
+    TrainDetailSerializer,
+    TripDetailSerializer,
+    TripListSerializer,
+)
+from utils.n_plus_one import NPlusOneGuardMixin
+from utils.samples import (
+    sample_crew,
+    sample_order,
+    sample_route,
+    sample_station,
+    sample_ticket,
+    sample_train,
+    sample_train_type,
+    sample_trip,
+    sample_user,
+)
+
+
+class RelatedLookupsTests(SimpleTestCase):
+    def test_slug_fields_are_joined(self):
+        self.assertEqual(
+            related_lookups(RouteListSerializer()),
+            (["source", "destination"], []),
+        )
+
+    def test_nested_serializers_are_joined(self):
+        select, prefetch = related_lookups(TripDetailSerializer())
+
+        self.assertEqual(
+            set(select),
+            {
+                "route",
+                "route__source",
+                "route__destination",
+                "train",
+                "train__train_type",
+            },
+        )
+        self.assertEqual(prefetch, [])
+
+    def test_dotted_source_and_declared_lookups(self):
+        select, _ = related_lookups(TripListSerializer())
+
+        self.assertEqual(
+            set(select),
+            {"route", "train", "route__source", "route__destination"},
+        )
+
+    def test_primary_key_fields_are_skipped(self):
+        self.assertEqual(related_lookups(TrainDetailSerializer())[1], [])
+        self.assertEqual(
+            related_lookups(TrainDetailSerializer())[0], ["train_type"]
+        )
+
+    def test_reverse_relations_are_prefetched_with_annotations(self):
+        select, (tickets,) = related_lookups(OrderListSerializer())
+
+        self.assertEqual(select, [])
+        self.assertEqual(tickets.prefetch_to, "tickets")
+        (trip,) = tickets.queryset._prefetch_related_lookups
+        self.assertIsInstance(trip, Prefetch)
+        self.assertEqual(trip.prefetch_to, "trip")
+        self.assertIn("seats_held", trip.queryset.query.annotations)
+
+
+class ListQueryCountTests(NPlusOneGuardMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = sample_user()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.sequence = count()
+
+    def future_trip(self):
+        departure = timezone.now() + datetime.timedelta(
+            days=1, minutes=next(self.sequence)
+        )
+        return sample_trip(
+            departure_time=departure,
+            arrival_time=departure + datetime.timedelta(hours=4),
+        )
+
+    def test_stations(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:station-list"), sample_station
+        )
+
+    def test_routes(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:route-list"), sample_route
+        )
+
+    def test_train_types(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:train-type-list"), sample_train_type
+        )
+
+    def test_trains(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:train-list"), sample_train
+        )
+
+    def test_crew(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:crew-list"), sample_crew
+        )
+
+    def test_trips(self):
+        self.assertListQueriesConstant(
+            reverse("train_service:trip-list"), self.future_trip
+        )
+
+    def test_holds(self):
+        def make_hold():
+            SeatHold.objects.create(
+                trip=self.future_trip(),
+                user=self.user,
+                cargo=1,
+                seat=1,
+                expires_at=timezone.now() + datetime.timedelta(minutes=5),
+            )
+
+        self.assertListQueriesConstant(
+            reverse("train_service:hold-list"), make_hold
+        )
+
+    def test_orders(self):
+        def make_order():
+            order = sample_order(user=self.user)
+            for seat in (1, 2):
+                sample_ticket(trip=self.future_trip(), order=order, seat=seat)
+
+        self.assertListQueriesConstant(
+            reverse("train_service:order-list"), make_order
+        )
@@ -0,0 +1,152 @@
+import csv
+import datetime
+import io
+import json
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from utils.samples import (
+    sample_order,
+    sample_superuser,
+    sample_ticket,
+    sample_trip,
+    sample_user,
+)
+
+TRIPS_EXPORT_URL = reverse("train_service:export-trips")
+ORDERS_EXPORT_URL = reverse("train_service:export-orders")
+
+
+def aware(*args):
+    return datetime.datetime(*args, tzinfo=datetime.timezone.utc)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(sample_superuser())
+        self.user = sample_user()
+        self.first = sample_trip(
+            departure_time=aware(2030, 5, 1, 8),
+            arrival_time=aware(2030, 5, 1, 12),
+        )
+        self.second = sample_trip(
+            departure_time=aware(2030, 5, 3, 23, 30),
+            arrival_time=aware(2030, 5, 4, 3),
+        )
+        self.order = sample_order(user=self.user)
+        self.tickets = [
+            sample_ticket(trip=self.first, order=self.order, seat=seat)
+            for seat in (1, 2)
+        ]
+
+    def get(self, url, **params):
+        res = self.client.get(url, params)
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.streaming)
+        return b"".join(res.streaming_content).decode()
+
+
+class TripExportTests(ExportTestCase):
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.user)
+
+        res = self.client.get(TRIPS_EXPORT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_ndjson_date_range(self):
+        content = self.get(
+            TRIPS_EXPORT_URL, date_from="2030-05-01", date_to="2030-05-03"
+        )
+
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(
+            [record["id"] for record in records],
+            [self.first.id, self.second.id],
+        )
+        self.assertEqual(records[0]["departure_time"], "2030-05-01T08:00:00Z")
+        self.assertEqual(
+            records[0]["tickets"],
+            [
+                {
+                    "id": ticket.id,
+                    "cargo": 1,
+                    "seat": ticket.seat,
+                    "order": self.order.id,
+                    "user": self.user.id,
+                }
+                for ticket in self.tickets
+            ],
+        )
+        self.assertEqual(records[1]["tickets"], [])
+
+    def test_date_range_is_inclusive_by_day(self):
+        content = self.get(
+            TRIPS_EXPORT_URL, date_from="2030-05-02", date_to="2030-05-03"
+        )
+
+        self.assertEqual(
+            [json.loads(line)["id"] for line in content.splitlines()],
+            [self.second.id],
+        )
+
+    def test_csv_has_one_row_per_ticket(self):
+        res = self.client.get(
+            TRIPS_EXPORT_URL, {"trip": self.first.id, "output": "csv"}
+        )
+
+        self.assertEqual(res["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn('filename="trips.csv"', res["Content-Disposition"])
+        rows = list(
+            csv.DictReader(
+                io.StringIO(b"".join(res.streaming_content).decode())
+            )
+        )
+        self.assertEqual(
+            [(row["id"], row["ticket_seat"]) for row in rows],
+            [(str(self.first.id), "1"), (str(self.first.id), "2")],
+        )
+        self.assertEqual(rows[0]["source"], "Source Station")
+
+    def test_csv_keeps_trips_without_tickets(self):
+        content = self.get(
+            TRIPS_EXPORT_URL, trip=self.second.id, output="csv"
+        )
+
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["ticket_id"], "")
+
+    def test_invalid_filters(self):
+        for params in (
+            {"date_from": "2030-05-03", "date_to": "2030-05-01"},
+            {"date_from": "05/01/2030"},
+            {"output": "xml"},
+        ):
+            with self.subTest(params=params):
+                res = self.client.get(TRIPS_EXPORT_URL, params)
+
+                self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OrderExportTests(ExportTestCase):
+    def test_orders_for_trip(self):
+        other = sample_order(user=self.user)
+        sample_ticket(trip=self.second, order=other)
+
+        content = self.get(ORDERS_EXPORT_URL, trip=self.first.id)
+
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record["id"] for record in records], [self.order.id])
+        self.assertEqual(
+            [ticket["trip"] for ticket in records[0]["tickets"]],
+            [self.first.id, self.first.id],
+        )
+        self.assertEqual(
+            records[0]["tickets"][0]["departure_time"],
+            "2030-05-01T08:00:00Z",
+        )
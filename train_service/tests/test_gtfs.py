@@ -0,0 +1,219 @@
+import datetime
+import os
+import shutil
+import tempfile
+import zipfile
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from train_service.gtfs import service_day_start
+from train_service.models import Route, Station, Ticket, Train, Trip
+from train_service.seat_map import is_valid
+from utils.samples import sample_order
+
+FEED = {
+    "agency.txt": (
+        "agency_id,agency_name,agency_url,agency_timezone\n"
+        "UZ,Ukrzaliznytsia,https://uz.gov.ua,Europe/Kyiv\n"
+    ),
+    "stops.txt": (
+        "stop_id,stop_name,stop_lat,stop_lon,location_type,parent_station\n"
+        "KYIV,Kyiv-Pasazhyrskyi,50.4406,30.4884,1,\n"
+        "KYIV_1,Kyiv platform 1,50.4406,30.4884,0,KYIV\n"
+        "LVIV,Lviv,49.8397,24.0297,,\n"
+        "ODESA,Odesa-Holovna,46.4675,30.7414,,\n"
+    ),
+    "routes.txt": (
+        "route_id,route_short_name,route_long_name,route_type\n"
+        "IC743,743,Kyiv - Lviv,2\n"
+        "N105,105,Kyiv - Odesa,102\n"
+    ),
+    "trips.txt": (
+        "route_id,service_id,trip_id\n"
+        "IC743,DAILY,743-1\n"
+        "N105,WEEKDAYS,105-1\n"
+    ),
+    "stop_times.txt": (
+        "trip_id,arrival_time,departure_time,stop_id,stop_sequence\n"
+        "743-1,,06:10:00,KYIV_1,1\n"
+        "743-1,11:05:00,11:05:00,LVIV,3\n"
+        "743-1,08:00:00,08:02:00,ODESA,2\n"
+        "105-1,,22:30:00,KYIV,1\n"
+        "105-1,31:15:00,,ODESA,2\n"
+    ),
+}
+
+# Monday 2 and Tuesday 3 November 2026, after the switch to winter time.
+MONDAY = datetime.date(2026, 11, 2)
+
+
+def at(day, hour, minute=0):
+    kyiv = datetime.timezone(datetime.timedelta(hours=2))
+    return datetime.datetime.combine(
+        day, datetime.time(hour, minute), tzinfo=kyiv
+    )
+
+
+class GTFSImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.write_feed(FEED)
+
+    def write_feed(self, files):
+        for name, content in files.items():
+            with open(os.path.join(self.directory, name), "w") as f:
+                f.write(content)
+
+    def run_import(self, *args, feed=None):
+        out = StringIO()
+        call_command(
+            "import_gtfs",
+            feed or self.directory,
+            "--start",
+            MONDAY.isoformat(),
+            *args,
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def test_import(self):
+        output = self.run_import()
+
+        self.assertIn("trips: 2", output)
+        self.assertEqual(
+            sorted(Station.objects.values_list("gtfs_id", "name")),
+            [
+                ("KYIV", "Kyiv-Pasazhyrskyi"),
+                ("LVIV", "Lviv"),
+                ("ODESA", "Odesa-Holovna"),
+            ],
+        )
+        trains = {train.gtfs_id: train for train in Train.objects.all()}
+        self.assertEqual(trains["IC743"].name, "743")
+        self.assertEqual(trains["IC743"].train_type.name, "Rail")
+        self.assertEqual(trains["N105"].train_type.name, "Rail")
+        self.assertEqual(trains["N105"].capacity, 500)
+
+        lviv = Trip.objects.select_related("route", "train").get(
+            gtfs_id="743-1@20261102"
+        )
+        self.assertEqual(lviv.route.source.gtfs_id, "KYIV")
+        self.assertEqual(lviv.route.destination.gtfs_id, "LVIV")
+        self.assertEqual(lviv.route.distance, 465)
+        self.assertEqual(lviv.departure_time, at(MONDAY, 6, 10))
+        self.assertEqual(lviv.arrival_time, at(MONDAY, 11, 5))
+        self.assertTrue(is_valid(bytes(lviv.seat_map), lviv.train))
+
+        night = Trip.objects.get(gtfs_id="105-1@20261102")
+        self.assertEqual(
+            night.arrival_time, at(MONDAY + datetime.timedelta(days=1), 7, 15)
+        )
+
+    def test_reimport_updates_in_place(self):
+        self.run_import()
+        trip = Trip.objects.get(gtfs_id="743-1@20261102")
+        Ticket.objects.create(trip=trip, order=sample_order(), cargo=1, seat=1)
+        feed = dict(FEED)
+        feed["stops.txt"] = FEED["stops.txt"].replace(
+            "Lviv,", "Lviv-Holovnyi,"
+        )
+        self.write_feed(feed)
+
+        self.run_import()
+
+        self.assertEqual(Station.objects.count(), 3)
+        self.assertEqual(Route.objects.count(), 2)
+        self.assertEqual(Trip.objects.count(), 2)
+        self.assertEqual(
+            Station.objects.get(gtfs_id="LVIV").name, "Lviv-Holovnyi"
+        )
+        trip.refresh_from_db()
+        self.assertEqual(trip.tickets_sold, 1)
+        self.assertEqual(trip.get_seat_map()[0], 0b1)
+
+    def test_reimport_does_not_move_booked_trips(self):
+        self.run_import()
+        booked = Trip.objects.get(gtfs_id="743-1@20261102")
+        Ticket.objects.create(
+            trip=booked, order=sample_order(), cargo=1, seat=1
+        )
+        free = Trip.objects.get(gtfs_id="105-1@20261102")
+        feed = dict(FEED)
+        feed["trips.txt"] = (
+            "route_id,service_id,trip_id\n"
+            "N105,DAILY,743-1\n"
+            "IC743,WEEKDAYS,105-1\n"
+        )
+        self.write_feed(feed)
+
+        output = self.run_import()
+
+        self.assertIn("booked trips not moved: 1", output)
+        booked.refresh_from_db()
+        self.assertEqual(booked.train.gtfs_id, "IC743")
+        self.assertEqual(booked.get_seat_map()[0], 0b1)
+        free.refresh_from_db()
+        self.assertEqual(free.train.gtfs_id, "IC743")
+
+    def test_calendar(self):
+        self.write_feed(
+            {
+                "calendar.txt": (
+                    "service_id,monday,tuesday,wednesday,thursday,friday,"
+                    "saturday,sunday,start_date,end_date\n"
+                    "DAILY,1,1,1,1,1,1,1,20260101,20261231\n"
+                    "WEEKDAYS,1,1,1,1,1,0,0,20260101,20261231\n"
+                ),
+                "calendar_dates.txt": (
+                    "service_id,date,exception_type\n"
+                    "WEEKDAYS,20261102,2\n"
+                ),
+            }
+        )
+
+        self.run_import("--days", "7")
+
+        self.assertEqual(
+            Trip.objects.filter(gtfs_id__startswith="743-1@").count(), 7
+        )
+        self.assertEqual(
+            sorted(
+                Trip.objects.filter(gtfs_id__startswith="105-1@").values_list(
+                    "gtfs_id", flat=True
+                )
+            ),
+            [f"105-1@202611{day:02}" for day in (3, 4, 5, 6)],
+        )
+
+    def test_zip_feed(self):
+        path = os.path.join(self.directory, "feed.zip")
+        with zipfile.ZipFile(path, "w") as archive:
+            for name, content in FEED.items():
+                archive.writestr(f"gtfs/{name}", content)
+
+        self.run_import(feed=path)
+
+        self.assertEqual(Trip.objects.count(), 2)
+
+    def test_missing_file_is_rolled_back(self):
+        os.remove(os.path.join(self.directory, "stop_times.txt"))
+
+        with self.assertRaisesMessage(CommandError, "stop_times.txt"):
+            self.run_import()
+
+        self.assertFalse(Station.objects.exists())
+
+    def test_service_day_start_on_daylight_saving_change(self):
+        kyiv = datetime.timezone(datetime.timedelta(hours=3))
+        # Clocks go back on 25 October 2026: noon minus 12 hours is
+        # 01:00 summer time, not midnight.
+        self.assertEqual(
+            service_day_start(
+                datetime.date(2026, 10, 25), ZoneInfo("Europe/Kyiv")
+            ),
+            datetime.datetime(2026, 10, 25, 1, tzinfo=kyiv),
+        )
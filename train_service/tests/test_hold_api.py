@@ -0,0 +1,137 @@
+import datetime
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from train_service.models import SeatHold, Ticket
+from utils.samples import sample_user, sample_trip, sample_route, sample_train
+
+HOLD_URL = reverse("train_service:hold-list")
+CHECKOUT_URL = reverse("train_service:hold-checkout")
+ORDER_URL = reverse("train_service:order-list")
+TRIP_URL = reverse("train_service:trip-list")
+TRIP_DETAIL_URL = lambda pk: reverse(
+    "train_service:trip-detail", kwargs={"pk": pk}
+)
+
+
+class UnauthenticatedSeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_auth_required(self):
+        res = self.client.get(HOLD_URL)
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class AuthenticatedSeatHoldApiTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+
+        self.other_client = APIClient()
+        self.other_client.force_authenticate(
+            user=sample_user(email="other@test.test")
+        )
+
+        now = timezone.now()
+        self.trip = sample_trip(
+            route=sample_route(),
+            train=sample_train(),
+            departure_time=now + datetime.timedelta(days=1),
+            arrival_time=now + datetime.timedelta(days=1, hours=4),
+        )
+
+    def hold(self, client, *seats):
+        return client.post(
+            HOLD_URL,
+            data=[
+                {"trip": self.trip.id, "cargo": cargo, "seat": seat}
+                for cargo, seat in seats
+            ],
+            format="json",
+        )
+
+    def test_hold_seats(self):
+        res = self.hold(self.client, (1, 1), (1, 2))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data), 2)
+        self.assertEqual(SeatHold.objects.filter(user=self.user).count(), 2)
+
+    def test_hold_requires_seats(self):
+        res = self.hold(self.client)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(SeatHold.objects.exists())
+
+    def test_seat_held_by_other_user_conflicts(self):
+        self.hold(self.client, (1, 1))
+
+        res = self.hold(self.other_client, (1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["unavailable_tickets"],
+            [{"trip": self.trip.id, "cargo": 1, "seat": 1}],
+        )
+
+    def test_order_on_seat_held_by_other_user_conflicts(self):
+        self.hold(self.client, (1, 1))
+
+        res = self.other_client.post(
+            ORDER_URL,
+            data={"tickets": [{"trip": self.trip.id, "cargo": 1, "seat": 1}]},
+            format="json",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_expired_hold_is_released(self):
+        self.hold(self.client, (1, 1))
+        SeatHold.objects.update(
+            expires_at=timezone.now() - datetime.timedelta(seconds=1)
+        )
+
+        res = self.hold(self.other_client, (1, 1))
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(SeatHold.objects.count(), 1)
+
+    def test_holds_reduce_availability_and_fill_seat_map(self):
+        self.hold(self.client, (1, 1), (1, 2))
+
+        res = self.client.get(TRIP_URL)
+        self.assertEqual(
+            res.data["results"][0]["tickets_available"],
+            self.trip.train.capacity - 2,
+        )
+
+        res = self.client.get(
+            TRIP_DETAIL_URL(self.trip.id), {"seats": "list"}
+        )
+        self.assertEqual(
+            res.data["taken_seats"],
+            [{"cargo": 1, "seat": 1}, {"cargo": 1, "seat": 2}],
+        )
+
+    def test_checkout_converts_holds_into_order(self):
+        self.hold(self.client, (1, 1), (1, 2))
+
+        res = self.client.post(CHECKOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(res.data["tickets"]), 2)
+        self.assertFalse(SeatHold.objects.exists())
+        self.assertEqual(
+            Ticket.objects.filter(order__user=self.user).count(), 2
+        )
+
+    def test_checkout_without_holds(self):
+        res = self.client.post(CHECKOUT_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,155 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from train_service.journeys import TIMETABLE_VERSION, Timetable
+from train_service.versions import get_version
+from utils.samples import (
+    sample_user,
+    sample_station,
+    sample_route,
+    sample_train,
+    sample_trip,
+)
+
+JOURNEY_URL = reverse("train_service:journey-list")
+
+HOUR = 3600
+
+
+class TimetableSearchTests(SimpleTestCase):
+    def setUp(self):
+        # trip id, source, destination, departure, arrival
+        self.timetable = Timetable(
+            [
+                (1, "A", "C", 0, 10 * HOUR),
+                (2, "A", "B", 0, 2 * HOUR),
+                (3, "B", "C", 2 * HOUR + 300, 4 * HOUR),
+                (4, "B", "C", 3 * HOUR, 5 * HOUR),
+                (5, "A", "D", 0, 1800),
+                (6, "D", "B", 2700, HOUR),
+                (7, "B", "C", HOUR + 900, HOUR + 1800),
+            ]
+        )
+
+    def test_returns_pareto_itineraries_by_arrival(self):
+        self.assertEqual(
+            self.timetable.search("A", "C", 0, min_transfer=600),
+            [[5, 6, 7], [2, 4], [1]],
+        )
+
+    def test_respects_min_transfer(self):
+        self.assertEqual(
+            self.timetable.search(
+                "A", "C", 0, min_transfer=600, max_transfers=1
+            ),
+            [[2, 4], [1]],
+        )
+        self.assertEqual(
+            self.timetable.search(
+                "A", "C", 0, min_transfer=300, max_transfers=1
+            ),
+            [[2, 3], [1]],
+        )
+
+    def test_direct_only(self):
+        self.assertEqual(
+            self.timetable.search("A", "C", 0, max_transfers=0), [[1]]
+        )
+
+    def test_departure_after_all_trips(self):
+        self.assertEqual(self.timetable.search("A", "C", 10 * HOUR), [])
+
+
+class JourneyApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+        self.station_a = sample_station(name="A")
+        self.station_b = sample_station(name="B")
+        self.station_c = sample_station(name="C")
+        train = sample_train()
+        start = timezone.now() + datetime.timedelta(days=1)
+
+        self.first_leg = sample_trip(
+            route=sample_route(
+                source=self.station_a, destination=self.station_b
+            ),
+            train=train,
+            departure_time=start,
+            arrival_time=start + datetime.timedelta(hours=1),
+        )
+        self.second_leg = sample_trip(
+            route=sample_route(
+                source=self.station_b, destination=self.station_c
+            ),
+            train=train,
+            departure_time=start + datetime.timedelta(hours=2),
+            arrival_time=start + datetime.timedelta(hours=3),
+        )
+
+    def test_search_journey_with_transfer(self):
+        res = self.client.get(
+            JOURNEY_URL,
+            {"source": self.station_a.id, "destination": self.station_c.id},
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["results"]), 1)
+        journey = res.data["results"][0]
+        self.assertEqual(journey["transfers"], 1)
+        self.assertEqual(
+            [leg["id"] for leg in journey["legs"]],
+            [self.first_leg.id, self.second_leg.id],
+        )
+        self.assertEqual(
+            journey["tickets_available"], self.first_leg.train.capacity
+        )
+
+    def test_new_trip_is_searchable(self):
+        self.client.get(
+            JOURNEY_URL,
+            {"source": self.station_a.id, "destination": self.station_c.id},
+        )
+        departure = timezone.now() + datetime.timedelta(hours=1)
+        direct = sample_trip(
+            route=sample_route(
+                source=self.station_a, destination=self.station_c
+            ),
+            train=sample_train(),
+            departure_time=departure,
+            arrival_time=departure + datetime.timedelta(hours=1),
+        )
+
+        res = self.client.get(
+            JOURNEY_URL,
+            {"source": self.station_a.id, "destination": self.station_c.id},
+        )
+
+        self.assertEqual(
+            res.data["results"][0]["legs"][0]["id"], direct.id
+        )
+
+    def test_timetable_version_changes_again_on_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.first_leg.save()
+            before_commit = get_version(TIMETABLE_VERSION)
+
+        for callback in callbacks:
+            callback()
+
+        self.assertNotEqual(get_version(TIMETABLE_VERSION), before_commit)
+
+    def test_invalid_station(self):
+        res = self.client.get(
+            JOURNEY_URL, {"source": self.station_a.id, "destination": 999}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
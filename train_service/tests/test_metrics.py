@@ -0,0 +1,184 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from prometheus_client.parser import text_string_to_metric_families
+from rest_framework import status
+from rest_framework.test import APIClient
+from rest_framework.throttling import SimpleRateThrottle
+
+from utils.samples import (
+    sample_station,
+    sample_superuser,
+    sample_trip,
+    sample_user,
+)
+
+METRICS_URL = reverse("metrics")
+ORDER_URL = reverse("train_service:order-list")
+STATION_URL = reverse("train_service:station-list")
+
+
+def sample_value(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(SERVER_TIMING_LOG_MS=60_000)
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(self.user)
+        self.trip = sample_trip()
+
+    def post_order(self, *seats, query=""):
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": seat, "trip": self.trip.id}
+                for seat in seats
+            ]
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                ORDER_URL + query, data=payload, format="json"
+            )
+
+    def test_request_count_latency_and_queries(self):
+        labels = {"viewset": "StationViewSet", "action": "list"}
+        requests = sample_value(
+            "train_service_requests_total",
+            method="GET",
+            status="200",
+            **labels,
+        )
+        observed = sample_value(
+            "train_service_request_duration_seconds_count", **labels
+        )
+        sample_station()
+
+        self.client.get(STATION_URL)
+
+        self.assertEqual(
+            sample_value(
+                "train_service_requests_total",
+                method="GET",
+                status="200",
+                **labels,
+            ),
+            requests + 1,
+        )
+        self.assertEqual(
+            sample_value(
+                "train_service_request_duration_seconds_count", **labels
+            ),
+            observed + 1,
+        )
+        self.assertGreater(
+            sample_value("train_service_request_queries_sum", **labels), 0
+        )
+
+    def test_order_outcomes_and_seats_sold(self):
+        created = sample_value("train_service_orders_total", outcome="created")
+        partial = sample_value("train_service_orders_total", outcome="partial")
+        conflicts = sample_value(
+            "train_service_orders_total", outcome="conflict"
+        )
+        sold = sample_value("train_service_seats_sold_total")
+
+        self.assertEqual(
+            self.post_order(1, 2).status_code, status.HTTP_201_CREATED
+        )
+        self.assertEqual(
+            self.post_order(2, 3).status_code, status.HTTP_409_CONFLICT
+        )
+        self.assertEqual(
+            self.post_order(3, 4, query="?partial=true").status_code,
+            status.HTTP_201_CREATED,
+        )
+        self.assertEqual(
+            self.post_order(4, 5, query="?partial=true").status_code,
+            status.HTTP_201_CREATED,
+        )
+
+        self.assertEqual(
+            sample_value("train_service_orders_total", outcome="created"),
+            created + 2,
+        )
+        self.assertEqual(
+            sample_value("train_service_orders_total", outcome="partial"),
+            partial + 1,
+        )
+        self.assertEqual(
+            sample_value("train_service_orders_total", outcome="conflict"),
+            conflicts + 1,
+        )
+        self.assertEqual(
+            sample_value("train_service_seats_sold_total"), sold + 5
+        )
+
+    def test_throttled_requests(self):
+        labels = {"viewset": "StationViewSet", "action": "list"}
+        throttled = sample_value(
+            "train_service_throttled_requests_total", **labels
+        )
+        rates = {"anon": "1/day", "user": "1/day", "autocomplete": "1/day"}
+
+        with mock.patch.object(SimpleRateThrottle, "THROTTLE_RATES", rates):
+            self.client.get(STATION_URL)
+            res = self.client.get(STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(
+            sample_value("train_service_throttled_requests_total", **labels),
+            throttled + 1,
+        )
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_exposition(self):
+        self.client.get(STATION_URL)
+
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res["Content-Type"].startswith("text/plain"))
+        names = {
+            family.name
+            for family in text_string_to_metric_families(
+                res.content.decode()
+            )
+        }
+        self.assertLessEqual(
+            {
+                "train_service_requests",
+                "train_service_request_duration_seconds",
+                "train_service_request_queries",
+                "train_service_throttled_requests",
+                "train_service_orders",
+                "train_service_seats_sold",
+            },
+            names,
+        )
+
+    def test_disabled_without_token(self):
+        self.client.force_authenticate(sample_superuser())
+
+        res = self.client.get(METRICS_URL, HTTP_AUTHORIZATION="Bearer ")
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_token_required(self):
+        for authorization in ("", "Bearer wrong", "secret", "Bearer é"):
+            res = self.client.get(
+                METRICS_URL, HTTP_AUTHORIZATION=authorization
+            )
+            self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
+        res = self.client.get(
+            METRICS_URL, HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
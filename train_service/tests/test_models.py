@@ -118,6 +118,27 @@ class TicketModelTest(TestCase):
                 trip=self.trip,
             )
 
+    def test_ticket_create_increments_tickets_sold(self):
+        sample_ticket(trip=self.trip, seat=2, order=self.ticket.order)
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.tickets_sold, 2)
+        self.assertEqual(
+            self.trip.tickets_available, self.trip.train.capacity - 2
+        )
+
+    def test_ticket_delete_decrements_tickets_sold(self):
+        self.ticket.delete()
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.tickets_sold, 0)
+
+    def test_order_delete_decrements_tickets_sold(self):
+        self.ticket.order.delete()
+
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.tickets_sold, 0)
+
     def test_ticket_str(self):
         self.assertEqual(
             str(self.ticket),
@@ -1,11 +1,22 @@
-from django.test import TestCase
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from train_service.models import Order
+from train_service.checks import check_idempotency_cache
+from train_service.models import Order, Ticket, Trip
 from train_service.serializers import OrderSerializer
-from utils.samples import sample_user, sample_order, sample_trip
+from utils.samples import (
+    sample_user,
+    sample_order,
+    sample_trip,
+    sample_ticket,
+)
 
 ORDER_URL = reverse("train_service:order-list")
 
@@ -19,6 +30,87 @@ class UnauthenticatedOrderApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class IdempotentOrderApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+        self.trip = sample_trip()
+
+    def post_order(self, seat, key):
+        payload = {"tickets": [{"cargo": 1, "seat": seat, "trip": self.trip.id}]}
+        return self.client.post(
+            ORDER_URL, data=payload, format="json", HTTP_IDEMPOTENCY_KEY=key
+        )
+
+    def test_retry_replays_first_response(self):
+        first = self.post_order(1, "key-1")
+        retry = self.post_order(1, "key-1")
+
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data, first.data)
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(Order.objects.filter(user=self.user).count(), 1)
+
+    def test_key_reused_with_other_payload(self):
+        self.post_order(1, "key-1")
+
+        res = self.post_order(2, "key-1")
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    def test_key_reused_with_other_query(self):
+        self.post_order(1, "key-1")
+
+        res = self.client.post(
+            f"{ORDER_URL}?partial=true",
+            data={
+                "tickets": [{"cargo": 1, "seat": 1, "trip": self.trip.id}]
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="key-1",
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.locmem.LocMemCache"
+            }
+        }
+    )
+    def test_deploy_check_requires_shared_cache(self):
+        errors = check_idempotency_cache(None)
+
+        self.assertEqual(
+            [error.id for error in errors], ["train_service.E001"]
+        )
+
+    @override_settings(
+        CACHES={
+            "default": {
+                "BACKEND": "django.core.cache.backends.redis.RedisCache",
+                "LOCATION": "redis://localhost:6379/0",
+            }
+        }
+    )
+    def test_deploy_check_accepts_shared_cache(self):
+        self.assertEqual(check_idempotency_cache(None), [])
+
+    def test_failed_request_is_not_stored(self):
+        sample_ticket(trip=self.trip, order=sample_order(user=self.user))
+        self.assertEqual(
+            self.post_order(1, "key-1").status_code, status.HTTP_409_CONFLICT
+        )
+        Ticket.objects.all().delete()
+
+        res = self.post_order(1, "key-1")
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+
 class AuthenticatedOrderApiTests(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -50,3 +142,112 @@ class AuthenticatedOrderApiTests(TestCase):
         res = self.client.post(ORDER_URL, data=payload, format="json")
 
         self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+
+    def test_create_order_updates_tickets_sold(self):
+        trip = sample_trip()
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 1, "trip": trip.id},
+                {"cargo": 1, "seat": 2, "trip": trip.id},
+            ]
+        }
+        self.client.post(ORDER_URL, data=payload, format="json")
+
+        trip.refresh_from_db()
+        self.assertEqual(trip.tickets_sold, 2)
+
+    def test_create_order_rejects_repeated_seats(self):
+        trip = sample_trip()
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 2, "trip": trip.id},
+                {"cargo": 1, "seat": 2, "trip": trip.id},
+            ]
+        }
+        res = self.client.post(ORDER_URL, data=payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            res.data["tickets"],
+            [{}, {"seat": ["Seat 2 in cargo 1 is requested twice."]}],
+        )
+
+    def test_create_order_with_taken_seat_conflicts(self):
+        trip = sample_trip()
+        sample_ticket(trip=trip, order=sample_order(user=self.user))
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 1, "trip": trip.id},
+                {"cargo": 1, "seat": 2, "trip": trip.id},
+            ]
+        }
+        res = self.client.post(ORDER_URL, data=payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["unavailable_tickets"],
+            [{"trip": trip.id, "cargo": 1, "seat": 1}],
+        )
+        self.assertEqual(Ticket.objects.filter(trip=trip).count(), 1)
+
+    def test_create_order_partial_skips_taken_seats(self):
+        trip = sample_trip()
+        sample_ticket(trip=trip, order=sample_order(user=self.user))
+        payload = {
+            "tickets": [
+                {"cargo": 1, "seat": 1, "trip": trip.id},
+                {"cargo": 1, "seat": 2, "trip": trip.id},
+            ]
+        }
+        res = self.client.post(
+            f"{ORDER_URL}?partial=true", data=payload, format="json"
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(t["cargo"], t["seat"]) for t in res.data["tickets"]], [(1, 2)]
+        )
+        self.assertEqual(
+            res.data["unavailable_tickets"],
+            [{"trip": trip.id, "cargo": 1, "seat": 1}],
+        )
+        trip.refresh_from_db()
+        self.assertEqual(trip.tickets_sold, 2)
+
+    def test_create_order_on_trip_deleted_before_locking_conflicts(self):
+        trip = sample_trip()
+        lock = Trip.lock
+
+        def delete_and_lock(trip_id):
+            Trip.objects.filter(pk=trip_id).delete()
+            return lock(trip_id)
+
+        payload = {"tickets": [{"cargo": 1, "seat": 1, "trip": trip.id}]}
+        with mock.patch.object(Trip, "lock", side_effect=delete_and_lock):
+            res = self.client.post(ORDER_URL, data=payload, format="json")
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(
+            res.data["unavailable_tickets"],
+            [{"trip": trip.id, "cargo": 1, "seat": 1}],
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_create_order_query_count_does_not_grow_with_seats(self):
+        trip = sample_trip()
+
+        def post_order(seats):
+            payload = {
+                "tickets": [
+                    {"cargo": 2, "seat": seat, "trip": trip.id}
+                    for seat in seats
+                ]
+            }
+            with CaptureQueriesContext(connection) as queries:
+                res = self.client.post(ORDER_URL, data=payload, format="json")
+            self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+            return len(queries)
+
+        self.assertEqual(post_order(range(1, 3)), post_order(range(3, 20)))
+        trip.refresh_from_db()
+        self.assertEqual(trip.tickets_sold, 19)
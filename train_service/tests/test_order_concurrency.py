@@ -0,0 +1,82 @@
+import random
+import unittest
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from train_service.models import Ticket
+from utils.samples import sample_user, sample_trip, sample_train
+
+ORDER_URL = reverse("train_service:order-list")
+
+
+@unittest.skipUnless(
+    connection.vendor == "postgresql",
+    "Concurrent booking needs row locks from PostgreSQL.",
+)
+class ConcurrentOrderTests(TransactionTestCase):
+    workers = 32
+    orders = 300
+
+    def setUp(self):
+        # One user per worker keeps every client under the user throttle.
+        self.users = [
+            sample_user(email=f"user{index}@test.test")
+            for index in range(self.workers)
+        ]
+        self.trip = sample_trip(
+            train=sample_train(cargo_num=2, places_in_cargo=50)
+        )
+
+    def book(self, index, seats):
+        client = APIClient()
+        client.force_authenticate(user=self.users[index % self.workers])
+        payload = {
+            "tickets": [
+                {"cargo": cargo, "seat": seat, "trip": self.trip.id}
+                for cargo, seat in seats
+            ]
+        }
+        try:
+            return client.post(ORDER_URL, data=payload, format="json")
+        finally:
+            connections.close_all()
+
+    def test_parallel_bookings_never_double_sell(self):
+        rng = random.Random(42)
+        requests = [
+            rng.sample(
+                [(cargo, seat) for cargo in (1, 2) for seat in range(1, 51)],
+                rng.randint(1, 4),
+            )
+            for _ in range(self.orders)
+        ]
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            responses = list(
+                executor.map(self.book, range(self.orders), requests)
+            )
+
+        statuses = Counter(res.status_code for res in responses)
+        self.assertEqual(
+            set(statuses),
+            {status.HTTP_201_CREATED, status.HTTP_409_CONFLICT},
+        )
+
+        sold = sum(
+            len(res.data["tickets"])
+            for res in responses
+            if res.status_code == status.HTTP_201_CREATED
+        )
+        self.trip.refresh_from_db()
+        self.assertEqual(Ticket.objects.filter(trip=self.trip).count(), sold)
+        self.assertEqual(self.trip.tickets_sold, sold)
+
+        for res in responses:
+            if res.status_code == status.HTTP_409_CONFLICT:
+                self.assertTrue(res.data["unavailable_tickets"])
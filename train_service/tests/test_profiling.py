@@ -0,0 +1,178 @@
+import json
+import tempfile
+import threading
+from collections import Counter
+from pathlib import Path
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from train_service import profiling
+from train_service.profiling import Sampler
+from utils.samples import sample_station, sample_superuser, sample_user
+
+STATION_URL = reverse("train_service:station-list")
+
+
+@override_settings(
+    SERVER_TIMING_LOG_MS=60_000,
+    PROFILING=True,
+    PROFILING_SAMPLE_RATE=0,
+    PROFILING_SLOW_MS=0,
+)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        sample_station(name="Kyiv")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        settings = override_settings(PROFILING_DIR=self.directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def profiles(self):
+        return [
+            json.loads(path.read_text())
+            for path in sorted(self.directory.glob("*.json"))
+        ]
+
+    def test_unsampled_requests_are_not_profiled(self):
+        self.client.get(STATION_URL)
+
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING=False, PROFILING_SAMPLE_RATE=1)
+    def test_disabled(self):
+        self.client.get(STATION_URL)
+
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request(self):
+        self.client.get(STATION_URL, {"page": 1})
+
+        [profile] = self.profiles()
+        self.assertEqual(profile["reason"], "sampled")
+        self.assertEqual(profile["path"], STATION_URL)
+        self.assertEqual(profile["query"], {"page": ["<redacted>"]})
+        self.assertEqual(profile["status"], 200)
+        self.assertEqual(profile["query_count"], len(profile["queries"]))
+        self.assertIn("cumulative", profile["stats"])
+        station_query = next(
+            query
+            for query in profile["queries"]
+            if "train_service_station" in query["sql"]
+        )
+        self.assertIn("explain", station_query)
+        self.assertEqual(len(list(self.directory.glob("*.prof"))), 1)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_values_are_not_written(self):
+        user = sample_user(email="private@test.test")
+        token = AccessToken.for_user(user)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        client.get(reverse("user:me"), {"email": "private@test.test"})
+
+        [path] = self.directory.glob("*.json")
+        self.assertNotIn("private@test.test", path.read_text())
+        profile = json.loads(path.read_text())
+        self.assertEqual(profile["query"], {"email": ["<redacted>"]})
+        self.assertTrue(
+            all("params" not in query for query in profile["queries"])
+        )
+        for path in self.directory.iterdir():
+            self.assertEqual(path.stat().st_mode & 0o777, 0o600)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_RECORD_VALUES=True)
+    def test_values_are_written_when_enabled(self):
+        self.client.get(STATION_URL, {"page": 1})
+
+        [profile] = self.profiles()
+        self.assertEqual(profile["query"], {"page": ["1"]})
+        self.assertTrue(
+            all("params" in query for query in profile["queries"])
+        )
+
+    def test_header_from_staff(self):
+        token = AccessToken.for_user(sample_superuser())
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        res = client.get(STATION_URL, HTTP_X_PROFILE="1")
+
+        [profile] = self.profiles()
+        self.assertEqual(profile["reason"], "header")
+        self.assertTrue(
+            (self.directory / f"{res['X-Profile-Id']}.json").exists()
+        )
+
+    def test_header_from_other_users_is_ignored(self):
+        token = AccessToken.for_user(sample_user(email="jwt@test.test"))
+        clients = [APIClient(), APIClient(), APIClient()]
+        clients[1].credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        clients[2].credentials(HTTP_AUTHORIZATION="Bearer invalid")
+
+        with mock.patch.object(profiling.cProfile, "Profile") as profile:
+            for client in clients:
+                res = client.get(STATION_URL, HTTP_X_PROFILE="1")
+                self.assertNotIn("X-Profile-Id", res)
+
+        profile.assert_not_called()
+        self.assertEqual(self.profiles(), [])
+
+    @override_settings(PROFILING_SLOW_MS=0.001)
+    def test_slow_request(self):
+        self.client.get(STATION_URL)
+
+        [profile] = self.profiles()
+        self.assertEqual(profile["reason"], "slow")
+        self.assertNotIn("stats", profile)
+        self.assertEqual(list(self.directory.glob("*.prof")), [])
+
+    @override_settings(PROFILING_SAMPLE_RATE=1, PROFILING_MAX_FILES=2)
+    def test_rotation(self):
+        for _ in range(3):
+            self.client.get(STATION_URL)
+
+        self.assertEqual(len(list(self.directory.glob("*.json"))), 2)
+        self.assertEqual(len(list(self.directory.glob("*.prof"))), 2)
+
+
+class SamplerTests(SimpleTestCase):
+    def setUp(self):
+        self.sampler = Sampler()
+        self.stacks = Counter()
+
+    def test_samples_threads_past_their_deadline(self):
+        self.sampler.active[threading.get_ident()] = (0, self.stacks)
+
+        self.sampler.sample()
+        self.sampler.sample()
+
+        [(stack, count)] = self.stacks.items()
+        self.assertEqual(count, 2)
+        self.assertTrue(
+            stack.endswith(
+                f"{__name__}:test_samples_threads_past_their_deadline;"
+                "train_service.profiling:sample"
+            )
+        )
+
+    def test_skips_threads_before_their_deadline(self):
+        self.sampler.active[threading.get_ident()] = (
+            float("inf"),
+            self.stacks,
+        )
+
+        self.sampler.sample()
+
+        self.assertEqual(self.stacks, Counter())
@@ -0,0 +1,153 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.cache import cache
+from django.test import LiveServerTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from benchmarks.replay import Client, read_records, replay, report
+from utils.samples import (
+    sample_station,
+    sample_superuser,
+    sample_trip,
+    sample_user,
+)
+
+ORDER_URL = reverse("train_service:order-list")
+STATION_URL = reverse("train_service:station-list")
+TOKEN_URL = reverse("user:token_obtain_pair")
+
+
+def station_detail_url(station_id):
+    return reverse("train_service:station-detail", args=[station_id])
+
+
+class RecordingMixin:
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "traffic.jsonl"
+        settings = override_settings(
+            TRAFFIC_RECORD_FILE=str(self.path), SERVER_TIMING_LOG_MS=60_000
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = APIClient()
+
+    def records(self):
+        if not self.path.exists():
+            return []
+        return [
+            json.loads(line) for line in self.path.read_text().splitlines()
+        ]
+
+
+class TrafficRecorderTests(RecordingMixin, TestCase):
+    def test_disabled(self):
+        with override_settings(TRAFFIC_RECORD_FILE=""):
+            self.client.get(STATION_URL)
+
+        self.assertEqual(self.records(), [])
+
+    def test_records_order(self):
+        user = sample_user()
+        self.client.force_authenticate(user)
+        trip = sample_trip()
+
+        self.client.post(
+            f"{ORDER_URL}?partial=true",
+            {"tickets": [{"trip": trip.id, "cargo": 1, "seat": 2}]},
+            format="json",
+        )
+
+        [record] = self.records()
+        self.assertEqual(record["method"], "POST")
+        self.assertEqual(record["path"], ORDER_URL)
+        self.assertEqual(record["query"], {"partial": ["true"]})
+        self.assertEqual(
+            record["body"],
+            {"tickets": [{"trip": trip.id, "cargo": 1, "seat": 2}]},
+        )
+        self.assertEqual(record["user"], "user")
+        self.assertEqual(record["status"], 201)
+        self.assertGreater(record["ms"], 0)
+
+    def test_strings_and_credentials_are_not_recorded(self):
+        sample_user(email="someone@test.test", password="hunter22")
+
+        self.client.post(
+            f"{TOKEN_URL}?token=abc",
+            {"email": "someone@test.test", "password": "hunter22"},
+            format="json",
+        )
+
+        [record] = self.records()
+        self.assertEqual(record["query"], {"token": ["<redacted>"]})
+        self.assertEqual(
+            record["body"], {"email": "<str>", "password": "<str>"}
+        )
+        self.assertEqual(record["user"], "anonymous")
+        self.assertNotIn("hunter22", self.path.read_text())
+
+    def test_other_bodies_are_recorded_by_content_type(self):
+        self.client.force_authenticate(sample_superuser())
+
+        self.client.post(STATION_URL, {"name": "Lviv"}, format="multipart")
+
+        [record] = self.records()
+        self.assertNotIn("body", record)
+        self.assertEqual(record["content_type"], "multipart/form-data")
+        self.assertEqual(record["user"], "staff")
+
+    def test_only_api_requests(self):
+        self.client.get(reverse("metrics"))
+
+        self.assertEqual(self.records(), [])
+
+
+class ReplayTests(RecordingMixin, LiveServerTestCase):
+    def test_replays_recording(self):
+        sample_user()
+        sample_superuser()
+        station = sample_station(name="Kyiv")
+        self.client.get(STATION_URL)
+        self.client.force_authenticate(sample_user(email="other@test.test"))
+        self.client.get(station_detail_url(station.id))
+        self.client.get(station_detail_url(station.id + 100))
+        self.client.force_authenticate(
+            sample_superuser(email="admin2@test.test")
+        )
+        self.client.post(
+            STATION_URL,
+            {"name": "Lviv", "latitude": 49.84, "longitude": 24.03},
+            format="json",
+        )
+        records = read_records(self.path)
+
+        client = Client(
+            self.live_server_url,
+            {
+                "user": ("test@test.test", "password"),
+                "staff": ("admin@test.test", "password"),
+            },
+        )
+        results, elapsed = replay(records, client.send, speed=0)
+        summary = report(records, results, elapsed)
+
+        self.assertEqual(summary["requests"], 4)
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(summary["status_mismatches"], 0)
+        self.assertEqual(
+            summary["statuses"], {"200": 1, "201": 1, "401": 1, "404": 1}
+        )
+        self.assertEqual(
+            summary["endpoints"]["GET /api/train_service/stations/{id}/"][
+                "requests"
+            ],
+            2,
+        )
+        self.assertIn("p99_ms", summary)
+        self.assertGreater(summary["throughput_rps"], 0)
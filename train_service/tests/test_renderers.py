@@ -0,0 +1,121 @@
+import datetime
+import decimal
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from train_service.renderers import FastJSONRenderer, StreamingListMixin
+from utils.samples import (
+    sample_station,
+    sample_superuser,
+    sample_trip,
+    sample_user,
+)
+
+STATION_URL = reverse("train_service:station-list")
+TRIP_URL = reverse("train_service:trip-list")
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    def setUp(self):
+        self.renderer = FastJSONRenderer()
+        self.payload = {
+            "count": 2,
+            "next": None,
+            "results": [
+                {"id": 1, "name": "Kyïv Pasazhyrskyi", "rate": 1.5},
+                {"id": 2, "name": "Lviv", "tags": ["a", "b"]},
+            ],
+        }
+
+    def test_matches_drf_renderer(self):
+        self.assertEqual(
+            self.renderer.render(self.payload),
+            JSONRenderer().render(self.payload),
+        )
+
+    def test_encodes_datetimes_decimals_and_lazy_strings(self):
+        content = self.renderer.render(
+            {
+                "at": datetime.datetime(
+                    2030, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc
+                ),
+                "price": decimal.Decimal("12.50"),
+                "label": gettext_lazy("Train"),
+            }
+        )
+
+        self.assertEqual(
+            json.loads(content),
+            {"at": "2030-01-02T03:04:05Z", "price": 12.5, "label": "Train"},
+        )
+
+    def test_indent_falls_back_to_drf(self):
+        content = self.renderer.render(
+            {"a": 1}, "application/json; indent=2"
+        )
+
+        self.assertEqual(content, b'{\n  "a": 1\n}')
+
+    def test_list_chunks_join_to_full_rendering(self):
+        items = self.payload["results"]
+        for chunks in ([items], [items[:1], [], items[1:]], [], [[]]):
+            with self.subTest(chunks=chunks):
+                self.assertEqual(
+                    b"".join(self.renderer.render_list(chunks)),
+                    self.renderer.render(sum(chunks, [])),
+                )
+
+
+class StreamingListTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_superuser())
+        for name in ("Kyiv", "Lviv", "Odesa"):
+            sample_station(name=name)
+
+    def test_unpaginated_list_is_streamed(self):
+        with mock.patch.object(StreamingListMixin, "stream_chunk_size", 2):
+            res = self.client.get(STATION_URL, {"pagination": "none"})
+            content = list(res.streaming_content)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res["Content-Type"], "application/json")
+        self.assertNotIn("ETag", res)
+        self.assertEqual(len(content), 3)
+        self.assertEqual(
+            [station["name"] for station in json.loads(b"".join(content))],
+            ["Kyiv", "Lviv", "Odesa"],
+        )
+
+    def test_unpaginated_trips_match_pages(self):
+        departure = timezone.now() + datetime.timedelta(days=1)
+        for hours in range(3):
+            sample_trip(
+                departure_time=departure + datetime.timedelta(hours=hours),
+                arrival_time=departure + datetime.timedelta(hours=hours + 1),
+            )
+
+        res = self.client.get(TRIP_URL, {"pagination": "none"})
+        page = self.client.get(TRIP_URL, {"limit": 100})
+
+        self.assertEqual(
+            json.loads(b"".join(res.streaming_content)),
+            json.loads(page.content)["results"],
+        )
+
+    def test_staff_only(self):
+        self.client.force_authenticate(sample_user())
+
+        res = self.client.get(STATION_URL, {"pagination": "none"})
+
+        self.assertEqual(res.status_code, status.HTTP_403_FORBIDDEN)
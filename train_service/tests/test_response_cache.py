@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from utils.samples import (
+    sample_route,
+    sample_station,
+    sample_train,
+    sample_user,
+)
+
+STATION_URL = reverse("train_service:station-list")
+ROUTE_URL = reverse("train_service:route-list")
+TRAIN_DETAIL_URL = lambda pk: reverse(
+    "train_service:train-detail", kwargs={"pk": pk}
+)
+
+
+def cache_lookups(basename, result):
+    return (
+        REGISTRY.get_sample_value(
+            "train_service_response_cache_lookups_total",
+            {"basename": basename, "result": result},
+        )
+        or 0
+    )
+
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.lookups_before = {
+            (basename, result): cache_lookups(basename, result)
+            for basename in ("station", "train")
+            for result in ("hit", "miss")
+        }
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        self.station = sample_station(name="Kyiv")
+
+    def lookups(self, basename, result):
+        """Lookups counted since setUp."""
+        return (
+            cache_lookups(basename, result)
+            - self.lookups_before[(basename, result)]
+        )
+
+    def test_repeated_list_is_served_from_cache(self):
+        first = self.client.get(STATION_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(STATION_URL)
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(self.lookups("station", "hit"), 1)
+        self.assertEqual(self.lookups("station", "miss"), 1)
+
+    def test_query_parameters_are_part_of_the_key(self):
+        self.client.get(STATION_URL, {"limit": 1, "offset": 0})
+
+        res = self.client.get(STATION_URL, {"limit": 2, "offset": 0})
+        same = self.client.get(STATION_URL, {"offset": 0, "limit": 2})
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(same["X-Cache"], "HIT")
+
+    def test_write_invalidates_cached_list(self):
+        self.client.get(STATION_URL)
+        sample_station(name="Lviv")
+
+        res = self.client.get(STATION_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["count"], 2)
+
+    def test_related_write_invalidates_cached_list(self):
+        sample_route(source=self.station)
+        self.client.get(ROUTE_URL)
+
+        self.station.name = "Kyiv Passenger"
+        self.station.save()
+        res = self.client.get(ROUTE_URL)
+
+        self.assertEqual(res["X-Cache"], "MISS")
+        self.assertEqual(res.data["results"][0]["source"], "Kyiv Passenger")
+
+    def test_related_write_invalidates_cached_detail(self):
+        train = sample_train()
+        self.client.get(TRAIN_DETAIL_URL(train.id))
+
+        train.train_type.name = "Express"
+        train.train_type.save()
+        res = self.client.get(TRAIN_DETAIL_URL(train.id))
+
+        self.assertEqual(res.data["train_type"], "Express")
+
+    def test_errors_are_not_cached(self):
+        self.client.get(TRAIN_DETAIL_URL(999))
+
+        res = self.client.get(TRAIN_DETAIL_URL(999))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.lookups("train", "miss"), 2)
+        self.assertEqual(self.lookups("train", "hit"), 0)
+
+    def test_cached_response_still_requires_authentication(self):
+        self.client.get(STATION_URL)
+
+        res = APIClient().get(STATION_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -1,4 +1,6 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -121,6 +123,49 @@ class RouteFilteringTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data.get("results"), serializer.data)
 
+    def test_filter_by_name_is_case_insensitive(self):
+        res = self.client.get(ROUTE_URL, {"source": "station a"})
+
+        self.assertEqual(
+            [route["id"] for route in res.data["results"]],
+            [self.route_1.id, self.route_3.id],
+        )
+
+    def test_filter_by_unknown_name_returns_nothing(self):
+        res = self.client.get(ROUTE_URL, {"source": "Nowhere"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["results"], [])
+
+    def test_filter_by_station_ids(self):
+        res = self.client.get(
+            ROUTE_URL,
+            {
+                "source_id": self.station_1.id,
+                "destination_id": self.station_3.id,
+            },
+        )
+
+        self.assertEqual(
+            [route["id"] for route in res.data["results"]],
+            [self.route_3.id],
+        )
+
+    def test_filter_by_invalid_station_id(self):
+        res = self.client.get(ROUTE_URL, {"source_id": "abc"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("source_id", res.data)
+
+    def test_name_filter_resolves_station_ids_first(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(ROUTE_URL, {"source": "Station A"})
+
+        station_lookup, count = queries.captured_queries[:2]
+        self.assertIn("train_service_station", station_lookup["sql"])
+        self.assertIn('"source_id" IN', count["sql"])
+        self.assertNotIn("JOIN", count["sql"])
+
 
 class AdminRouteApiTests(TestCase):
     def setUp(self):
@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+
+from train_service.seat_assignment import assign_seats, free_runs
+from train_service.seat_map import build_seat_map
+
+
+def make_train(cargo_num=2, places_in_cargo=10):
+    return SimpleNamespace(cargo_num=cargo_num, places_in_cargo=places_in_cargo)
+
+
+class FreeRunsTests(SimpleTestCase):
+    def test_free_runs(self):
+        self.assertEqual(
+            list(free_runs(0b1110011)), [(1, 2), (5, 3)]
+        )
+
+
+class AssignSeatsTests(SimpleTestCase):
+    def test_prefers_smallest_contiguous_block(self):
+        train = make_train()
+        taken = [(1, seat) for seat in (3, 4, 5, 6, 7, 8, 9, 10)]
+        taken += [(2, 5)]
+        seat_map = build_seat_map(train, taken)
+
+        self.assertEqual(
+            assign_seats(seat_map, train, 2), [(1, 1), (1, 2)]
+        )
+        self.assertEqual(
+            assign_seats(seat_map, train, 4), [(2, 1), (2, 2), (2, 3), (2, 4)]
+        )
+
+    def test_keeps_party_in_one_cargo(self):
+        train = make_train()
+        taken = [(1, seat) for seat in range(1, 11)]
+        taken += [(2, seat) for seat in (3, 6, 9)]
+        seat_map = build_seat_map(train, taken)
+
+        self.assertEqual(
+            assign_seats(seat_map, train, 5),
+            [(2, 1), (2, 2), (2, 4), (2, 5), (2, 7)],
+        )
+
+    def test_spreads_over_cargos(self):
+        train = make_train()
+        taken = [(1, seat) for seat in range(1, 8)]
+        taken += [(2, seat) for seat in range(1, 9)]
+        seat_map = build_seat_map(train, taken)
+
+        self.assertEqual(
+            assign_seats(seat_map, train, 5),
+            [(1, 8), (1, 9), (1, 10), (2, 9), (2, 10)],
+        )
+
+    def test_not_enough_seats(self):
+        train = make_train(cargo_num=1, places_in_cargo=3)
+        seat_map = build_seat_map(train, [(1, 2)])
+
+        self.assertIsNone(assign_seats(seat_map, train, 3))
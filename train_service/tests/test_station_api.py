@@ -1,8 +1,11 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
+from train_service.autocomplete import StationNameIndex
+from train_service.geo import StationGrid, haversine
 from train_service.models import Station
 from train_service.serializers import StationSerializer
 from utils.samples import (
@@ -12,6 +15,8 @@ from utils.samples import (
 )
 
 STATION_URL = reverse("train_service:station-list")
+NEARBY_URL = reverse("train_service:station-nearby")
+AUTOCOMPLETE_URL = reverse("train_service:station-autocomplete")
 STATION_DETAIL_URL = lambda pk: reverse(
     "train_service:station-detail", kwargs={"pk": pk}
 )
@@ -44,6 +49,31 @@ class AuthenticatedStationApiTests(TestCase):
         self.assertEqual(res.status_code, status.HTTP_200_OK)
         self.assertEqual(res.data.get("results"), serializer.data)
 
+    def test_list_stations_cursor_pagination(self):
+        station = sample_station()
+
+        res = self.client.get(STATION_URL, {"pagination": "cursor", "limit": 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertEqual(res.data["results"][0]["id"], self.station.id)
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(res.data["results"][0]["id"], station.id)
+
+    def test_list_stations_limit_is_capped(self):
+        Station.objects.bulk_create(
+            Station(name=f"Station {i}", latitude=0, longitude=0)
+            for i in range(100)
+        )
+
+        res = self.client.get(STATION_URL, {"limit": 1_000_000})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data["count"], 101)
+        self.assertEqual(len(res.data["results"]), 100)
+
     def test_retrieve_station(self):
         res = self.client.get(STATION_DETAIL_URL(self.station.id))
 
@@ -83,3 +113,165 @@ class AdminStationApiTest(TestCase):
         station = Station.objects.get(pk=res.data["id"])
         for key in payload.keys():
             self.assertEqual(payload[key], getattr(station, key))
+
+
+class StationGridTests(SimpleTestCase):
+    def setUp(self):
+        self.grid = StationGrid(
+            [
+                (1, 50.45, 30.52),  # Kyiv
+                (2, 49.84, 24.03),  # Lviv
+                (3, 46.48, 30.72),  # Odesa
+                (4, 65.0, 179.9),
+                (5, 65.0, -179.9),
+                (6, 89.9, 0.0),
+                (7, 89.9, 180.0),
+            ]
+        )
+
+    def test_haversine(self):
+        self.assertAlmostEqual(
+            haversine(50.45, 30.52, 49.84, 24.03), 467.3, delta=0.5
+        )
+
+    def test_within_radius(self):
+        found = self.grid.within(50.45, 30.52, 450)
+
+        self.assertEqual([station[0] for _, station in found], [1, 3])
+
+    def test_nearest_expands_until_limit(self):
+        found = self.grid.nearest(50.0, 30.0, 3)
+
+        self.assertEqual([station[0] for _, station in found], [1, 3, 2])
+
+    def test_within_across_antimeridian(self):
+        found = self.grid.within(65.0, 179.95, 20)
+
+        self.assertEqual({station[0] for _, station in found}, {4, 5})
+
+    def test_within_around_pole(self):
+        found = self.grid.within(89.95, 90.0, 50)
+
+        self.assertEqual({station[0] for _, station in found}, {6, 7})
+
+
+class NearbyStationApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        self.kyiv = sample_station(name="Kyiv", latitude=50.45, longitude=30.52)
+        self.lviv = sample_station(name="Lviv", latitude=49.84, longitude=24.03)
+        self.odesa = sample_station(
+            name="Odesa", latitude=46.48, longitude=30.72
+        )
+
+    def test_nearby_ordered_by_distance(self):
+        res = self.client.get(NEARBY_URL, {"lat": 50.4, "lon": 30.5})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [station["name"] for station in res.data],
+            ["Kyiv", "Odesa", "Lviv"],
+        )
+        self.assertLess(res.data[0]["distance"], 10)
+
+    def test_nearby_with_radius_and_limit(self):
+        res = self.client.get(
+            NEARBY_URL, {"lat": 50.4, "lon": 30.5, "radius": 450, "limit": 1}
+        )
+
+        self.assertEqual([station["name"] for station in res.data], ["Kyiv"])
+
+    def test_new_station_is_indexed(self):
+        self.client.get(NEARBY_URL, {"lat": 50.4, "lon": 30.5})
+        sample_station(name="Bila Tserkva", latitude=49.8, longitude=30.11)
+
+        res = self.client.get(
+            NEARBY_URL, {"lat": 49.8, "lon": 30.1, "limit": 1}
+        )
+
+        self.assertEqual(res.data[0]["name"], "Bila Tserkva")
+
+    def test_nearby_requires_coordinates(self):
+        res = self.client.get(NEARBY_URL, {"lat": 95})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class StationNameIndexTests(SimpleTestCase):
+    def setUp(self):
+        self.index = StationNameIndex(
+            [
+                (1, "King's Cross"),
+                (2, "Crossway"),
+                (3, "Kingston"),
+                (4, "Zürich HB"),
+                (5, "Cross"),
+            ]
+        )
+
+    def test_name_prefix_ranks_before_word_prefix(self):
+        self.assertEqual(
+            self.index.search("cross"),
+            [(5, "Cross"), (2, "Crossway"), (1, "King's Cross")],
+        )
+
+    def test_limit(self):
+        self.assertEqual(
+            self.index.search("king", limit=1), [(3, "Kingston")]
+        )
+
+    def test_ignores_case_accents_and_spacing(self):
+        self.assertEqual(
+            self.index.search("  ZURICH   h"), [(4, "Zürich HB")]
+        )
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search("xyz"), [])
+        self.assertEqual(self.index.search(" "), [])
+
+
+class StationAutocompleteApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        self.kyiv = sample_station(name="Kyiv Passenger")
+        self.kharkiv = sample_station(name="Kharkiv Passenger")
+
+    def test_autocomplete(self):
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "pass"})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data,
+            [
+                {"id": self.kyiv.id, "name": "Kyiv Passenger"},
+                {"id": self.kharkiv.id, "name": "Kharkiv Passenger"},
+            ],
+        )
+
+    def test_autocomplete_does_not_query_database_once_built(self):
+        self.client.get(AUTOCOMPLETE_URL, {"q": "k"})
+
+        with self.assertNumQueries(0):
+            res = self.client.get(AUTOCOMPLETE_URL, {"q": "ky"})
+
+        self.assertEqual(
+            res.data, [{"id": self.kyiv.id, "name": "Kyiv Passenger"}]
+        )
+
+    def test_renamed_station_is_reindexed(self):
+        self.client.get(AUTOCOMPLETE_URL, {"q": "k"})
+        self.kyiv.name = "Lviv"
+        self.kyiv.save()
+
+        res = self.client.get(AUTOCOMPLETE_URL, {"q": "l"})
+
+        self.assertEqual(res.data, [{"id": self.kyiv.id, "name": "Lviv"}])
+
+    def test_autocomplete_requires_query(self):
+        res = self.client.get(AUTOCOMPLETE_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
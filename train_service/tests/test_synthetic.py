@@ -0,0 +1,66 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F
+from django.test import TestCase
+from django.utils import timezone
+
+from train_service.models import Order, Station, Ticket, Trip
+from train_service.seat_map import taken_seats
+from train_service.synthetic import Sizes, generate
+
+
+class SyntheticDataTests(TestCase):
+    def setUp(self):
+        self.sizes = Sizes(
+            stations=30,
+            routes=60,
+            trains=5,
+            trips=40,
+            users=20,
+            tickets=800,
+            days=7,
+        )
+        self.counts = generate(self.sizes)
+
+    def test_counts(self):
+        self.assertEqual(Station.objects.count(), 30)
+        self.assertEqual(Trip.objects.count(), 40)
+        self.assertEqual(self.counts["tickets"], Ticket.objects.count())
+        # Demand is capped by capacity, so the target is approximate.
+        self.assertGreater(self.counts["tickets"], 400)
+
+    def test_trips_are_upcoming(self):
+        self.assertFalse(
+            Trip.objects.filter(departure_time__lte=timezone.now()).exists()
+        )
+        self.assertFalse(
+            Trip.objects.filter(arrival_time__lte=F("departure_time")).exists()
+        )
+
+    def test_seat_inventory_matches_tickets(self):
+        for trip in Trip.objects.select_related("train"):
+            seats = sorted(trip.tickets.values_list("cargo", "seat"))
+            self.assertEqual(trip.tickets_sold, len(seats))
+            self.assertEqual(
+                sorted(taken_seats(bytes(trip.seat_map), trip.train)), seats
+            )
+
+    def test_orders_book_one_trip(self):
+        orders = Order.objects.annotate(
+            trips=Count("tickets__trip", distinct=True),
+            tickets_count=Count("tickets"),
+        )
+        self.assertEqual(set(orders.values_list("trips", flat=True)), {1})
+        self.assertLessEqual(
+            max(orders.values_list("tickets_count", flat=True)), 4
+        )
+
+    def test_same_seed_same_data(self):
+        names = list(Station.objects.order_by("id").values_list("name"))
+        Station.objects.all().delete()
+        get_user_model().objects.all().delete()
+
+        generate(self.sizes)
+
+        self.assertEqual(
+            list(Station.objects.order_by("id").values_list("name")), names
+        )
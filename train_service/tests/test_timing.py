@@ -0,0 +1,91 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from train_service.timing import measure, server_timing_header
+from utils.samples import sample_station, sample_trip, sample_user
+
+STATION_URL = reverse("train_service:station-list")
+TRIP_URL = reverse("train_service:trip-list")
+
+
+def timings(response):
+    return {
+        match["name"]: (float(match["dur"]), match["desc"])
+        for match in re.finditer(
+            r'(?P<name>\w+);dur=(?P<dur>[\d.]+)(?:;desc="(?P<desc>[^"]*)")?',
+            response["Server-Timing"],
+        )
+    }
+
+
+@override_settings(SERVER_TIMING_LOG_MS=60_000)
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(sample_user())
+        sample_station(name="Kyiv")
+
+    def test_disabled_by_default(self):
+        res = self.client.get(STATION_URL)
+
+        self.assertNotIn("Server-Timing", res)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_reports_queries_and_phases(self):
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(STATION_URL)
+
+        metrics = timings(res)
+        self.assertEqual(metrics["db"][1], f"{len(queries)} queries")
+        self.assertIn("serialize", metrics)
+        self.assertIn("render", metrics)
+        self.assertGreaterEqual(
+            metrics["total"][0], metrics["serialize"][0]
+        )
+
+    @override_settings(SERVER_TIMING=True)
+    def test_trip_list_fast_path_is_timed(self):
+        sample_trip()
+
+        res = self.client.get(TRIP_URL)
+
+        self.assertIn("serialize", timings(res))
+
+    @override_settings(SERVER_TIMING=True, SERVER_TIMING_LOG_MS=0)
+    def test_logs_request(self):
+        with self.assertLogs("train_service.timing", "INFO") as logs:
+            self.client.get(STATION_URL)
+
+        self.assertEqual(len(logs.records), 1)
+        record = logs.records[0]
+        self.assertEqual(record.timing["path"], STATION_URL)
+        self.assertEqual(record.timing["status"], 200)
+        self.assertIn(f"path={STATION_URL} status=200", record.getMessage())
+
+    @override_settings(SERVER_TIMING=True)
+    def test_fast_requests_are_not_logged(self):
+        with self.assertNoLogs("train_service.timing", "INFO"):
+            res = self.client.get(STATION_URL)
+
+        self.assertIn("Server-Timing", res)
+
+
+class TimingHelpersTests(SimpleTestCase):
+    def test_measure_outside_request_is_noop(self):
+        with measure("serialize"):
+            pass
+
+    def test_header_format(self):
+        self.assertEqual(
+            server_timing_header(
+                [("db", 1.234, "2 queries"), ("total", 5.0, None)]
+            ),
+            'db;dur=1.2;desc="2 queries", total;dur=5.0',
+        )
@@ -0,0 +1,126 @@
+import datetime
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.pagination import CursorPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from train_service.models import Route, Trip
+from train_service.serializers import TripListSerializer
+from train_service.views import TripViewSet
+from utils.samples import sample_station, sample_train
+
+TRIP_URL = reverse("train_service:trip-list")
+
+INDEX_SCAN_MARKERS = {
+    "postgresql": ("Index Scan", "Index Only Scan", "Bitmap Index Scan"),
+    "sqlite": ("USING INDEX", "USING COVERING INDEX"),
+}
+
+
+class TripListQueryPlanTests(TestCase):
+    """The trip list filters must stay answerable from indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        stations = [sample_station(name=f"Station {i}") for i in range(20)]
+        routes = Route.objects.bulk_create(
+            Route(source=source, destination=destination, distance=100)
+            for source in stations
+            for destination in stations
+            if source != destination
+        )
+        train = sample_train()
+        start = datetime.datetime.now(tz=datetime.timezone.utc)
+        Trip.objects.bulk_create(
+            Trip(
+                route=routes[i % len(routes)],
+                train=train,
+                departure_time=start + datetime.timedelta(hours=i - 500),
+                arrival_time=start + datetime.timedelta(hours=i - 496),
+            )
+            for i in range(5000)
+        )
+        # A station on one route: its trips are too rare to find by
+        # walking the departure index.
+        cls.source = sample_station(name="Terminus")
+        branch = Route.objects.create(
+            source=cls.source, destination=stations[0], distance=10
+        )
+        Trip.objects.bulk_create(
+            Trip(
+                route=branch,
+                train=train,
+                departure_time=start + datetime.timedelta(days=30 + i),
+                arrival_time=start + datetime.timedelta(days=30 + i, hours=1),
+            )
+            for i in range(10)
+        )
+        cls.tomorrow = (start + datetime.timedelta(days=1)).date()
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def trip_list_view(self, **params):
+        view = TripViewSet(action="list", format_kwarg=None)
+        view.request = Request(APIRequestFactory().get(TRIP_URL, params))
+        return view
+
+    def trip_list(self, **params):
+        return self.trip_list_view(**params).get_queryset()
+
+    def trip_list_plan(self, **params):
+        """EXPLAIN of the first page query of TripViewSet.list.
+
+        Most seeded trips are upcoming, so only the LIMIT makes an index
+        scan cheaper than a sequential scan and sort.
+        """
+        view = self.trip_list_view(**params)
+        queryset = TripListSerializer.project(
+            view.filter_queryset(view.get_queryset())
+        )
+        paginator = view.paginator
+        if isinstance(paginator, CursorPagination):
+            page_size = paginator.get_page_size(view.request)
+            page = queryset.order_by(*paginator.ordering)[:page_size + 1]
+        else:
+            page = queryset[:paginator.get_limit(view.request)]
+        return page.explain()
+
+    def assertUsesTripIndex(self, plan, index_name):
+        markers = INDEX_SCAN_MARKERS.get(connection.vendor, ("",))
+        self.assertTrue(
+            any(
+                index_name in line and marker in line
+                for line in plan.splitlines()
+                for marker in markers
+            ),
+            msg=plan,
+        )
+
+    def test_upcoming_trips(self):
+        self.assertUsesTripIndex(self.trip_list_plan(), "trip_departure_idx")
+
+    def test_upcoming_trips_cursor_page(self):
+        plan = self.trip_list_plan(pagination="cursor")
+
+        self.assertUsesTripIndex(plan, "trip_departure_idx")
+
+    def test_upcoming_trips_on_date(self):
+        plan = self.trip_list_plan(date=self.tomorrow.isoformat())
+
+        self.assertUsesTripIndex(plan, "trip_departure_idx")
+
+    def test_upcoming_trips_from_station(self):
+        plan = self.trip_list_plan(source_id=self.source.id)
+
+        self.assertUsesTripIndex(plan, "trip_route_departure_idx")
+
+    def test_date_filter_matches_whole_day(self):
+        trips = list(self.trip_list(date=self.tomorrow.isoformat()))
+
+        self.assertEqual(len(trips), 24)
+        self.assertTrue(
+            all(trip.departure_time.date() == self.tomorrow for trip in trips)
+        )
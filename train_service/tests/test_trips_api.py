@@ -1,13 +1,16 @@
+import base64
 import datetime
 from operator import itemgetter
+from unittest import mock
 
-from django.db.models import F, Count
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.test import TestCase
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from train_service.models import Trip
+from train_service.models import SeatHold, Ticket, Trip
+from train_service.seat_map import build_seat_map
 from train_service.serializers import TripListSerializer, TripDetailSerializer
 from utils.samples import (
     sample_user,
@@ -15,7 +18,9 @@ from utils.samples import (
     sample_route,
     sample_station,
     sample_train,
-    sample_superuser
+    sample_superuser,
+    sample_order,
+    sample_ticket,
 )
 
 TRIP_URL = reverse("train_service:trip-list")
@@ -52,12 +57,7 @@ class AuthenticatedTripApiTests(TestCase):
             departure_time=datetime.datetime(year=2025, month=2, day=1),
             arrival_time=datetime.datetime(year=2025, month=2, day=2),
         )
-        self.trips = Trip.objects.annotate(
-            tickets_available=(
-                F("train__cargo_num") * F("train__places_in_cargo")
-                - Count("tickets")
-            )
-        )
+        self.trips = Trip.objects.all()
 
     def test_list_trip(self):
         res = self.client.get(TRIP_URL)
@@ -119,6 +119,283 @@ class AuthenticatedTripApiTests(TestCase):
         self.assertNotIn(serializer_1.data, res.data["results"])
 
 
+class TripSeatMapTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+
+        self.trip = sample_trip(
+            train=sample_train(cargo_num=2, places_in_cargo=10)
+        )
+        order = sample_order(user=self.user)
+        for cargo, seat in [(1, 1), (1, 9), (2, 10)]:
+            sample_ticket(trip=self.trip, order=order, cargo=cargo, seat=seat)
+
+    def test_retrieve_trip_encodes_taken_seats_as_bitsets(self):
+        res = self.client.get(TRIP_DETAIL_URL(self.trip.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            res.data["taken_seats"],
+            [
+                base64.b64encode(bytes([0b1, 0b1])).decode(),
+                base64.b64encode(bytes([0, 0b10])).decode(),
+            ],
+        )
+
+    def test_retrieve_trip_taken_seats_as_list(self):
+        res = self.client.get(
+            TRIP_DETAIL_URL(self.trip.id), {"seats": "list"}
+        )
+
+        self.assertEqual(
+            res.data["taken_seats"],
+            [
+                {"cargo": 1, "seat": 1},
+                {"cargo": 1, "seat": 9},
+                {"cargo": 2, "seat": 10},
+            ],
+        )
+
+    def test_train_change_must_fit_sold_tickets(self):
+        self.client.force_authenticate(sample_superuser())
+        small = sample_train(cargo_num=1, places_in_cargo=10)
+
+        res = self.client.patch(
+            TRIP_DETAIL_URL(self.trip.id), {"train": small.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("seat 10 in cargo 2", res.data["train"][0])
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.train.cargo_num, 2)
+        with self.assertRaises(DjangoValidationError):
+            Trip(pk=self.trip.pk, train=small).clean()
+
+    def test_train_change_rebuilds_seat_map(self):
+        self.client.force_authenticate(sample_superuser())
+        larger = sample_train(cargo_num=3, places_in_cargo=16)
+
+        res = self.client.patch(
+            TRIP_DETAIL_URL(self.trip.id), {"train": larger.id}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        res = self.client.get(
+            TRIP_DETAIL_URL(self.trip.id), {"seats": "list"}
+        )
+        self.assertEqual(len(res.data["taken_seats"]), 3)
+
+    def test_seats_outside_the_layout_are_rejected(self):
+        with self.assertRaises(ValueError):
+            build_seat_map(self.trip.train, [(1, 11)])
+        with self.assertRaises(ValueError):
+            build_seat_map(self.trip.train, [(3, 1)])
+
+    def test_invalid_seat_map_ignores_tickets_outside_the_layout(self):
+        # Left behind by a train change that bypassed validation.
+        Ticket.objects.bulk_create(
+            [
+                Ticket(
+                    trip=self.trip,
+                    order=sample_order(user=self.user),
+                    cargo=3,
+                    seat=1,
+                )
+            ]
+        )
+        Trip.objects.filter(pk=self.trip.pk).update(seat_map=b"")
+
+        res = self.client.get(
+            TRIP_DETAIL_URL(self.trip.id), {"seats": "list"}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(res.data["taken_seats"]), 3)
+
+    def test_deleted_ticket_releases_seat(self):
+        self.trip.tickets.get(cargo=1, seat=9).delete()
+
+        res = self.client.get(
+            TRIP_DETAIL_URL(self.trip.id), {"seats": "list"}
+        )
+
+        self.assertNotIn({"cargo": 1, "seat": 9}, res.data["taken_seats"])
+
+
+class TripSeatAssignmentTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+        self.trip = sample_trip(
+            train=sample_train(cargo_num=2, places_in_cargo=4)
+        )
+
+    def assign(self, passengers):
+        return self.client.post(
+            reverse(
+                "train_service:trip-assign-seats",
+                kwargs={"pk": self.trip.id},
+            ),
+            {"passengers": passengers},
+        )
+
+    def test_assign_seats_books_contiguous_seats(self):
+        res = self.assign(3)
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [(t["cargo"], t["seat"]) for t in res.data["tickets"]],
+            [(1, 1), (1, 2), (1, 3)],
+        )
+        self.trip.refresh_from_db()
+        self.assertEqual(self.trip.tickets_sold, 3)
+
+    def test_assign_seats_when_trip_is_full(self):
+        self.assign(8)
+
+        res = self.assign(1)
+
+        self.assertEqual(res.status_code, status.HTTP_409_CONFLICT)
+
+    def test_assign_seats_on_trip_deleted_before_locking(self):
+        lock = Trip.lock
+
+        def delete_and_lock(trip_id):
+            Trip.objects.filter(pk=trip_id).delete()
+            return lock(trip_id)
+
+        with mock.patch.object(Trip, "lock", side_effect=delete_and_lock):
+            res = self.assign(1)
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class TripCursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        route = sample_route()
+        train = sample_train()
+        self.trips = [
+            sample_trip(
+                route=route,
+                train=train,
+                departure_time=now + datetime.timedelta(days=days),
+                arrival_time=now + datetime.timedelta(days=days, hours=4),
+            )
+            for days in (3, 1, 2)
+        ]
+
+    def test_cursor_pages_ordered_by_departure_time(self):
+        res = self.client.get(TRIP_URL, {"pagination": "cursor", "limit": 2})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotIn("count", res.data)
+        self.assertEqual(
+            [trip["id"] for trip in res.data["results"]],
+            [self.trips[1].id, self.trips[2].id],
+        )
+
+        res = self.client.get(res.data["next"])
+
+        self.assertEqual(
+            [trip["id"] for trip in res.data["results"]],
+            [self.trips[0].id],
+        )
+        self.assertIsNone(res.data["next"])
+
+    def test_offset_pagination_by_default(self):
+        res = self.client.get(TRIP_URL)
+
+        self.assertEqual(res.data["count"], 3)
+
+
+class TripStationFilterTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=sample_user())
+
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.north = sample_station(name="North Terminal")
+        self.south = sample_station(name="South Terminal")
+        train = sample_train()
+        self.north_trip, self.south_trip = [
+            sample_trip(
+                route=sample_route(source=source, destination=destination),
+                train=train,
+                departure_time=now + datetime.timedelta(days=1),
+                arrival_time=now + datetime.timedelta(days=1, hours=4),
+            )
+            for source, destination in [
+                (self.north, self.south),
+                (self.south, self.north),
+            ]
+        ]
+
+    def test_filter_by_source_name(self):
+        res = self.client.get(TRIP_URL, {"source": "north"})
+
+        self.assertEqual(
+            [trip["id"] for trip in res.data["results"]],
+            [self.north_trip.id],
+        )
+
+    def test_filter_by_destination_id(self):
+        res = self.client.get(TRIP_URL, {"destination_id": self.north.id})
+
+        self.assertEqual(
+            [trip["id"] for trip in res.data["results"]],
+            [self.south_trip.id],
+        )
+
+    def test_filter_by_invalid_station_id(self):
+        res = self.client.get(TRIP_URL, {"destination_id": "1.5"})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TripListFastPathTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = sample_user()
+        self.client.force_authenticate(user=self.user)
+
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        self.trip = sample_trip(
+            train=sample_train(cargo_num=2, places_in_cargo=10),
+            departure_time=now + datetime.timedelta(days=1, microseconds=5),
+            arrival_time=now + datetime.timedelta(days=1, hours=3),
+        )
+        sample_ticket(trip=self.trip, order=sample_order(user=self.user))
+        SeatHold.objects.create(
+            trip=self.trip,
+            user=self.user,
+            cargo=2,
+            seat=2,
+            expires_at=now + datetime.timedelta(minutes=5),
+        )
+
+    def test_list_matches_serializer_output(self):
+        res = self.client.get(TRIP_URL)
+
+        expected = TripListSerializer(
+            Trip.objects.with_seats_held().filter(pk=self.trip.pk),
+            many=True,
+        ).data
+        self.assertEqual(res.data["results"], expected)
+        self.assertEqual(res.data["results"][0]["tickets_available"], 18)
+
+    def test_list_queries(self):
+        # Count and page, nothing per row.
+        with self.assertNumQueries(2):
+            self.client.get(TRIP_URL)
+
+
 class AdminTripApiTests(TestCase):
     def setUp(self):
         self.client = APIClient()
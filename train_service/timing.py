@@ -0,0 +1,171 @@
+"""Per-request query, database, serializer and render timings.
+
+ServerTimingMiddleware counts queries and their time on every database
+connection (through connection.execute_wrapper, which works with DEBUG
+off), times serializer .data and rendering, and reports them in a
+Server-Timing header and a "train_service.timing" log line. It only does
+work when settings.SERVER_TIMING is on; the cost is a perf_counter() call
+around each query and serialization.
+
+Serializer time includes the queries it triggers, so it overlaps with
+db; total covers everything inside the middleware.
+"""
+
+import logging
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_timer", default=None)
+
+
+class RequestTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.spans = {}
+        self._open = set()
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+    @contextmanager
+    def span(self, name):
+        # Nested spans of the same name (a serializer rendering another
+        # one's .data) are only counted once.
+        if name in self._open:
+            yield
+            return
+        self._open.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open.discard(name)
+            self.add(name, time.perf_counter() - started)
+
+    def add(self, name, seconds):
+        self.spans[name] = self.spans.get(name, 0.0) + seconds
+
+    def metrics(self):
+        """[(name, milliseconds, description)] in header order."""
+        total = time.perf_counter() - self.started
+        metrics = [("db", self.db, f"{self.queries} queries")]
+        metrics += [(name, value, None) for name, value in self.spans.items()]
+        metrics.append(("total", total, None))
+        return [(name, value * 1000, desc) for name, value, desc in metrics]
+
+
+@contextmanager
+def measure(name):
+    """Add the time spent in the block to the current request's name
+    timing; does nothing outside an instrumented request."""
+    timer = _current.get()
+    if timer is None:
+        yield
+    else:
+        with timer.span(name):
+            yield
+
+
+def server_timing_header(metrics):
+    entries = []
+    for name, duration, desc in metrics:
+        entry = f"{name};dur={duration:.1f}"
+        if desc:
+            entry += f';desc="{desc}"'
+        entries.append(entry)
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """Report per-request timings when settings.SERVER_TIMING is on.
+
+    Place it near the top of MIDDLEWARE: its total covers the middleware
+    below it. Streaming responses are reported once the view returns,
+    before their content is produced.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SERVER_TIMING:
+            return self.get_response(request)
+
+        timer = RequestTimer()
+        token = _current.set(timer)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timer.execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        metrics = timer.metrics()
+        response["Server-Timing"] = server_timing_header(metrics)
+        self.log(request, response, timer.queries, metrics)
+        return response
+
+    def process_template_response(self, request, response):
+        # Called right before a DRF / template response is rendered.
+        timer = _current.get()
+        if timer is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda response: timer.add(
+                    "render", time.perf_counter() - started
+                )
+            )
+        return response
+
+    @staticmethod
+    def log(request, response, queries, metrics):
+        total = metrics[-1][1]
+        if total < settings.SERVER_TIMING_LOG_MS:
+            return
+        fields = {
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "queries": queries,
+        }
+        fields.update(
+            (f"{name}_ms", round(value, 1)) for name, value, _ in metrics
+        )
+        logger.info(
+            " ".join(f"{key}={value}" for key, value in fields.items()),
+            extra={"timing": fields},
+        )
+
+
+def instrument_serializers():
+    """Time top-level serializer .data as "serialize". Serializer.data
+    and ListSerializer.data both go through BaseSerializer.data; nested
+    serializers only call to_representation() and are included in
+    their parent's time."""
+    data = serializers.BaseSerializer.__dict__["data"]
+    if getattr(data.fget, "timed", False):
+        return
+
+    def fget(self):
+        with measure("serialize"):
+            return data.fget(self)
+
+    fget.timed = True
+    serializers.BaseSerializer.data = property(fget)
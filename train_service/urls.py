@@ -8,7 +8,10 @@ from train_service.views import (
     TrainViewSet,
     CrewViewSet,
     TripViewSet,
-    OrderViewSet
+    OrderViewSet,
+    SeatHoldViewSet,
+    JourneyViewSet,
+    ExportViewSet,
 )
 
 router = routers.DefaultRouter()
@@ -19,6 +22,9 @@ router.register("trains", TrainViewSet)
 router.register("crew", CrewViewSet)
 router.register("trips", TripViewSet)
 router.register("orders", OrderViewSet)
+router.register("holds", SeatHoldViewSet, basename="hold")
+router.register("journeys", JourneyViewSet, basename="journey")
+router.register("exports", ExportViewSet, basename="export")
 
 urlpatterns = [path("", include(router.urls))]
 
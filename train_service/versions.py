@@ -0,0 +1,58 @@
+"""Named version tokens kept in the Django cache.
+
+Bumping a version tells every worker process that data derived from the
+named tables (in-process indexes, cached responses) is stale. Tokens are
+random rather than counters, so a cache flush or eviction can never bring
+back a token that some process has already seen.
+"""
+
+import threading
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+def _cache_key(name):
+    return f"version:{name}"
+
+
+def model_version_name(model):
+    """Version name bumped on every write to model's table."""
+    return f"model:{model._meta.label_lower}"
+
+
+def get_version(name):
+    return cache.get_or_set(
+        _cache_key(name), lambda: uuid4().hex, timeout=None
+    )
+
+
+def bump_version(name):
+    version = uuid4().hex
+    cache.set(_cache_key(name), version, timeout=None)
+    return version
+
+
+class VersionedValue:
+    """A per-process value built by build() and rebuilt whenever the
+    named version (or the optional extra_key()) changes."""
+
+    def __init__(self, name, build, extra_key=None):
+        self.name = name
+        self.build = build
+        self.extra_key = extra_key
+        self._value = None
+        self._key = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        key = (
+            get_version(self.name),
+            self.extra_key() if self.extra_key else None,
+        )
+        if self._key != key:
+            with self._lock:
+                if self._key != key:
+                    self._value = self.build()
+                    self._key = key
+        return self._value
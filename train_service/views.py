@@ -1,13 +1,21 @@
-from datetime import datetime
-
-from django.db.models import F, Count
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from drf_spectacular.types import OpenApiTypes
 from drf_spectacular.utils import extend_schema, OpenApiParameter
 
-from rest_framework import mixins, viewsets
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.throttling import ScopedRateThrottle
 
 from train_service.models import (
     Station,
@@ -17,8 +25,22 @@ from train_service.models import (
     Crew,
     Trip,
     Order,
+    SeatHold,
+    day_start,
 )
+from train_service.autocomplete import station_name_index
+from train_service.eager_loading import EagerLoadingMixin
+from train_service.exports import FORMATS as EXPORT_FORMATS, export
+from train_service.geo import station_grid
+from train_service.journeys import search_journeys
 from train_service.permissions import IsAdminOrIfAuthenticatedReadOnly
+from train_service.renderers import StreamingListMixin
+from train_service.response_cache import (
+    CachedResponseMixin,
+    ConditionalGetMixin,
+    model_versions,
+    request_fingerprint,
+)
 from train_service.serializers import (
     StationSerializer,
     RouteSerializer,
@@ -33,11 +55,78 @@ from train_service.serializers import (
     OrderSerializer,
     OrderListSerializer,
     TrainDetailSerializer,
+    SeatHoldSerializer,
+    SeatAssignmentSerializer,
+    JourneySearchSerializer,
+    JourneySerializer,
+    NearbyStationsSearchSerializer,
+    StationDistanceSerializer,
+    StationAutocompleteSearchSerializer,
+    StationNameSerializer,
+    ExportSearchSerializer,
+)
+from train_service.timing import measure
+
+STATION_ID_PARAMETERS = [
+    OpenApiParameter(
+        "source_id",
+        type=OpenApiTypes.INT,
+        description="Filter by source station id (e.g., ?source_id=1).",
+    ),
+    OpenApiParameter(
+        "destination_id",
+        type=OpenApiTypes.INT,
+        description="Filter by destination station id "
+        "(e.g., ?destination_id=2).",
+    ),
+]
+
+PAGINATION_PARAMETER = OpenApiParameter(
+    "pagination",
+    type=OpenApiTypes.STR,
+    enum=["cursor", "none"],
+    description="Switch to keyset pagination without a total count "
+    "(e.g., ?pagination=cursor&limit=20), or, for staff, stream the "
+    "whole list unpaginated (?pagination=none).",
 )
-from user.models import User
+
+
+class IdCursorPagination(CursorPagination):
+    ordering = ("id",)
+    page_size_query_param = "limit"
+    max_page_size = 100
+
+
+class TripCursorPagination(IdCursorPagination):
+    ordering = ("departure_time", "id")
+
+
+class CursorPaginationMixin:
+    """Use cursor_pagination_class when the client opts in via
+    ?pagination=cursor (or follows a cursor link)."""
+
+    cursor_pagination_class = IdCursorPagination
+
+    def use_cursor_pagination(self):
+        params = self.request.query_params
+        return params.get("pagination") == "cursor" or "cursor" in params
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, "_paginator")
+            and self.request is not None
+            and self.use_cursor_pagination()
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
 
 
 class StationViewSet(
+    StreamingListMixin,
+    CachedResponseMixin,
+    EagerLoadingMixin,
+    CursorPaginationMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -46,9 +135,109 @@ class StationViewSet(
     queryset = Station.objects.all()
     serializer_class = StationSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Station,)
+    throttle_scope = None
+
+    @extend_schema(parameters=[PAGINATION_PARAMETER])
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @extend_schema(
+        description=(
+            "Retrieve stations nearest to a point, optionally within a "
+            "radius in kilometres, ordered by distance."
+        ),
+        parameters=[NearbyStationsSearchSerializer],
+        responses=StationDistanceSerializer(many=True),
+    )
+    @action(detail=False, methods=["get"])
+    def nearby(self, request):
+        search = NearbyStationsSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        found = station_grid.get().nearest(
+            params["lat"],
+            params["lon"],
+            params["limit"],
+            radius=params.get("radius"),
+        )
+        stations = Station.objects.in_bulk(
+            [station[0] for _, station in found]
+        )
+        results = []
+        for distance, station in found:
+            if station[0] in stations:
+                stations[station[0]].distance = round(distance, 3)
+                results.append(stations[station[0]])
+        return Response(StationDistanceSerializer(results, many=True).data)
+
+    @extend_schema(
+        description=(
+            "Suggest stations whose name, or a word in it, starts with q. "
+            "Served from an in-memory index without a database query."
+        ),
+        parameters=[StationAutocompleteSearchSerializer],
+        responses=StationNameSerializer(many=True),
+    )
+    @action(
+        detail=False,
+        methods=["get"],
+        throttle_classes=[ScopedRateThrottle],
+        throttle_scope="autocomplete",
+    )
+    def autocomplete(self, request):
+        search = StationAutocompleteSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        matches = station_name_index.get().search(
+            params["q"], params["limit"]
+        )
+        stations = [
+            {"id": station_id, "name": name} for station_id, name in matches
+        ]
+        return Response(StationNameSerializer(stations, many=True).data)
+
+
+class StationFilterMixin:
+    """Filter by ?source= / ?destination= station name fragments and by
+    ?source_id= / ?destination_id=.
+
+    Names are resolved to station ids first (a trigram index lookup on
+    PostgreSQL), so the main query only filters on indexed foreign keys.
+    """
+
+    station_lookup_prefix = ""
+
+    def filter_by_stations(self, queryset):
+        params = self.request.query_params
+        for param in ("source", "destination"):
+            lookup = f"{self.station_lookup_prefix}{param}_id"
+
+            station_id = params.get(f"{param}_id")
+            if station_id:
+                try:
+                    queryset = queryset.filter(**{lookup: int(station_id)})
+                except ValueError:
+                    raise ValidationError(
+                        {f"{param}_id": "A valid integer is required."}
+                    )
+
+            name = params.get(param)
+            if name:
+                queryset = queryset.filter(
+                    **{f"{lookup}__in": Station.objects.ids_matching(name)}
+                )
+        return queryset
 
 
 class RouteViewSet(
+    StreamingListMixin,
+    CachedResponseMixin,
+    EagerLoadingMixin,
+    StationFilterMixin,
+    CursorPaginationMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     mixins.RetrieveModelMixin,
@@ -58,22 +247,10 @@ class RouteViewSet(
     queryset = Route.objects.all()
     serializer_class = RouteSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Route, Station)
 
     def get_queryset(self):
-        source = self.request.query_params.get("source", None)
-        destination = self.request.query_params.get("destination", None)
-
-        queryset = self.queryset
-
-        if source:
-            queryset = queryset.filter(source__name__icontains=source)
-
-        if destination:
-            queryset = queryset.filter(
-                destination__name__icontains=destination
-            )
-
-        return queryset.distinct()
+        return self.filter_by_stations(super().get_queryset())
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -102,6 +279,8 @@ class RouteViewSet(
                 description="Filter routes by destination station name "
                 "(e.g., ?destination=Diagon Alley Station).",
             ),
+            *STATION_ID_PARAMETERS,
+            PAGINATION_PARAMETER,
         ],
     )
     def list(self, request, *args, **kwargs):
@@ -109,6 +288,8 @@ class RouteViewSet(
 
 
 class TrainTypeViewSet(
+    CachedResponseMixin,
+    EagerLoadingMixin,
     mixins.CreateModelMixin,
     mixins.ListModelMixin,
     viewsets.GenericViewSet
@@ -116,9 +297,12 @@ class TrainTypeViewSet(
     queryset = TrainType.objects.all()
     serializer_class = TrainTypeSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (TrainType,)
 
 
 class TrainViewSet(
+    CachedResponseMixin,
+    EagerLoadingMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
@@ -127,6 +311,7 @@ class TrainViewSet(
 ):
     queryset = Train.objects.all()
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Train, TrainType)
 
     def get_serializer_class(self):
         if self.action == "retrieve":
@@ -135,6 +320,8 @@ class TrainViewSet(
 
 
 class CrewViewSet(
+    CachedResponseMixin,
+    EagerLoadingMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet
@@ -142,9 +329,15 @@ class CrewViewSet(
     queryset = Crew.objects.all()
     serializer_class = CrewSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cache_models = (Crew,)
 
 
 class TripViewSet(
+    StreamingListMixin,
+    ConditionalGetMixin,
+    EagerLoadingMixin,
+    StationFilterMixin,
+    CursorPaginationMixin,
     mixins.CreateModelMixin,
     mixins.RetrieveModelMixin,
     mixins.UpdateModelMixin,
@@ -154,52 +347,68 @@ class TripViewSet(
     queryset = Trip.objects.all()
     serializer_class = TripSerializer
     permission_classes = (IsAdminOrIfAuthenticatedReadOnly,)
+    cursor_pagination_class = TripCursorPagination
+    station_lookup_prefix = "route__"
+    conditional_actions = ("retrieve",)
 
     def get_queryset(self):
         queryset = super().get_queryset()
 
         if self.action == "list":
-            current_time = datetime.now()
-            queryset = (
-                queryset.select_related(
-                    "route__source",
-                    "route__destination",
-                    "train"
-                )
-                .filter(departure_time__gt=current_time)
-                .annotate(
-                    tickets_available=(
-                        F("train__cargo_num") * F("train__places_in_cargo")
-                        - Count("tickets")
-                    )
-                )
-            )
+            queryset = queryset.filter(
+                departure_time__gt=timezone.now()
+            ).order_by("departure_time", "id")
             departure_date = self.request.query_params.get("date", None)
-            source = self.request.query_params.get("source", None)
-            destination = self.request.query_params.get("destination", None)
 
             if departure_date:
                 try:
                     date_obj = datetime.strptime(
                         departure_date, "%Y-%m-%d"
                     ).date()
-                    queryset = queryset.filter(departure_time__date=date_obj)
                 except ValueError:
                     raise ValidationError(
                         "Invalid date format. Use YYYY-MM-DD."
                     )
-
-            if source:
+                # A range on the raw column, unlike __date, can use the
+                # departure_time index.
                 queryset = queryset.filter(
-                    route__source__name__icontains=source
+                    departure_time__gte=day_start(date_obj),
+                    departure_time__lt=day_start(date_obj + timedelta(days=1)),
                 )
 
-            if destination:
-                queryset = queryset.filter(
-                    route__destination__name__icontains=destination
-                )
-
-        return queryset.distinct()
+            queryset = self.filter_by_stations(queryset)
+
+        return queryset
+
+    def get_etag(self, request):
+        """Trip columns, seat map and active holds from one indexed
+        query, plus the versions of the related reference tables."""
+        pk = self.kwargs.get("pk")
+        if not str(pk).isdigit():
+            return None
+        trip = (
+            Trip.objects.filter(pk=pk)
+            .with_seats_held()
+            .with_last_hold()
+            .values(
+                "departure_time",
+                "arrival_time",
+                "route_id",
+                "train_id",
+                "seat_map",
+                "seats_held",
+                "last_hold_id",
+            )
+            .first()
+        )
+        if trip is None:
+            return None
+        trip["seat_map"] = bytes(trip["seat_map"]).hex()
+        return request_fingerprint(
+            request,
+            model_versions((Route, Station, Train, TrainType)),
+            sorted(trip.items()),
+        )
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -232,10 +441,185 @@ class TripViewSet(
                 description="Filter routes by destination station name "
                 "(e.g., ?destination=Diagon Alley Station).",
             ),
+            *STATION_ID_PARAMETERS,
+            PAGINATION_PARAMETER,
         ],
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        # TripListSerializer's values() fast path: same output without
+        # model instances or per-row field machinery.
+        queryset = TripListSerializer.project(
+            self.filter_queryset(self.get_queryset())
+        )
+        if self.streams_list():
+            return self.stream_list(
+                queryset, TripListSerializer.to_representation_rows
+            )
+        page = self.paginate_queryset(queryset)
+        with measure("serialize"):
+            data = TripListSerializer.to_representation_rows(
+                queryset if page is None else page
+            )
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "seats",
+                type=OpenApiTypes.STR,
+                enum=["list"],
+                description="Return taken seats as a list of cargo/seat "
+                "pairs instead of one base64 bitset per cargo "
+                "(e.g., ?seats=list).",
+            ),
+            OpenApiParameter(
+                "If-None-Match",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description="ETag of a previous response; answered with "
+                "304 Not Modified if the trip and its seats are unchanged.",
+            ),
+        ],
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @extend_schema(
+        description=(
+            "Book seats for a party, preferring contiguous seats in one "
+            "cargo. Returns the created order."
+        ),
+        request=SeatAssignmentSerializer,
+        responses={status.HTTP_201_CREATED: OrderSerializer},
+    )
+    @action(
+        detail=True,
+        methods=["post"],
+        url_path="assign-seats",
+        permission_classes=(IsAuthenticated,),
+    )
+    def assign_seats(self, request, pk=None):
+        serializer = SeatAssignmentSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user, trip=self.get_object())
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class SeatHoldViewSet(
+    EagerLoadingMixin,
+    mixins.ListModelMixin,
+    mixins.CreateModelMixin,
+    mixins.DestroyModelMixin,
+    viewsets.GenericViewSet,
+):
+    queryset = SeatHold.objects.all()
+    serializer_class = SeatHoldSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        return super().get_queryset().active().filter(user=self.request.user)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == "create":
+            kwargs.update(many=True, allow_empty=False)
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+    @extend_schema(
+        description=(
+            "Hold a list of seats for SEAT_HOLD_TTL. Seats that are sold "
+            "or held by another user are reported with a 409 response."
+        ),
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @extend_schema(
+        request=None,
+        responses=OrderSerializer,
+        parameters=[
+            OpenApiParameter(
+                "trip",
+                type=OpenApiTypes.INT,
+                description="Only convert holds on this trip "
+                "(e.g., ?trip=1).",
+            ),
+        ],
+    )
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        """Convert the user's active holds into an order."""
+        holds = self.get_queryset()
+        trip_id = request.query_params.get("trip")
+        if trip_id:
+            holds = holds.filter(trip_id=trip_id)
+        if not holds:
+            raise ValidationError("No active seat holds.")
+
+        serializer = OrderSerializer(
+            data={
+                "tickets": [
+                    {
+                        "trip": hold.trip_id,
+                        "cargo": hold.cargo,
+                        "seat": hold.seat,
+                    }
+                    for hold in holds
+                ]
+            },
+            context=self.get_serializer_context(),
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class JourneyViewSet(viewsets.ViewSet):
+    permission_classes = (IsAuthenticated,)
+
+    @extend_schema(
+        description=(
+            "Find the earliest-arriving journeys between two stations, "
+            "including trips with transfers. Returns at most one journey "
+            "per number of transfers, ordered by arrival time."
+        ),
+        parameters=[JourneySearchSerializer],
+        responses=JourneySerializer(many=True),
+    )
+    def list(self, request):
+        search = JourneySearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = search.validated_data
+
+        itineraries = search_journeys(
+            params["source"].id,
+            params["destination"].id,
+            max(params.get("departure", timezone.now()), timezone.now()),
+            min_transfer=timedelta(minutes=params["min_transfer"]),
+            max_transfers=params["max_transfers"],
+        )
+        trips = (
+            Trip.objects.select_related(
+                "route__source", "route__destination", "train"
+            )
+            .with_seats_held()
+            .in_bulk({trip_id for path in itineraries for trip_id in path})
+        )
+        journeys = [
+            [trips[trip_id] for trip_id in path]
+            for path in itineraries
+            if all(trip_id in trips for trip_id in path)
+        ]
+        serializer = JourneySerializer(
+            journeys, many=True, context={"request": request}
+        )
+        return Response({"results": serializer.data})
 
 
 class OrderPagination(PageNumberPagination):
@@ -243,22 +627,91 @@ class OrderPagination(PageNumberPagination):
     max_page_size = 10
 
 
+class IdempotentCreateMixin:
+    """Replay the stored response when create is retried with the same
+    Idempotency-Key header (per user) within IDEMPOTENCY_KEY_TTL.
+
+    Only successful responses are stored; a request that raised is
+    forgotten so the client can retry it. Responses and in-progress
+    markers live in the default cache, which must be shared by all
+    worker processes (see train_service.checks).
+    """
+
+    idempotency_pending_timeout = 60
+
+    def create(self, request, *args, **kwargs):
+        key = request.headers.get("Idempotency-Key")
+        if not key:
+            return super().create(request, *args, **kwargs)
+
+        cache_key = f"idempotency:{self.basename}:{request.user.pk}:{key}"
+        # The query string selects options such as ?partial=true.
+        fingerprint = hashlib.sha256(
+            json.dumps(
+                [sorted(request.query_params.lists()), request.data],
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+
+        if cache.add(
+            cache_key, {"pending": True}, self.idempotency_pending_timeout
+        ):
+            try:
+                response = super().create(request, *args, **kwargs)
+            except Exception:
+                cache.delete(cache_key)
+                raise
+            cache.set(
+                cache_key,
+                {
+                    "fingerprint": fingerprint,
+                    "status": response.status_code,
+                    "data": response.data,
+                    "headers": {
+                        name: response[name]
+                        for name in ("Location",)
+                        if response.has_header(name)
+                    },
+                },
+                settings.IDEMPOTENCY_KEY_TTL.total_seconds(),
+            )
+            return response
+
+        stored = cache.get(cache_key)
+        if stored is None or stored.get("pending"):
+            return Response(
+                {"detail": "A request with this Idempotency-Key is "
+                           "still in progress."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        if stored["fingerprint"] != fingerprint:
+            return Response(
+                {"detail": "This Idempotency-Key was already used with a "
+                           "different payload."},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        return Response(
+            stored["data"],
+            status=stored["status"],
+            headers={**stored["headers"], "Idempotent-Replayed": "true"},
+        )
+
+
 class OrderViewSet(
+    IdempotentCreateMixin,
+    EagerLoadingMixin,
     mixins.ListModelMixin,
     mixins.CreateModelMixin,
     viewsets.GenericViewSet
 ):
-    queryset = Order.objects.prefetch_related(
-        "tickets__trip__route__source",
-        "tickets__trip__route__destination",
-        "tickets__trip__train",
-    )
+    queryset = Order.objects.all()
     serializer_class = OrderSerializer
     pagination_class = OrderPagination
     permission_classes = (IsAuthenticated,)
 
     def get_queryset(self):
-        return self.queryset.filter(user=self.request.user)
+        return super().get_queryset().filter(user=self.request.user)
 
     def get_serializer_class(self):
         if self.action == "list":
@@ -266,4 +719,70 @@ class OrderViewSet(
         return self.serializer_class
 
     def perform_create(self, serializer):
-        serializer.save(user=User.objects.first())
+        serializer.save(user=self.request.user)
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                "Idempotency-Key",
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description="Retries with the same key replay the first "
+                "successful response instead of booking again.",
+            ),
+            OpenApiParameter(
+                "partial",
+                type=OpenApiTypes.BOOL,
+                description="Book the seats that are still free and list "
+                "the others in unavailable_tickets (e.g., ?partial=true).",
+            ),
+        ],
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+
+class ExportViewSet(viewsets.ViewSet):
+    """Full exports for operations, streamed row by row."""
+
+    permission_classes = (IsAdminUser,)
+
+    def stream(self, request, dataset):
+        search = ExportSearchSerializer(data=request.query_params)
+        search.is_valid(raise_exception=True)
+        params = dict(search.validated_data)
+        output_format = params.pop("output")
+
+        response = StreamingHttpResponse(
+            export(dataset, output_format, **params),
+            content_type=EXPORT_FORMATS[output_format],
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{dataset}.{output_format}"'
+        )
+        return response
+
+    @extend_schema(
+        description=(
+            "Trips departing in the date range (or one trip) with their "
+            "tickets, as NDJSON or CSV (one row per ticket)."
+        ),
+        parameters=[ExportSearchSerializer],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.BINARY},
+    )
+    @action(detail=False)
+    def trips(self, request):
+        return self.stream(request, "trips")
+
+    @extend_schema(
+        description=(
+            "Orders created in the date range (or with tickets for one "
+            "trip) with their tickets, as NDJSON or CSV (one row per "
+            "ticket)."
+        ),
+        parameters=[ExportSearchSerializer],
+        responses={(200, "application/x-ndjson"): OpenApiTypes.BINARY},
+    )
+    @action(detail=False)
+    def orders(self, request):
+        return self.stream(request, "orders")
@@ -33,6 +33,9 @@ DEBUG = os.environ.get("DEBUG", "False") == "True"
 
 ALLOWED_HOSTS = []
 
+# Django Debug Toolbar; keep it out of production middleware stacks.
+DEBUG_TOOLBAR = os.environ.get("DEBUG_TOOLBAR", str(DEBUG)) == "True"
+
 
 # Application definition
 
@@ -48,20 +51,29 @@ INSTALLED_APPS = [
     "rest_framework_simplejwt",
     "drf_spectacular",
     "user",
-    "debug_toolbar",
 ]
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
+    "train_service.timing.ServerTimingMiddleware",
+    "train_service.metrics.MetricsMiddleware",
+    "train_service.recording.TrafficRecorderMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "train_service.profiling.ProfilingMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+if DEBUG_TOOLBAR:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("train_service.timing.ServerTimingMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
+
 ROOT_URLCONF = "train_service_api.urls"
 
 TEMPLATES = [
@@ -97,6 +109,21 @@ DATABASES = {
     }
 }
 
+# Version tokens (train_service.versions), cached responses and
+# Idempotency-Key replays live here. The local-memory default is per
+# process; run several workers against a shared backend, e.g.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache with
+# CACHE_LOCATION=redis://redis:6379/0. `check --deploy` reports a
+# per-process backend as an error (train_service.E001).
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", ""),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -153,15 +180,84 @@ REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "train_service.permissions.IsAdminOrIfAuthenticatedReadOnly",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "train_service.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS":
-        "rest_framework.pagination.LimitOffsetPagination",
+        "train_service.pagination.LimitOffsetPagination",
     "PAGE_SIZE": 5,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_THROTTLE_CLASSES": [
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "30/day", "user": "100/day"},
+    "DEFAULT_THROTTLE_RATES": {
+        "anon": "30/day",
+        "user": "100/day",
+        # Station autocomplete is called on every keystroke.
+        "autocomplete": "60/minute",
+    },
+}
+
+SEAT_HOLD_TTL = timedelta(
+    minutes=int(os.environ.get("SEAT_HOLD_MINUTES", "10"))
+)
+
+IDEMPOTENCY_KEY_TTL = timedelta(
+    hours=int(os.environ.get("IDEMPOTENCY_KEY_HOURS", "24"))
+)
+
+# Cached responses are keyed by table versions, so they never go stale;
+# the timeout only bounds how long unused entries take up memory.
+RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get("RESPONSE_CACHE_SECONDS", "3600")
+)
+
+# Query count, DB, serializer and render time per request as a
+# Server-Timing header and a "train_service.timing" log line.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "False") == "True"
+# Only log requests that took at least this many milliseconds.
+SERVER_TIMING_LOG_MS = float(os.environ.get("SERVER_TIMING_LOG_MS", "0"))
+
+# Bearer token Prometheus must send to scrape /metrics; while empty the
+# endpoint answers 404. With several worker processes also set
+# PROMETHEUS_MULTIPROC_DIR, see train_service.metrics.
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
+
+# Profiles of sampled, slow and staff-flagged ("X-Profile: 1") requests,
+# see train_service.profiling.
+PROFILING = os.environ.get("PROFILING", "False") == "True"
+# Fraction of requests run under cProfile.
+PROFILING_SAMPLE_RATE = float(os.environ.get("PROFILING_SAMPLE_RATE", "0"))
+# Sample the stack of requests running longer than this; 0 disables.
+PROFILING_SLOW_MS = float(os.environ.get("PROFILING_SLOW_MS", "1000"))
+PROFILING_DIR = os.environ.get("PROFILING_DIR") or BASE_DIR / "profiles"
+# The oldest profiles are deleted beyond this many.
+PROFILING_MAX_FILES = int(os.environ.get("PROFILING_MAX_FILES", "200"))
+# Also write SQL parameters and query string values, which can contain
+# personal data, into profiles.
+PROFILING_RECORD_VALUES = (
+    os.environ.get("PROFILING_RECORD_VALUES", "False") == "True"
+)
+
+# Append sanitized API requests to this JSONL file for
+# benchmarks.replay, see train_service.recording; empty disables.
+TRAFFIC_RECORD_FILE = os.environ.get("TRAFFIC_RECORD_FILE", "")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "train_service.timing": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
 }
 
 SIMPLE_JWT = {
@@ -0,0 +1,29 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class NPlusOneGuardMixin:
+    """TestCase mixin failing when a list endpoint's query count grows
+    with the number of rows on the page."""
+
+    def assertListQueriesConstant(self, url, make_row, rows=5, params=None):
+        """Compare a page of one row with a page of rows rows; rows must
+        fit on one page. make_row() should create a row with its own
+        related objects, so that missing joins show up as extra queries.
+        """
+        make_row()
+        with CaptureQueriesContext(connection) as single:
+            res = self.client.get(url, params)
+        self.assertEqual(len(res.data["results"]), 1)
+
+        for _ in range(rows - 1):
+            make_row()
+        with CaptureQueriesContext(connection) as full:
+            res = self.client.get(url, params)
+        self.assertEqual(len(res.data["results"]), rows)
+
+        self.assertEqual(
+            len(full),
+            len(single),
+            msg="\n".join(query["sql"] for query in full.captured_queries),
+        )